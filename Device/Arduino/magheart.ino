@@ -26,6 +26,22 @@ unsigned long systoleDuration = 0;  // 收缩期持续时间
 unsigned long diastoleDuration = 0; // 舒张期持续时间
 unsigned long phaseStartTime = 0;   // 当前阶段开始时间
 
+// 帧协议 (后端 ARDUINO_PROTOCOL=framed)
+// 主机 -> 板子: 0xA5 | seq | cmd | value | chk   (chk = seq ^ cmd ^ value)
+// 板子 -> 主机: 0x5A | seq | status | chk        (chk = seq ^ status)
+const uint8_t FRAME_START = 0xA5;
+const uint8_t ACK_START = 0x5A;
+const uint8_t CMD_SET_BPM = 0x01;
+const uint8_t ACK_OK = 0x00;
+const uint8_t ACK_REJECTED = 0x01;
+const int FRAME_SIZE = 5;
+const unsigned long FRAME_TIMEOUT_MS = 50; // 不完整的帧超过该时间则丢弃
+
+uint8_t frameBuf[FRAME_SIZE];
+int frameLen = 0;
+unsigned long frameStartTime = 0;
+bool verbose = true; // 收到第一个有效帧后关闭文本日志，避免串口输出拖慢应答
+
 void setup()
 {
   Serial.begin(115200);
@@ -47,68 +63,26 @@ void setup()
 
 void loop()
 {
-  // 处理串口输入
-  if (Serial.available() > 0)
+  // 丢弃超时的不完整帧
+  if (frameLen > 0 && millis() - frameStartTime > FRAME_TIMEOUT_MS)
+  {
+    frameLen = 0;
+  }
+
+  // 帧协议输入：以 0xA5 开头（文本输入不会出现该字节）
+  if (Serial.available() > 0 && (frameLen > 0 || Serial.peek() == FRAME_START))
+  {
+    readFrameBytes();
+  }
+  // 文本协议输入
+  else if (Serial.available() > 0)
   {
     String input = Serial.readStringUntil('\n');
     input.trim();
 
     int bpm = input.toInt();
 
-    if (bpm == 0)
-    {
-      // 停止心跳模拟
-      heartRate = 0;
-      isBeating = false;
-      ledcWrite(pwmPin, PWM_OFF);
-      Serial.println("❌ 心跳模拟已停止");
-    }
-    else if (bpm >= 40 && bpm <= 200)
-    {
-      // 设置新的心率
-      heartRate = bpm;
-      beatInterval = 60000 / heartRate; // 每次心跳的总时间 (ms)
-
-      // 计算收缩期和舒张期的持续时间
-      systoleDuration = beatInterval * SYSTOLE_RATIO;
-      diastoleDuration = beatInterval * DIASTOLE_RATIO;
-
-      // 如果是第一次启动，从高峰期开始
-      if (!isBeating)
-      {
-        isPeak = true;
-        ledcWrite(pwmPin, PWM_PEAK);
-        Serial.print("🚀 首次启动 | ");
-      }
-      else
-      {
-        // 已经在跳动中，保持当前阶段，只重置阶段开始时间
-        // 这样可以平滑过渡到新的心率，避免卡顿
-        Serial.print("🔄 调整心率 | 当前阶段: ");
-        Serial.print(isPeak ? "收缩期" : "舒张期");
-        Serial.print(" | ");
-      }
-
-      isBeating = true;
-      lastBeatTime = millis();
-      phaseStartTime = millis(); // 重置当前阶段的计时
-
-      Serial.println("=================================");
-      Serial.print("✅ 心率设置为: ");
-      Serial.print(heartRate);
-      Serial.println(" BPM");
-      Serial.print("   心跳周期: ");
-      Serial.print(beatInterval);
-      Serial.println(" ms");
-      Serial.print("   收缩期: ");
-      Serial.print(systoleDuration);
-      Serial.println(" ms (5挡)");
-      Serial.print("   舒张期: ");
-      Serial.print(diastoleDuration);
-      Serial.println(" ms (3挡)");
-      Serial.println("=================================");
-    }
-    else
+    if (!applyHeartRate(bpm))
     {
       Serial.println("⚠️  请输入有效的心率值 (40-200 BPM) 或 0 停止");
     }
@@ -129,8 +103,11 @@ void loop()
         isPeak = false;
         phaseStartTime = currentTime;
         ledcWrite(pwmPin, PWM_VALLEY);
-        Serial.print("💓 跳动... | BPM: ");
-        Serial.println(heartRate);
+        if (verbose)
+        {
+          Serial.print("💓 跳动... | BPM: ");
+          Serial.println(heartRate);
+        }
       }
     }
     else
@@ -145,4 +122,110 @@ void loop()
       }
     }
   }
-}
\ No newline at end of file
+}
+
+// 应用新的心率：0 停止，40-200 开始/调整；其他值返回 false
+bool applyHeartRate(int bpm)
+{
+  if (bpm == 0)
+  {
+    // 停止心跳模拟
+    heartRate = 0;
+    isBeating = false;
+    ledcWrite(pwmPin, PWM_OFF);
+    if (verbose)
+      Serial.println("❌ 心跳模拟已停止");
+    return true;
+  }
+  if (bpm < 40 || bpm > 200)
+  {
+    return false;
+  }
+
+  // 设置新的心率
+  heartRate = bpm;
+  beatInterval = 60000 / heartRate; // 每次心跳的总时间 (ms)
+
+  // 计算收缩期和舒张期的持续时间
+  systoleDuration = beatInterval * SYSTOLE_RATIO;
+  diastoleDuration = beatInterval * DIASTOLE_RATIO;
+
+  // 如果是第一次启动，从高峰期开始
+  if (!isBeating)
+  {
+    isPeak = true;
+    ledcWrite(pwmPin, PWM_PEAK);
+    if (verbose)
+      Serial.print("🚀 首次启动 | ");
+  }
+  else if (verbose)
+  {
+    // 已经在跳动中，保持当前阶段，只重置阶段开始时间
+    // 这样可以平滑过渡到新的心率，避免卡顿
+    Serial.print("🔄 调整心率 | 当前阶段: ");
+    Serial.print(isPeak ? "收缩期" : "舒张期");
+    Serial.print(" | ");
+  }
+
+  isBeating = true;
+  lastBeatTime = millis();
+  phaseStartTime = millis(); // 重置当前阶段的计时
+
+  if (verbose)
+  {
+    Serial.println("=================================");
+    Serial.print("✅ 心率设置为: ");
+    Serial.print(heartRate);
+    Serial.println(" BPM");
+    Serial.print("   心跳周期: ");
+    Serial.print(beatInterval);
+    Serial.println(" ms");
+    Serial.print("   收缩期: ");
+    Serial.print(systoleDuration);
+    Serial.println(" ms (5挡)");
+    Serial.print("   舒张期: ");
+    Serial.print(diastoleDuration);
+    Serial.println(" ms (3挡)");
+    Serial.println("=================================");
+  }
+  return true;
+}
+
+// 读取帧字节，凑满一帧后校验、执行并应答
+void readFrameBytes()
+{
+  while (Serial.available() > 0 && frameLen < FRAME_SIZE)
+  {
+    uint8_t b = Serial.read();
+    if (frameLen == 0)
+    {
+      if (b != FRAME_START)
+        continue; // 重新同步到帧头
+      frameStartTime = millis();
+    }
+    frameBuf[frameLen++] = b;
+  }
+  if (frameLen < FRAME_SIZE)
+    return;
+
+  uint8_t seq = frameBuf[1];
+  uint8_t cmd = frameBuf[2];
+  uint8_t value = frameBuf[3];
+  uint8_t chk = frameBuf[4];
+  frameLen = 0;
+
+  uint8_t status = ACK_REJECTED;
+  if (chk == (uint8_t)(seq ^ cmd ^ value))
+  {
+    verbose = false;
+    if (cmd == CMD_SET_BPM && applyHeartRate(value))
+      status = ACK_OK;
+  }
+  sendAck(seq, status);
+}
+
+void sendAck(uint8_t seq, uint8_t status)
+{
+  uint8_t ack[4] = {ACK_START, seq, status, (uint8_t)(seq ^ status)};
+  Serial.write(ack, sizeof(ack));
+}
@@ -3,24 +3,39 @@ from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 
 from .config import CORS_ALLOW_ORIGINS
-from .routers import signals, cocreation
+from .routers import signals, cocreation, devices
 from .services.arduino_service import get_arduino_service
+from .services.device_registry import device_registry
+from .services.meeting_manager import meeting_manager
+from .services import signal_service
+from .storage import backend as storage
+from .storage.rollups import rollups
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup: Connect to Arduino
+    await storage.start()
+    rollups.start()
+
+    # Startup: Arduino connects in the background (supervisor with backoff)
     arduino_service = await get_arduino_service()
-    if arduino_service.is_connected():
-        print("✅ Arduino device connected and ready")
+    if arduino_service.enabled and arduino_service.port:
+        print(f"🔌 Arduino supervisor started for {arduino_service.port}")
     else:
-        print("⚠️  Arduino device not connected (check ARDUINO_ENABLED and ARDUINO_PORT in .env)")
+        print("⚠️  Arduino device not enabled (check ARDUINO_ENABLED and ARDUINO_PORT in .env)")
     
     yield
     
-    # Shutdown: Disconnect from Arduino
-    await arduino_service.disconnect()
-    print("🔌 Arduino device disconnected")
+    # Shutdown: Disconnect every Arduino device
+    await device_registry.close()
+    print("🔌 Arduino devices disconnected")
+
+    await meeting_manager.close()
+    await signal_service.close()
+
+    # Flush any rows still queued in the write-behind writers
+    await rollups.close()
+    await storage.close()
 
 
 app = FastAPI(title="MagHeart Backend", version="0.1.0", lifespan=lifespan)
@@ -36,20 +51,16 @@ app.add_middleware(
 
 app.include_router(signals.router, tags=["signals"])
 app.include_router(cocreation.router, prefix="/cocreation", tags=["cocreation"])
+app.include_router(devices.router, tags=["devices"])
 
 
 @app.get("/")
 async def root():
-    return {"ok": True, "service": "magheart", "routes": ["/api/heart_rate", "/events"]}
+    return {"ok": True, "service": "magheart", "routes": ["/api/heart_rate", "/api/heart_rate/batch", "/api/heart_rate/history", "/api/devices", "/events"]}
 
 
 @app.get("/api/arduino/status")
 async def arduino_status():
     """Check Arduino connection status"""
     service = await get_arduino_service()
-    return {
-        "connected": service.is_connected(),
-        "enabled": service.enabled,
-        "port": service.port,
-        "baudrate": service.baudrate
-    }
+    return service.status()
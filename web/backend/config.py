@@ -12,17 +12,109 @@ except Exception:
     # dotenv is optional
     pass
 
-# Required: Redis URL (use rediss:// for Upstash TCP/TLS)
+# Broker for latest values and real-time fan-out: "redis" (default, works
+# across processes/hosts) or "memory" (single process, no Redis needed)
+BROKER_BACKEND = os.getenv("MAGHEART_BROKER", "redis").lower()
+if BROKER_BACKEND not in ("redis", "memory"):
+    raise RuntimeError("MAGHEART_BROKER must be 'redis' or 'memory'.")
+
+# Co-creation meeting state: "memory" (default, one worker process) or
+# "redis" (shared hashes + pub/sub relay, for several workers/hosts)
+MEETING_STATE = os.getenv("MAGHEART_MEETING_STATE", "memory").lower()
+if MEETING_STATE not in ("redis", "memory"):
+    raise RuntimeError("MAGHEART_MEETING_STATE must be 'redis' or 'memory'.")
+MEETING_STATE_TTL = int(os.getenv("MEETING_STATE_TTL", "86400"))  # seconds an idle meeting is kept in Redis
+
+# Redis URL (use rediss:// for Upstash TCP/TLS); required if either of the above uses Redis
 REDIS_URL = os.getenv("REDIS_URL")
-if not REDIS_URL:
+if not REDIS_URL and "redis" in (BROKER_BACKEND, MEETING_STATE):
     raise RuntimeError(
         "REDIS_URL not set. Put it in .env/.env.local (e.g., rediss://default:<password>@host:port)."
     )
 
+# Redis connection pool tuning (tuned for remote TLS Redis with tens of ms RTT)
+def _optional_float(name: str):
+    val = os.getenv(name, "").strip()
+    return float(val) if val else None
+
+
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", "50"))
+REDIS_SOCKET_KEEPALIVE = os.getenv("REDIS_SOCKET_KEEPALIVE", "true").lower() in ("true", "1", "yes")
+REDIS_HEALTH_CHECK_INTERVAL = int(os.getenv("REDIS_HEALTH_CHECK_INTERVAL", "30"))  # seconds, 0 = off
+REDIS_SOCKET_TIMEOUT = _optional_float("REDIS_SOCKET_TIMEOUT")  # seconds, unset = no timeout
+REDIS_SOCKET_CONNECT_TIMEOUT = _optional_float("REDIS_SOCKET_CONNECT_TIMEOUT") or 5.0
+
+# Latest-sample expiry (Redis key and in-process cache) and cache size
+LATEST_TTL_SECONDS = int(os.getenv("LATEST_TTL_SECONDS", "120"))
+LATEST_CACHE_SIZE = int(os.getenv("LATEST_CACHE_SIZE", "10000"))
+
+# Real-time transport: "pubsub" (fire-and-forget) or "streams" (Redis Streams,
+# lets reconnecting SSE clients resume from Last-Event-ID)
+SIGNAL_TRANSPORT = os.getenv("SIGNAL_TRANSPORT", "pubsub").lower()
+if SIGNAL_TRANSPORT not in ("pubsub", "streams"):
+    raise RuntimeError("SIGNAL_TRANSPORT must be 'pubsub' or 'streams'.")
+STREAM_MAXLEN = int(os.getenv("STREAM_MAXLEN", "1000"))  # approx. entries kept per user
+STREAM_BLOCK_MS = int(os.getenv("STREAM_BLOCK_MS", "1000"))  # XREAD block per reader round
+
+# SSE streams: per-client queue bound, policy for "hr" events when a client
+# falls behind ("drop_oldest" keeps a window, "latest" coalesces to the newest)
+# and the shared keepalive period
+SSE_QUEUE_SIZE = int(os.getenv("SSE_QUEUE_SIZE", "64"))
+SSE_HR_POLICY = os.getenv("SSE_HR_POLICY", "drop_oldest").lower()
+if SSE_HR_POLICY not in ("drop_oldest", "latest"):
+    raise RuntimeError("SSE_HR_POLICY must be 'drop_oldest' or 'latest'.")
+SSE_KEEPALIVE_SECONDS = float(os.getenv("SSE_KEEPALIVE_SECONDS", "20"))
+
+# Co-creation WebSockets: per-connection outbound queue bound, and how long a
+# single send may stall before the connection is evicted as a slow consumer
+WS_SEND_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE", "64"))
+WS_SEND_TIMEOUT = float(os.getenv("WS_SEND_TIMEOUT", "5"))  # seconds
+# Meeting state frames are coalesced: at most one per meeting per interval
+# (0 broadcasts every change immediately). Phase changes are always immediate.
+MEETING_BROADCAST_INTERVAL = float(os.getenv("MEETING_BROADCAST_INTERVAL", "0.1"))  # seconds
+# Presence: participants without a heartbeat go offline, then are removed
+PRESENCE_OFFLINE_AFTER = float(os.getenv("PRESENCE_OFFLINE_AFTER", "30"))  # seconds
+PRESENCE_REMOVE_AFTER = float(os.getenv("PRESENCE_REMOVE_AFTER", "300"))  # seconds
+# Quotas on client-supplied meeting state: inbound frame size, and the bag of
+# non-core participant fields per participant and per meeting
+WS_MAX_MESSAGE_BYTES = int(os.getenv("WS_MAX_MESSAGE_BYTES", "65536"))
+PARTICIPANT_EXTRA_MAX_KEYS = int(os.getenv("PARTICIPANT_EXTRA_MAX_KEYS", "32"))
+PARTICIPANT_EXTRA_MAX_BYTES = int(os.getenv("PARTICIPANT_EXTRA_MAX_BYTES", "4096"))
+MEETING_EXTRA_MAX_BYTES = int(os.getenv("MEETING_EXTRA_MAX_BYTES", "262144"))
+
+# JSON backend for wire frames: "auto" (orjson, then msgspec, then stdlib),
+# or force "orjson" / "msgspec" / "json"
+JSON_BACKEND = os.getenv("MAGHEART_JSON", "auto").lower()
+if JSON_BACKEND not in ("auto", "orjson", "msgspec", "json"):
+    raise RuntimeError("MAGHEART_JSON must be 'auto', 'orjson', 'msgspec' or 'json'.")
+
 # CSV storage directory
 DATA_DIR = os.getenv("MAGHEART_DATA_DIR", "data")
 os.makedirs(DATA_DIR, exist_ok=True)
 
+# Heart-rate history backend: "csv" (per-user text files) or "binary"
+# (fixed-width memory-mapped segments, requires numpy)
+STORAGE_BACKEND = os.getenv("MAGHEART_STORAGE_BACKEND", "csv").lower()
+if STORAGE_BACKEND not in ("csv", "binary"):
+    raise RuntimeError("MAGHEART_STORAGE_BACKEND must be 'csv' or 'binary'.")
+# Records per binary segment file before rolling to a new one (~1 day at 1 Hz)
+BINARY_SEGMENT_RECORDS = int(os.getenv("BINARY_SEGMENT_RECORDS", "86400"))
+# Samples accepted in one /api/heart_rate/batch request (larger ones get a 413)
+HEART_RATE_BATCH_MAX = int(os.getenv("HEART_RATE_BATCH_MAX", "10000"))
+
+# Write-behind CSV writer: keep per-user handles open and flush rows in groups
+CSV_WRITE_BEHIND = os.getenv("CSV_WRITE_BEHIND", "true").lower() in ("true", "1", "yes")
+CSV_FLUSH_ROWS = int(os.getenv("CSV_FLUSH_ROWS", "256"))  # flush once this many rows are queued
+CSV_FLUSH_INTERVAL = float(os.getenv("CSV_FLUSH_INTERVAL", "0.5"))  # seconds between flushes
+CSV_MAX_OPEN_FILES = int(os.getenv("CSV_MAX_OPEN_FILES", "128"))  # LRU cap on open handles
+# Queued rows held while the disk lags; rows beyond this are dropped and counted
+CSV_MAX_PENDING_ROWS = int(os.getenv("CSV_MAX_PENDING_ROWS", "100000"))
+CSV_DURABILITY = os.getenv("CSV_DURABILITY", "flush").lower()  # "flush" or "fsync"
+if CSV_DURABILITY not in ("flush", "fsync"):
+    raise RuntimeError("CSV_DURABILITY must be 'flush' or 'fsync'.")
+# CSV rows per sparse-index block (byte range + min/max ts)
+CSV_INDEX_STRIDE = int(os.getenv("CSV_INDEX_STRIDE", "256"))
+
 # CORS allowed origins: comma-separated or '*' for all
 _cors = os.getenv("CORS_ALLOW_ORIGINS", "*")
 if _cors.strip() == "*":
@@ -33,4 +125,26 @@ else:
 # Arduino Serial Port Configuration
 ARDUINO_PORT = os.getenv("ARDUINO_PORT", "")  # e.g., COM3 or /dev/ttyUSB0
 ARDUINO_BAUDRATE = int(os.getenv("ARDUINO_BAUDRATE", "115200"))
-ARDUINO_ENABLED = os.getenv("ARDUINO_ENABLED", "false").lower() in ("true", "1", "yes")
\ No newline at end of file
+ARDUINO_ENABLED = os.getenv("ARDUINO_ENABLED", "false").lower() in ("true", "1", "yes")
+ARDUINO_RESET_DELAY = float(os.getenv("ARDUINO_RESET_DELAY", "2"))  # seconds the board needs after open
+ARDUINO_RECONNECT_MIN = float(os.getenv("ARDUINO_RECONNECT_MIN", "1"))  # first backoff, seconds
+ARDUINO_RECONNECT_MAX = float(os.getenv("ARDUINO_RECONNECT_MAX", "30"))  # backoff cap, seconds
+# Wire protocol: "text" ("{bpm}\n", fire-and-forget) or "framed" (seq + checksum, acked)
+ARDUINO_PROTOCOL = os.getenv("ARDUINO_PROTOCOL", "text").lower()
+if ARDUINO_PROTOCOL not in ("text", "framed"):
+    raise RuntimeError("ARDUINO_PROTOCOL must be 'text' or 'framed'.")
+ARDUINO_ACK_TIMEOUT = float(os.getenv("ARDUINO_ACK_TIMEOUT", "2"))  # seconds before a frame counts as unacked
+ARDUINO_LATENCY_WINDOW = int(os.getenv("ARDUINO_LATENCY_WINDOW", "512"))  # acked round trips kept for percentiles
+
+# Multi-device routing: initial user routes "alice=/dev/ttyUSB0,bob=/dev/ttyUSB1"
+ARDUINO_ROUTES = dict(
+    (user.strip(), port.strip())
+    for user, _, port in (r.partition("=") for r in os.getenv("ARDUINO_ROUTES", "").split(","))
+    if user.strip() and port.strip()
+)
+# Hot-plug discovery of serial devices
+ARDUINO_DISCOVERY = os.getenv("ARDUINO_DISCOVERY", "false").lower() in ("true", "1", "yes")
+ARDUINO_DISCOVERY_GLOBS = [
+    g.strip() for g in os.getenv("ARDUINO_DISCOVERY_GLOBS", "/dev/ttyUSB*,/dev/ttyACM*").split(",") if g.strip()
+]
+ARDUINO_DISCOVERY_INTERVAL = float(os.getenv("ARDUINO_DISCOVERY_INTERVAL", "5"))  # seconds
\ No newline at end of file
@@ -0,0 +1,5 @@
+from pydantic import BaseModel, Field
+
+
+class DeviceRouteIn(BaseModel):
+    port: str = Field(..., min_length=1, description="serial port, e.g. /dev/ttyUSB0 or COM3")
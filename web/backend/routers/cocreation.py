@@ -1,14 +1,17 @@
-import json
 from typing import Any, Dict
 
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 
+from ..config import WS_MAX_MESSAGE_BYTES
+from ..services.ws_codec import decode
 from ..services.meeting_manager import meeting_manager
 
 router = APIRouter()
 
 
-async def _handle_message(message: Dict[str, Any], meeting_id: str, user_id: str) -> None:
+async def _handle_message(
+    message: Dict[str, Any], meeting_id: str, user_id: str, websocket: WebSocket
+) -> None:
     """
     Normalize inbound messages and dispatch to the meeting manager.
     """
@@ -20,6 +23,8 @@ async def _handle_message(message: Dict[str, Any], meeting_id: str, user_id: str
         await meeting_manager.join_participant(meeting_id, user_id, payload)
     elif msg_type in {"heartbeat", "presence"}:
         await meeting_manager.heartbeat(meeting_id, user_id, payload)
+    elif msg_type == "request_snapshot":
+        await meeting_manager.send_snapshot(meeting_id, websocket)
     elif msg_type == "leave_meeting":
         await meeting_manager.leave_participant(meeting_id, user_id)
     elif msg_type == "update_phase":
@@ -31,7 +36,7 @@ async def _handle_message(message: Dict[str, Any], meeting_id: str, user_id: str
         if isinstance(updates, dict):
             await meeting_manager.update_shared_context(meeting_id, updates, user_id)
     else:
-        await meeting_manager.broadcast(json.dumps({"type": msg_type, "payload": payload}), meeting_id)
+        await meeting_manager.publish_event(meeting_id, {"type": msg_type, "payload": payload})
 
 
 @router.websocket("/ws/{meeting_id}/{user_id}")
@@ -41,18 +46,32 @@ async def websocket_endpoint(websocket: WebSocket, meeting_id: str, user_id: str
     try:
         while True:
             try:
-                raw = await websocket.receive_text()
+                received = await websocket.receive()
             except (WebSocketDisconnect, RuntimeError):
                 break
+            if received["type"] == "websocket.disconnect":
+                break
+
+            # Text frames are JSON, binary frames MessagePack (magheart.msgpack)
+            raw = received.get("text")
+            if raw is None:
+                raw = received.get("bytes")
+                size = None if raw is None else len(raw)
+            else:
+                size = len(raw.encode("utf-8"))
+            if raw is None or size > WS_MAX_MESSAGE_BYTES:
+                # Over the per-message quota: drop it, keep the socket
+                continue
 
             try:
-                message = json.loads(raw)
-            except json.JSONDecodeError:
+                message = decode(raw)
+            except ValueError:
                 # Ignore malformed payloads to keep socket alive
                 continue
+            if not isinstance(message, dict):
+                continue
 
-            await _handle_message(message, meeting_id, user_id)
+            await _handle_message(message, meeting_id, user_id, websocket)
     finally:
-        meeting_manager.unregister_connection(meeting_id, user_id, websocket)
+        await meeting_manager.unregister_connection(meeting_id, user_id, websocket)
         await meeting_manager.leave_participant(meeting_id, user_id)
-        await meeting_manager.cleanup_stale(meeting_id)
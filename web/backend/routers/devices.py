@@ -0,0 +1,51 @@
+from fastapi import APIRouter, HTTPException
+
+from ..models.device import DeviceRouteIn
+from ..services.device_registry import device_registry
+
+router = APIRouter()
+
+
+@router.get("/api/devices")
+async def list_devices():
+    """Per-device connection status and the current routing table."""
+    return device_registry.snapshot()
+
+
+@router.post("/api/devices/scan")
+async def scan_devices():
+    """Run hot-plug discovery now instead of waiting for the next scan."""
+    added = device_registry.scan()
+    return {"added": added, **device_registry.snapshot()}
+
+
+@router.put("/api/devices/routes/users/{user_id}")
+async def set_user_route(user_id: str, route: DeviceRouteIn):
+    try:
+        device_registry.set_user_route(user_id, route.port)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return device_registry.snapshot()
+
+
+@router.delete("/api/devices/routes/users/{user_id}")
+async def delete_user_route(user_id: str):
+    if not device_registry.remove_user_route(user_id):
+        raise HTTPException(status_code=404, detail="route not found")
+    return device_registry.snapshot()
+
+
+@router.put("/api/devices/routes/meetings/{meeting_id}/{user_id}")
+async def set_pair_route(meeting_id: str, user_id: str, route: DeviceRouteIn):
+    try:
+        device_registry.set_pair_route(meeting_id, user_id, route.port)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return device_registry.snapshot()
+
+
+@router.delete("/api/devices/routes/meetings/{meeting_id}/{user_id}")
+async def delete_pair_route(meeting_id: str, user_id: str):
+    if not device_registry.remove_pair_route(meeting_id, user_id):
+        raise HTTPException(status_code=404, detail="route not found")
+    return device_registry.snapshot()
@@ -1,21 +1,28 @@
-from fastapi import APIRouter, Depends, Header, HTTPException, Request
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
 from fastapi.responses import StreamingResponse
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime, timezone
-import asyncio
-import json
 import logging
 
+from ..config import HEART_RATE_BATCH_MAX
 from ..models.signal import HeartRateIn
-from ..storage.database import append_heart_rate, read_latest
+from ..storage.backend import append_heart_rate, append_heart_rates, read_latest, read_range
+from ..storage.rollups import TIERS, newest_window, pick_tier, rollups
 from ..services import signal_service as svc
 from ..services.arduino_service import send_heart_rate_to_arduino
+from ..services.fanout import SharedEvent
+from ..services.jsoncodec import dumps
+from ..services.mailbox import KEEPALIVE
+from ..services.stream_hub import stream_id_key
 
 logger = logging.getLogger(__name__)
 
 
 router = APIRouter()
 
+HISTORY_DEFAULT_WINDOW_MS = 10 * 60 * 1000
+HISTORY_MAX_LIMIT = 10000
+
 
 async def get_user_id(
     x_user_id: Optional[str] = Header(None), userId: Optional[str] = None
@@ -33,16 +40,17 @@ async def post_heart_rate(payload: HeartRateIn, user_id: str = Depends(get_user_
     logger.info(msg)
 
     await append_heart_rate(user_id, data)
+    await rollups.observe(user_id, [data])
     event = {"id": payload.ts, "type": "hr", "data": data}
-    await svc.set_latest(user_id, data)
-    await svc.publish(user_id, event)
+    # Latest value + publish in one round trip
+    await svc.set_latest_and_publish(user_id, data, [event])
 
-    # Send heart rate to Arduino device
+    # Queue heart rate for the Arduino device (written in the background)
     try:
-        arduino_success = await send_heart_rate_to_arduino(payload.bpm)
-        if arduino_success:
+        arduino_queued = await send_heart_rate_to_arduino(payload.bpm, user_id)
+        if arduino_queued:
             logger.info(
-                f"💓 Heart rate {payload.bpm} BPM sent to Arduino for user {user_id}"
+                f"💓 Heart rate {payload.bpm} BPM queued for Arduino for user {user_id}"
             )
     except Exception as e:
         # Don't fail the request if Arduino communication fails
@@ -55,49 +63,174 @@ async def post_heart_rate(payload: HeartRateIn, user_id: str = Depends(get_user_
     }
 
 
+@router.post("/api/heart_rate/batch")
+async def post_heart_rate_batch(
+    payload: List[HeartRateIn], user_id: str = Depends(get_user_id)
+):
+    """Ingest a buffered backlog of samples (e.g. flushed by a watch) in one request."""
+    if len(payload) > HEART_RATE_BATCH_MAX:
+        raise HTTPException(
+            status_code=413,
+            detail=f"at most {HEART_RATE_BATCH_MAX} samples per batch, got {len(payload)}",
+        )
+    if not payload:
+        return {"ok": True, "userId": user_id, "count": 0}
+
+    samples = sorted(payload, key=lambda p: p.ts)
+    records = [p.model_dump() for p in samples]
+    newest = samples[-1]
+    msg = (
+        f"[HR] batch user={user_id} count={len(samples)} "
+        f"newest_ts={newest.ts} bpm={newest.bpm} device={newest.device or '-'}"
+    )
+    print(msg)
+    logger.info(msg)
+
+    await append_heart_rates(user_id, records)
+    await rollups.observe(user_id, records)
+    events = [{"id": r["ts"], "type": "hr", "data": r} for r in records]
+    await svc.set_latest_and_publish(user_id, records[-1], events)
+
+    # Only the newest value matters for the device; intermediate ones are stale
+    try:
+        arduino_queued = await send_heart_rate_to_arduino(newest.bpm, user_id)
+        if arduino_queued:
+            logger.info(
+                f"💓 Heart rate {newest.bpm} BPM queued for Arduino for user {user_id}"
+            )
+    except Exception as e:
+        logger.warning(f"Failed to send heart rate to Arduino: {e}")
+
+    return {
+        "ok": True,
+        "userId": user_id,
+        "count": len(samples),
+        "received_at": int(datetime.now(timezone.utc).timestamp() * 1000),
+    }
+
+
+@router.get("/api/heart_rate/history")
+async def get_heart_rate_history(
+    userId: str,
+    from_ts: Optional[int] = Query(None, alias="from", description="epoch ms, inclusive"),
+    to_ts: Optional[int] = Query(None, alias="to", description="epoch ms, inclusive"),
+    limit: int = Query(1000, ge=1, le=HISTORY_MAX_LIMIT),
+    resolution: str = Query("raw", description="raw, 1s, 1m, 1h or auto"),
+    points: Optional[int] = Query(
+        None, ge=1, le=HISTORY_MAX_LIMIT, description="target point count for resolution=auto"
+    ),
+):
+    """
+    Samples for one user in a time range (defaults to the last 10 minutes).
+
+    With a rollup resolution each item is a bucket {ts, min, max, mean, count}.
+    `resolution=auto` picks the finest tier with at most `points` buckets
+    (default and cap: `limit`) over the range; if even the coarsest tier has
+    more, the newest ones are returned.
+    """
+    if not userId:
+        raise HTTPException(status_code=400, detail="userId is required")
+    end = to_ts if to_ts is not None else int(datetime.now(timezone.utc).timestamp() * 1000)
+    start = from_ts if from_ts is not None else end - HISTORY_DEFAULT_WINDOW_MS
+    if start > end:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
+    if resolution == "auto":
+        target = min(points or limit, limit)
+        resolution = pick_tier(start, end, target)
+        start = newest_window(resolution, start, end, target)
+    elif resolution != "raw" and resolution not in TIERS:
+        raise HTTPException(
+            status_code=400, detail=f"resolution must be raw, auto or one of {list(TIERS)}"
+        )
+
+    if resolution == "raw":
+        samples = await read_range(userId, start, end, limit)
+    else:
+        samples = await rollups.read_range(userId, resolution, start, end, limit)
+    return {
+        "userId": userId,
+        "from": start,
+        "to": end,
+        "resolution": resolution,
+        "count": len(samples),
+        "samples": samples,
+    }
+
+
+KEEPALIVE_FRAME = b":keepalive\n\n"
+
+
+def _sse_frame(obj) -> bytes:
+    """
+    Encoded SSE frame for an event. A fanned-out event is encoded once and
+    the bytes are shared by every stream it was delivered to.
+    """
+    if isinstance(obj, SharedEvent) and obj.encoded is not None:
+        return obj.encoded
+    ev_id = obj.get("id", "")
+    ev_type = obj.get("type", "message")
+    frame = b"id: %s\nevent: %s\ndata: %s\n\n" % (
+        str(ev_id).encode("utf-8"),
+        str(ev_type).encode("utf-8"),
+        dumps(obj.get("data")),
+    )
+    if isinstance(obj, SharedEvent):
+        obj.encoded = frame
+    return frame
+
+
+async def _stream(mailbox, seen=None):
+    """
+    SSE frames from a subscriber mailbox. Sleeps until an event or the shared
+    keepalive tick arrives; a client disconnect cancels the consuming
+    generator (Starlette's disconnect listener, or a failed write on the next
+    keepalive). Events whose stream id is <= `seen` are skipped.
+    """
+    while True:
+        obj = await mailbox.get()
+        if obj is KEEPALIVE:
+            yield KEEPALIVE_FRAME
+            continue
+        if seen is not None:
+            key = stream_id_key(obj.get("id"))
+            if key is not None and key <= seen:
+                continue
+        yield _sse_frame(obj)
+
+
 @router.get("/events")
-async def sse(request: Request, userId: str):
+async def sse(userId: str, last_event_id: Optional[str] = Header(None)):
     if not userId:
         raise HTTPException(status_code=400, detail="userId is required")
 
     async def event_gen():
-        try:
-            latest_obj = await svc.get_latest(userId)
-            latest = json.dumps(latest_obj) if latest_obj else None
-            if not latest:
-                csv_latest = await read_latest(userId)
-                if csv_latest:
-                    latest = json.dumps(csv_latest)
-            if latest:
-                yield f"id: init\nevent: hr\ndata: {latest}\n\n"
-
-            async def heartbeat():
-                while True:
-                    yield ":keepalive\n\n"
-                    await asyncio.sleep(20)
-
-            hb_iter = heartbeat().__anext__()
-            q, unsubscribe = await svc.subscribe(userId)
+        # Reconnect with a resumable id: subscribe first, then replay the gap,
+        # then skip live events the replay already covered
+        if svc.supports_replay() and stream_id_key(last_event_id) is not None:
+            mailbox, unsubscribe = await svc.subscribe(userId)
             try:
-                while True:
-                    if await request.is_disconnected():
-                        break
-                    try:
-                        obj = await asyncio.wait_for(q.get(), timeout=1.0)
-                        ev_id = obj.get("id", "")
-                        ev_type = obj.get("type", "message")
-                        ev_data = json.dumps(obj.get("data"))
-                        yield f"id: {ev_id}\nevent: {ev_type}\ndata: {ev_data}\n\n"
-                    except asyncio.TimeoutError:
-                        try:
-                            yield await hb_iter
-                            hb_iter = heartbeat().__anext__()
-                        except StopAsyncIteration:
-                            pass
+                replayed = await svc.replay(userId, last_event_id)
+                for obj in replayed:
+                    yield _sse_frame(obj)
+                seen = stream_id_key(replayed[-1]["id"] if replayed else last_event_id)
+                async for frame in _stream(mailbox, seen):
+                    yield frame
             finally:
                 unsubscribe()
+            return
+
+        latest = await svc.get_latest(userId)
+        if not latest:
+            latest = await read_latest(userId)
+        if latest:
+            yield _sse_frame({"id": "init", "type": "hr", "data": latest})
+
+        mailbox, unsubscribe = await svc.subscribe(userId)
+        try:
+            async for frame in _stream(mailbox):
+                yield frame
         finally:
-            pass
+            unsubscribe()
 
     headers = {
         "Cache-Control": "no-cache, no-transform",
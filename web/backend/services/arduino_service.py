@@ -5,63 +5,166 @@ Manages serial connection to ESP32 for heart rate control
 import serial
 import asyncio
 import logging
-from typing import Optional
-from ..config import ARDUINO_PORT, ARDUINO_BAUDRATE, ARDUINO_ENABLED
+import random
+import time
+from typing import Any, Dict, Optional
+from ..config import (
+    ARDUINO_PORT,
+    ARDUINO_BAUDRATE,
+    ARDUINO_ENABLED,
+    ARDUINO_RESET_DELAY,
+    ARDUINO_RECONNECT_MIN,
+    ARDUINO_RECONNECT_MAX,
+    ARDUINO_PROTOCOL,
+    ARDUINO_ACK_TIMEOUT,
+    ARDUINO_LATENCY_WINDOW,
+)
+from .serial_protocol import AckParser, LatencyTracker, encode_set_bpm
 
 logger = logging.getLogger(__name__)
 
 
 class ArduinoService:
-    def __init__(self):
+    """
+    Owns one serial link to a MagHeart board.
+
+    A supervisor task opens the port, waits out the board reset, and on any
+    failure reconnects with exponential backoff and jitter. Request handlers
+    never touch the port: they hand values to the writer via
+    submit_heart_rate(), which fails fast while the link is down.
+
+    With ARDUINO_PROTOCOL=framed each value goes out as a sequenced,
+    checksummed frame (see serial_protocol); a reader task matches the
+    board's acks to sends and keeps host->magnet round-trip percentiles.
+    """
+
+    def __init__(self, port: Optional[str] = None, baudrate: Optional[int] = None):
         self.serial_port: Optional[serial.Serial] = None
         self.enabled = ARDUINO_ENABLED
-        self.port = ARDUINO_PORT
-        self.baudrate = ARDUINO_BAUDRATE
+        self.port = ARDUINO_PORT if port is None else port
+        self.baudrate = baudrate or ARDUINO_BAUDRATE
         self._lock = asyncio.Lock()
-        
-    async def connect(self):
-        """Initialize serial connection to Arduino"""
+        # Latest-wins slot consumed by the background writer task
+        self._pending_bpm: Optional[int] = None
+        self._pending_event = asyncio.Event()
+        self._writer_task: Optional[asyncio.Task] = None
+        # Connection supervisor state
+        self._supervisor_task: Optional[asyncio.Task] = None
+        self._link_lost = asyncio.Event()
+        self.state = "disabled" if not self.enabled else "idle"
+        self.last_error: Optional[str] = None
+        self.reconnect_attempts = 0
+        self.next_retry_at: Optional[float] = None
+        self.connected_since: Optional[float] = None
+        # Framed protocol state
+        self.protocol = ARDUINO_PROTOCOL
+        self._seq = 0
+        self._reader_task: Optional[asyncio.Task] = None
+        self.latency = LatencyTracker(window=ARDUINO_LATENCY_WINDOW, ack_timeout=ARDUINO_ACK_TIMEOUT)
+
+    # ---- Connection supervision --------------------------------------------
+
+    def start(self):
+        """Start the connection supervisor (returns immediately)."""
         if not self.enabled:
             logger.info("🔌 Arduino communication disabled (ARDUINO_ENABLED=false)")
-            return False
-            
+            return
         if not self.port:
             logger.warning("⚠️  Arduino port not configured (ARDUINO_PORT not set)")
-            return False
-        
+            self.state = "unconfigured"
+            return
+        if self._supervisor_task is None or self._supervisor_task.done():
+            self._supervisor_task = asyncio.create_task(self._supervise())
+
+    async def _supervise(self):
+        while True:
+            self.state = "connecting"
+            if await self.connect():
+                self.reconnect_attempts = 0
+                self.next_retry_at = None
+                self.state = "connected"
+                self.connected_since = time.time()
+                self._link_lost.clear()
+                if self.protocol == "framed":
+                    self._reader_task = asyncio.create_task(self._reader_loop(self.serial_port))
+                await self._link_lost.wait()
+                logger.warning(f"⚠️  Arduino link on {self.port} lost, reconnecting")
+                await self._stop_reader()
+                self._close_port()
+                self.connected_since = None
+
+            self.reconnect_attempts += 1
+            delay = min(
+                ARDUINO_RECONNECT_MAX,
+                ARDUINO_RECONNECT_MIN * 2 ** min(self.reconnect_attempts - 1, 16),
+            )
+            delay *= random.uniform(0.5, 1.0)
+            self.state = "backoff"
+            self.next_retry_at = time.time() + delay
+            await asyncio.sleep(delay)
+
+    async def connect(self):
+        """Single attempt to open the serial connection to Arduino"""
         try:
             # Close existing connection if any
-            if self.serial_port and self.serial_port.is_open:
-                self.serial_port.close()
-            
-            # Open new connection
-            self.serial_port = serial.Serial(
+            self._close_port()
+
+            # Open new connection (blocking open runs off the event loop)
+            self.serial_port = await asyncio.to_thread(
+                serial.Serial,
                 port=self.port,
                 baudrate=self.baudrate,
                 timeout=1
             )
-            
+
             # Wait for Arduino to initialize
-            await asyncio.sleep(2)
-            
+            await asyncio.sleep(ARDUINO_RESET_DELAY)
+
             # Clear any buffered data
             if self.serial_port.in_waiting:
-                self.serial_port.read_all()
-            
+                await asyncio.to_thread(self.serial_port.read_all)
+
+            self.last_error = None
             logger.info(f"✅ Arduino connected on {self.port} @ {self.baudrate} baud")
             return True
-            
+
         except serial.SerialException as e:
             logger.error(f"❌ Failed to connect to Arduino on {self.port}: {e}")
+            self.last_error = str(e)
             self.serial_port = None
             return False
         except Exception as e:
             logger.error(f"❌ Unexpected error connecting to Arduino: {e}")
+            self.last_error = str(e)
             self.serial_port = None
             return False
-    
+
+    def _close_port(self):
+        if self.serial_port is not None:
+            try:
+                if self.serial_port.is_open:
+                    self.serial_port.close()
+            except Exception:
+                pass
+        self.serial_port = None
+
+    def _mark_lost(self, error: Exception):
+        self.last_error = str(error)
+        self.state = "lost"
+        self._link_lost.set()
+
     async def disconnect(self):
-        """Close serial connection"""
+        """Stop background tasks and close serial connection"""
+        for task in (self._supervisor_task, self._writer_task):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._supervisor_task = None
+        self._writer_task = None
+        await self._stop_reader()
         if self.serial_port and self.serial_port.is_open:
             try:
                 # Send 0 to stop heartbeat before disconnecting
@@ -71,112 +174,212 @@ class ArduinoService:
             except Exception as e:
                 logger.error(f"Error disconnecting Arduino: {e}")
         self.serial_port = None
-    
+        self.state = "disabled" if not self.enabled else "idle"
+
     def is_connected(self) -> bool:
         """Check if Arduino is connected"""
         return (
-            self.enabled and 
-            self.serial_port is not None and 
+            self.enabled and
+            self.serial_port is not None and
             self.serial_port.is_open
         )
-    
+
+    def status(self) -> Dict[str, Any]:
+        """Connection state snapshot for the status endpoint"""
+        return {
+            "connected": self.is_connected(),
+            "enabled": self.enabled,
+            "port": self.port,
+            "baudrate": self.baudrate,
+            "state": self.state,
+            "lastError": self.last_error,
+            "reconnectAttempts": self.reconnect_attempts,
+            "nextRetryAt": self.next_retry_at,
+            "connectedSince": self.connected_since,
+            "protocol": self.protocol,
+            "latency": self.latency.stats() if self.protocol == "framed" else None,
+        }
+
+    # ---- Ack reader (framed protocol) --------------------------------------
+
+    async def _reader_loop(self, port: serial.Serial):
+        """Read acks off `port` until it is closed or replaced."""
+        parser = AckParser()
+        while True:
+            try:
+                data = await asyncio.to_thread(self._read_available, port)
+            except serial.SerialException as e:
+                if self.serial_port is port:
+                    logger.error(f"❌ Serial read error: {e}")
+                    self._mark_lost(e)
+                return
+            except Exception as e:
+                if self.serial_port is not port:
+                    return
+                logger.error(f"❌ Error reading from Arduino: {e}")
+                await asyncio.sleep(1.0)
+                continue
+            for seq, status in parser.feed(data):
+                rtt = self.latency.ack(seq, status)
+                if rtt is not None:
+                    logger.debug(f"Arduino ack seq={seq} status={status} rtt={rtt * 1000:.1f}ms")
+
+    @staticmethod
+    def _read_available(port: serial.Serial) -> bytes:
+        """Blocking: wait up to the port timeout for bytes, return what arrived."""
+        return port.read(max(1, port.in_waiting))
+
+    async def _stop_reader(self):
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            try:
+                await self._reader_task
+            except asyncio.CancelledError:
+                pass
+            self._reader_task = None
+
+    # ---- Output -------------------------------------------------------------
+
+    def submit_heart_rate(self, bpm: int) -> bool:
+        """
+        Hand a BPM value to the background writer and return immediately.
+
+        Only the newest value is kept: if the writer is still busy with a
+        previous write, an older pending value is overwritten (stale heart
+        rates are useless to the magnet). Returns False without queueing when
+        output is disabled or the link is down.
+        """
+        if not self.is_connected():
+            return False
+        self._pending_bpm = max(0, min(200, bpm))
+        self._pending_event.set()
+        if self._writer_task is None or self._writer_task.done():
+            self._writer_task = asyncio.create_task(self._writer_loop())
+        return True
+
+    async def _writer_loop(self):
+        while True:
+            await self._pending_event.wait()
+            self._pending_event.clear()
+            bpm, self._pending_bpm = self._pending_bpm, None
+            if bpm is None:
+                continue
+            await self.send_heart_rate(bpm)
+
     async def send_heart_rate(self, bpm: int) -> bool:
         """
-        Send heart rate (BPM) to Arduino
-        
+        Send heart rate (BPM) to Arduino and wait for the write to finish.
+        Serial I/O runs in a worker thread so the event loop never blocks.
+        Request handlers should use submit_heart_rate() instead.
+
         Args:
             bpm: Heart rate in beats per minute (0-200)
-            
+
         Returns:
-            True if sent successfully, False otherwise
+            True if sent successfully, False otherwise (including while the
+            supervisor is reconnecting)
         """
         if not self.is_connected():
-            if self.enabled:
-                logger.debug("Arduino not connected, attempting to connect...")
-                await self.connect()
-                if not self.is_connected():
-                    return False
-            else:
-                return False
-        
+            return False
+
         try:
             async with self._lock:
                 # Validate BPM range
                 bpm = max(0, min(200, bpm))
-                
+
+                if self.protocol == "framed":
+                    self._seq = (self._seq + 1) & 0xFF
+                    # Stamp before writing: the ack can beat the worker thread back
+                    self.latency.sent(self._seq)
+                    await asyncio.to_thread(self._write_frame, encode_set_bpm(self._seq, bpm))
+                    logger.info(f"💓 Sent to Arduino: BPM={bpm} seq={self._seq}")
+                    return True
+
                 # Send BPM followed by newline
-                message = f"{bpm}\n"
-                self.serial_port.write(message.encode('utf-8'))
-                self.serial_port.flush()
-                
+                message = f"{bpm}\n".encode('utf-8')
+                response = await asyncio.to_thread(self._write_and_drain, message)
+
                 # Log the command
                 logger.info(f"💓 Sent to Arduino: BPM={bpm}")
-                
-                # Read response (optional, non-blocking)
-                await asyncio.sleep(0.05)  # Small delay for Arduino to respond
-                if self.serial_port.in_waiting > 0:
-                    response = self.serial_port.read(self.serial_port.in_waiting).decode('utf-8', errors='ignore')
-                    if response.strip():
-                        logger.debug(f"Arduino response: {response.strip()}")
-                
+                if response:
+                    logger.debug(f"Arduino response: {response}")
+
                 return True
-                
+
         except serial.SerialException as e:
             logger.error(f"❌ Serial communication error: {e}")
-            # Try to reconnect
-            await self.connect()
+            # Let the supervisor reconnect in the background
+            self._mark_lost(e)
             return False
         except Exception as e:
             logger.error(f"❌ Error sending heart rate to Arduino: {e}")
             return False
-    
+
+    def _write_and_drain(self, message: bytes) -> str:
+        """Blocking: write one message, then collect whatever the board already replied."""
+        self.serial_port.write(message)
+        self.serial_port.flush()
+        if self.serial_port.in_waiting > 0:
+            return self.serial_port.read(self.serial_port.in_waiting).decode('utf-8', errors='ignore').strip()
+        return ""
+
+    def _write_frame(self, frame: bytes) -> None:
+        """Blocking: write one frame; the ack is picked up by the reader task."""
+        self.serial_port.write(frame)
+        self.serial_port.flush()
+
     async def send_command(self, command: str) -> bool:
         """
         Send raw command to Arduino
-        
+
         Args:
             command: Command string to send
-            
+
         Returns:
             True if sent successfully, False otherwise
         """
         if not self.is_connected():
             return False
-        
+
         try:
             async with self._lock:
-                self.serial_port.write(f"{command}\n".encode('utf-8'))
-                self.serial_port.flush()
+                # In framed mode the reader task owns the input side of the port
+                write = self._write_frame if self.protocol == "framed" else self._write_and_drain
+                await asyncio.to_thread(write, f"{command}\n".encode('utf-8'))
                 logger.debug(f"Sent command to Arduino: {command}")
                 return True
+        except serial.SerialException as e:
+            logger.error(f"Error sending command to Arduino: {e}")
+            self._mark_lost(e)
+            return False
         except Exception as e:
             logger.error(f"Error sending command to Arduino: {e}")
             return False
 
 
-# Global singleton instance
-_arduino_service: Optional[ArduinoService] = None
-
-
 async def get_arduino_service() -> ArduinoService:
-    """Get or create the global Arduino service instance"""
-    global _arduino_service
-    if _arduino_service is None:
-        _arduino_service = ArduinoService()
-        await _arduino_service.connect()
-    return _arduino_service
+    """Get the default (ARDUINO_PORT) device from the device registry"""
+    from .device_registry import device_registry
+
+    device_registry.start()
+    return device_registry.default_device()
 
 
-async def send_heart_rate_to_arduino(bpm: int) -> bool:
+async def send_heart_rate_to_arduino(bpm: int, user_id: Optional[str] = None) -> bool:
     """
-    Convenience function to send heart rate to Arduino
-    
+    Convenience function to queue a heart rate for the device routed for
+    `user_id` (see DeviceRegistry; the default device if unrouted).
+    Returns as soon as the value is queued; the write happens in the
+    background and newer values replace older unsent ones.
+
     Args:
         bpm: Heart rate in beats per minute
-        
+        user_id: Whose heart rate this is, used for device routing
+
     Returns:
-        True if sent successfully, False otherwise
+        True if queued, False if Arduino output is disabled or disconnected
     """
-    service = await get_arduino_service()
-    return await service.send_heart_rate(bpm)
+    from .device_registry import device_registry
 
+    device_registry.start()
+    return await device_registry.submit(user_id, bpm)
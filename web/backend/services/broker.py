@@ -0,0 +1,117 @@
+"""
+Broker interface behind signal_service, plus the in-process implementation.
+
+A broker owns the "latest sample" per user and the real-time event fan-out:
+set_latest / get_latest / publish / set_latest_and_publish / subscribe, and
+optionally replay for SSE Last-Event-ID resume.
+"""
+import itertools
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Iterable, List, Tuple
+
+from .fanout import FanoutHub
+from .latest_cache import LatestCache
+from .mailbox import Mailbox
+from .stream_hub import stream_id_key
+
+
+class Broker(ABC):
+    @abstractmethod
+    async def set_latest(self, user_id: str, data: Any) -> None:
+        ...
+
+    @abstractmethod
+    async def get_latest(self, user_id: str) -> Any:
+        ...
+
+    async def publish(self, user_id: str, event: Any) -> None:
+        await self.set_latest_and_publish(user_id, None, [event])
+
+    @abstractmethod
+    async def set_latest_and_publish(self, user_id: str, latest: Any, events: Iterable[Any]) -> None:
+        """Update the latest value (unless None) and publish events together."""
+
+    @abstractmethod
+    async def subscribe(self, user_id: str) -> Tuple[Mailbox, Callable[[], None]]:
+        ...
+
+    @abstractmethod
+    async def attach(self, user_id: str, sink: Any) -> Callable[[], None]:
+        """Deliver a user's events to a mailbox-like sink; returns its unsubscribe."""
+
+    def supports_replay(self) -> bool:
+        return False
+
+    async def replay(self, user_id: str, last_event_id: str) -> List[Any]:
+        return []
+
+    async def close(self) -> None:
+        pass
+
+
+class MemoryBroker(Broker):
+    """
+    Single-process broker: latest values live in a TTL'd LRU and events are
+    handed straight to local subscriber mailboxes, with no encoding and no
+    network hop. Only valid when ingest and SSE share one process.
+
+    With `replay_size` > 0 each user keeps a ring of recent events with
+    stream-style ids ("<ms>-<seq>") so Last-Event-ID resume works as with
+    the Redis Streams transport.
+    """
+
+    def __init__(
+        self,
+        latest_ttl: float,
+        latest_size: int,
+        replay_size: int = 0,
+        **hub_options: Any,
+    ) -> None:
+        self._latest = LatestCache(ttl=latest_ttl, max_size=latest_size)
+        self._hub = FanoutHub(**hub_options)
+        self._replay_size = replay_size
+        # user_id -> recent events (only when replay is enabled)
+        self._history: Dict[str, Deque[Any]] = {}
+        self._seq = itertools.count()
+
+    async def set_latest(self, user_id: str, data: Any) -> None:
+        self._latest.put(user_id, data)
+
+    async def get_latest(self, user_id: str) -> Any:
+        return self._latest.get(user_id)
+
+    async def set_latest_and_publish(self, user_id: str, latest: Any, events: Iterable[Any]) -> None:
+        if latest is not None:
+            self._latest.put(user_id, latest)
+        for event in events:
+            if self._replay_size:
+                if isinstance(event, dict):
+                    event = {**event, "id": f"{int(time.time() * 1000)}-{next(self._seq)}"}
+                ring = self._history.get(user_id)
+                if ring is None:
+                    ring = self._history[user_id] = deque(maxlen=self._replay_size)
+                ring.append(event)
+            self._hub.fan_out(user_id, event)
+
+    async def subscribe(self, user_id: str) -> Tuple[Mailbox, Callable[[], None]]:
+        return await self._hub.subscribe(user_id)
+
+    async def attach(self, user_id: str, sink: Any) -> Callable[[], None]:
+        return await self._hub.attach(user_id, sink)
+
+    def supports_replay(self) -> bool:
+        return self._replay_size > 0
+
+    async def replay(self, user_id: str, last_event_id: str) -> List[Any]:
+        after = stream_id_key(last_event_id)
+        if after is None:
+            return []
+        return [
+            e for e in self._history.get(user_id, ())
+            if (stream_id_key(e.get("id")) or (0, 0)) > after
+        ]
+
+    async def close(self) -> None:
+        await self._hub.close()
@@ -0,0 +1,240 @@
+"""
+Registry of MagHeart boxes (serial devices) and the routing of users to them.
+
+Each port gets its own ArduinoService, so every device has an independent
+supervisor and writer and one slow or unplugged board never holds up the
+others. Heart rates are routed by, in order:
+
+1. an explicit user route            (userId -> port)
+2. a meeting/participant pair route  ((meetingId, userId) -> port), applied
+   while the user is a participant of that meeting (looked up in the shared
+   meeting state when this worker doesn't mirror the meeting)
+3. the default device (ARDUINO_PORT), if configured
+
+With ARDUINO_DISCOVERY enabled, ports matching ARDUINO_DISCOVERY_GLOBS are
+picked up (and dropped when unplugged and unrouted) by a periodic scan.
+
+Routes may only name a configured port (ARDUINO_PORT / ARDUINO_ROUTES) or one
+currently present under ARDUINO_DISCOVERY_GLOBS. A device that no route
+references any more is stopped, unless discovery is keeping it.
+"""
+import asyncio
+import glob
+import logging
+from typing import Any, Dict, List, Optional, Set
+
+from ..config import (
+    ARDUINO_ENABLED,
+    ARDUINO_PORT,
+    ARDUINO_ROUTES,
+    ARDUINO_DISCOVERY,
+    ARDUINO_DISCOVERY_GLOBS,
+    ARDUINO_DISCOVERY_INTERVAL,
+)
+from .arduino_service import ArduinoService
+from .fanout import spawn
+
+logger = logging.getLogger(__name__)
+
+
+class DeviceRegistry:
+    def __init__(self) -> None:
+        self.devices: Dict[str, ArduinoService] = {}
+        self.default_port: Optional[str] = ARDUINO_PORT or None
+        # userId -> port
+        self.user_routes: Dict[str, str] = dict(ARDUINO_ROUTES)
+        # userId -> {meetingId: port}
+        self.pair_routes: Dict[str, Dict[str, str]] = {}
+        self._discovery_task: Optional[asyncio.Task] = None
+        self._placeholder: Optional[ArduinoService] = None
+        self._started = False
+
+    # ---- Lifecycle --------------------------------------------------------
+
+    def start(self) -> None:
+        if self._started:
+            return
+        self._started = True
+        if not ARDUINO_ENABLED:
+            logger.info("🔌 Arduino communication disabled (ARDUINO_ENABLED=false)")
+            return
+        for port in {self.default_port, *self.user_routes.values()}:
+            if port:
+                self.ensure_device(port)
+        if ARDUINO_DISCOVERY:
+            self._discovery_task = asyncio.create_task(self._discovery_loop())
+
+    async def close(self) -> None:
+        if self._discovery_task is not None:
+            self._discovery_task.cancel()
+            try:
+                await self._discovery_task
+            except asyncio.CancelledError:
+                pass
+            self._discovery_task = None
+        await asyncio.gather(*(d.disconnect() for d in self.devices.values()))
+        self._started = False
+
+    # ---- Devices ----------------------------------------------------------
+
+    def ensure_device(self, port: str) -> ArduinoService:
+        device = self.devices.get(port)
+        if device is None:
+            device = ArduinoService(port=port)
+            self.devices[port] = device
+            device.start()
+        return device
+
+    def default_device(self) -> ArduinoService:
+        if ARDUINO_ENABLED and self.default_port:
+            return self.ensure_device(self.default_port)
+        # Disabled/unconfigured placeholder so status endpoints have something to report
+        if self._placeholder is None:
+            self._placeholder = ArduinoService(port=self.default_port or "")
+        return self._placeholder
+
+    def release(self, port: str) -> None:
+        device = self.devices.pop(port, None)
+        if device is not None:
+            spawn(device.disconnect())
+
+    def present_ports(self) -> Set[str]:
+        """Serial ports currently matching ARDUINO_DISCOVERY_GLOBS."""
+        present: Set[str] = set()
+        for pattern in ARDUINO_DISCOVERY_GLOBS:
+            present.update(glob.glob(pattern))
+        return present
+
+    def allowed_ports(self) -> Set[str]:
+        """Ports a route may name: configured ones plus those present now."""
+        configured = {self.default_port, *ARDUINO_ROUTES.values()}
+        return {p for p in configured if p} | self.present_ports()
+
+    def scan(self) -> List[str]:
+        """Reconcile devices with the ports currently present. Returns new ports."""
+        present = self.present_ports()
+        added = [p for p in sorted(present) if p not in self.devices]
+        for port in added:
+            logger.info(f"🔌 Discovered serial device {port}")
+            self.ensure_device(port)
+        routed = self._routed_ports()
+        for port, device in list(self.devices.items()):
+            if port not in present and port not in routed and not device.is_connected():
+                logger.info(f"🔌 Serial device {port} gone, releasing")
+                self.release(port)
+        return added
+
+    async def _discovery_loop(self) -> None:
+        while True:
+            try:
+                self.scan()
+            except Exception as e:
+                logger.warning(f"Serial discovery failed: {e}")
+            await asyncio.sleep(ARDUINO_DISCOVERY_INTERVAL)
+
+    # ---- Routing ----------------------------------------------------------
+
+    def _routed_ports(self) -> Set[str]:
+        ports = {self.default_port, *self.user_routes.values()}
+        for meetings in self.pair_routes.values():
+            ports.update(meetings.values())
+        return {p for p in ports if p}
+
+    def _check_port(self, port: str) -> None:
+        if port not in self.allowed_ports():
+            raise ValueError(f"Unknown serial port {port!r}.")
+
+    def _release_unrouted(self, port: Optional[str]) -> None:
+        """Stop the device on `port` if nothing routes to it any more."""
+        if not port or port not in self.devices or port in self._routed_ports():
+            return
+        if ARDUINO_DISCOVERY and port in self.present_ports():
+            return  # still plugged in; discovery keeps it listed
+        logger.info(f"🔌 No routes left to {port}, releasing")
+        self.release(port)
+
+    def set_user_route(self, user_id: str, port: str) -> None:
+        """Route a user to `port`; ValueError if the port is not allowed."""
+        self._check_port(port)
+        old = self.user_routes.get(user_id)
+        self.user_routes[user_id] = port
+        if ARDUINO_ENABLED:
+            self.ensure_device(port)
+        self._release_unrouted(old)
+
+    def remove_user_route(self, user_id: str) -> bool:
+        port = self.user_routes.pop(user_id, None)
+        if port is None:
+            return False
+        self._release_unrouted(port)
+        return True
+
+    def set_pair_route(self, meeting_id: str, user_id: str, port: str) -> None:
+        """Route a meeting participant to `port`; ValueError if the port is not allowed."""
+        self._check_port(port)
+        meetings = self.pair_routes.setdefault(user_id, {})
+        old = meetings.get(meeting_id)
+        meetings[meeting_id] = port
+        if ARDUINO_ENABLED:
+            self.ensure_device(port)
+        self._release_unrouted(old)
+
+    def remove_pair_route(self, meeting_id: str, user_id: str) -> bool:
+        meetings = self.pair_routes.get(user_id)
+        if not meetings:
+            return False
+        port = meetings.pop(meeting_id, None)
+        if port is None:
+            return False
+        if not meetings:
+            del self.pair_routes[user_id]
+        self._release_unrouted(port)
+        return True
+
+    async def resolve_port(self, user_id: Optional[str]) -> Optional[str]:
+        if user_id:
+            port = self.user_routes.get(user_id)
+            if port:
+                return port
+            meetings = self.pair_routes.get(user_id)
+            if meetings:
+                from .meeting_manager import meeting_manager
+
+                # Meetings mirrored on another worker are checked in shared state
+                for meeting_id, port in meetings.items():
+                    try:
+                        if await meeting_manager.is_member(meeting_id, user_id):
+                            return port
+                    except Exception as e:
+                        logger.warning(
+                            f"⚠️  Could not check {user_id} in meeting {meeting_id}, not using its route: {e}"
+                        )
+        return self.default_port
+
+    async def submit(self, user_id: Optional[str], bpm: int) -> bool:
+        """Queue `bpm` on the device routed for `user_id`; False if none is up."""
+        if not ARDUINO_ENABLED:
+            return False
+        port = await self.resolve_port(user_id)
+        if not port:
+            return False
+        return self.ensure_device(port).submit_heart_rate(bpm)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "enabled": ARDUINO_ENABLED,
+            "defaultPort": self.default_port,
+            "discovery": ARDUINO_DISCOVERY,
+            "devices": [d.status() for _, d in sorted(self.devices.items())],
+            "routes": {
+                "users": dict(self.user_routes),
+                "meetings": [
+                    {"meetingId": m, "userId": u, "port": p}
+                    for u, meetings in self.pair_routes.items()
+                    for m, p in meetings.items()
+                ],
+            },
+        }
+
+
+device_registry = DeviceRegistry()
@@ -0,0 +1,135 @@
+import asyncio
+import logging
+from typing import Any, Callable, Coroutine, Dict, Optional, Set, Tuple
+
+from .mailbox import Mailbox
+
+logger = logging.getLogger(__name__)
+
+# Fire-and-forget tasks, referenced until done so they can't be collected early
+_background: Set[asyncio.Task] = set()
+
+
+class SharedEvent(dict):
+    """
+    The single event object handed to every local subscriber of a channel.
+    Behaves as a plain dict; `encoded` lets the first consumer memoize its
+    wire encoding so the rest reuse it.
+    """
+
+    __slots__ = ("encoded",)
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.encoded: Optional[bytes] = None
+
+
+class FanoutHub:
+    """
+    Process-local fan-out of events to subscriber mailboxes.
+
+    Keeps channel -> mailboxes, hands the same event object to every local
+    subscriber of a channel, and runs a single shared timer that pushes a
+    keepalive into every idle mailbox every `keepalive_interval` seconds, so
+    open streams need no per-client timers. Transport-backed hubs override
+    `_sync_channel` to follow the local subscriber count.
+    """
+
+    def __init__(
+        self,
+        on_message: Optional[Callable[[str, Any], None]] = None,
+        queue_size: int = 64,
+        latest_only: bool = False,
+        keepalive_interval: float = 20.0,
+    ) -> None:
+        self.on_message = on_message
+        self.queue_size = queue_size
+        self.latest_only = latest_only
+        self.keepalive_interval = keepalive_interval
+        self._ticker: Optional[asyncio.Task] = None
+        # channel -> local subscriber mailboxes
+        self._queues: Dict[str, Set[Mailbox]] = {}
+
+    async def subscribe(self, channel: str) -> Tuple[Mailbox, Callable[[], None]]:
+        q = Mailbox(self.queue_size, latest_only=self.latest_only)
+        unsubscribe = await self.attach(channel, q)
+        return q, unsubscribe
+
+    async def attach(self, channel: str, sink: Any) -> Callable[[], None]:
+        """
+        Register a mailbox-like sink (anything with put_nowait() and
+        keepalive()) on `channel`; returns its unsubscribe callback.
+        """
+        self._queues.setdefault(channel, set()).add(sink)
+        if self._ticker is None or self._ticker.done():
+            self._ticker = asyncio.create_task(self._keepalive_loop())
+        try:
+            await self._sync_channel(channel)
+        except Exception:
+            self._remove(channel, sink)
+            raise
+
+        def unsubscribe() -> None:
+            if self._remove(channel, sink):
+                spawn(self._sync_channel(channel))
+
+        return unsubscribe
+
+    def subscriber_count(self, channel: str) -> int:
+        return len(self._queues.get(channel, ()))
+
+    async def close(self) -> None:
+        await cancel_task(self._ticker)
+        self._ticker = None
+
+    # ---- Internals --------------------------------------------------------
+
+    def _remove(self, channel: str, q: Mailbox) -> bool:
+        """Drop a local mailbox; True if the channel has no local subscribers left."""
+        queues = self._queues.get(channel)
+        if queues is None:
+            return False
+        queues.discard(q)
+        if not queues:
+            del self._queues[channel]
+            return True
+        return False
+
+    async def _sync_channel(self, channel: str) -> None:
+        """Hook: follow the local subscriber count of `channel` (no-op locally)."""
+
+    def fan_out(self, channel: str, obj: Any) -> None:
+        if isinstance(obj, dict) and not isinstance(obj, SharedEvent):
+            obj = SharedEvent(obj)
+        if self.on_message is not None:
+            try:
+                self.on_message(channel, obj)
+            except Exception as e:
+                logger.warning(f"Fan-out on_message hook failed: {e}")
+        for q in list(self._queues.get(channel, ())):
+            q.put_nowait(obj)
+
+    async def _keepalive_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.keepalive_interval)
+            for queues in list(self._queues.values()):
+                for q in list(queues):
+                    q.keepalive()
+
+
+def spawn(coro: Coroutine[Any, Any, Any]) -> asyncio.Task:
+    """Run `coro` in the background without the caller keeping the task."""
+    task = asyncio.create_task(coro)
+    _background.add(task)
+    task.add_done_callback(_background.discard)
+    return task
+
+
+async def cancel_task(task: Optional[asyncio.Task]) -> None:
+    if task is None:
+        return
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
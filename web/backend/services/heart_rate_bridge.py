@@ -0,0 +1,120 @@
+"""
+Heart rates of meeting participants for the co-creation WebSocket.
+
+Given a `heart_rate_attach` (signal_service.attach for the app singleton),
+MeetingManager keeps one HeartRateBridge. It subscribes once per
+participant of every meeting with local sockets, and the meeting actor's
+flush sends the changed BPMs as one `heart_rates` frame per tick.
+"""
+import logging
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# (userId, sink) -> unsubscribe; signal_service.attach in production
+Attach = Callable[[str, Any], Awaitable[Callable[[], None]]]
+
+
+class _HeartRateSink:
+    """Mailbox stand-in on one user's event channel, feeding one meeting."""
+
+    __slots__ = ("bridge", "meeting_id", "user_id")
+
+    def __init__(self, bridge: "HeartRateBridge", meeting_id: str, user_id: str) -> None:
+        self.bridge = bridge
+        self.meeting_id = meeting_id
+        self.user_id = user_id
+
+    def put_nowait(self, obj: Any) -> None:
+        if isinstance(obj, dict) and obj.get("type") == "hr":
+            self.bridge._record(self.meeting_id, self.user_id, obj.get("data"))
+
+    def keepalive(self) -> None:
+        pass
+
+
+class HeartRateBridge:
+    """
+    Server-side fan-in of participants' heart rates into their meetings.
+
+    Holds one subscription per meeting participant on the heart-rate event
+    channel (the same one `/events` streams from) and keeps only the newest
+    sample per participant. `on_sample(meeting_id)` is called when a
+    participant's BPM differs from the one last taken for the meeting; its
+    owner then `take`s those samples, so any number of samples between two
+    ticks cost one frame and an unchanged BPM costs none.
+    """
+
+    def __init__(self, attach: Attach, on_sample: Callable[[str], None]) -> None:
+        self._attach = attach
+        self._on_sample = on_sample
+        # meetingId -> userId -> unsubscribe
+        self._subs: Dict[str, Dict[str, Callable[[], None]]] = {}
+        # meetingId -> userId -> {"bpm", "ts"}
+        self._latest: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        # meetingId -> userIds whose BPM differs from the one last taken
+        self._pending: Dict[str, Set[str]] = {}
+        # meetingId -> userId -> BPM last taken
+        self._sent: Dict[str, Dict[str, Any]] = {}
+
+    async def sync(self, meeting_id: str, user_ids: Iterable[str]) -> None:
+        """Subscribe to exactly `user_ids` for this meeting."""
+        wanted = set(user_ids)
+        subs = self._subs.setdefault(meeting_id, {})
+        for user_id in [u for u in subs if u not in wanted]:
+            subs.pop(user_id)()
+            self._latest.get(meeting_id, {}).pop(user_id, None)
+            self._pending.get(meeting_id, set()).discard(user_id)
+            self._sent.get(meeting_id, {}).pop(user_id, None)
+        for user_id in wanted.difference(subs):
+            try:
+                subs[user_id] = await self._attach(user_id, _HeartRateSink(self, meeting_id, user_id))
+            except Exception as e:
+                logger.warning(f"⚠️  Failed to subscribe to heart rate of {user_id} for {meeting_id}: {e}")
+        if not subs:
+            self.drop(meeting_id)
+
+    def drop(self, meeting_id: str) -> None:
+        for unsubscribe in self._subs.pop(meeting_id, {}).values():
+            unsubscribe()
+        self._latest.pop(meeting_id, None)
+        self._pending.pop(meeting_id, None)
+        self._sent.pop(meeting_id, None)
+
+    def latest(self, meeting_id: str) -> Dict[str, Dict[str, Any]]:
+        """Newest known sample of every subscribed participant."""
+        return self._latest.get(meeting_id, {})
+
+    def take(self, meeting_id: str) -> Optional[Dict[str, Dict[str, Any]]]:
+        """Samples whose BPM changed since the last call, or None."""
+        pending = self._pending.pop(meeting_id, None)
+        if not pending:
+            return None
+        latest = self._latest.get(meeting_id, {})
+        samples = {user_id: latest[user_id] for user_id in pending if user_id in latest}
+        sent = self._sent.setdefault(meeting_id, {})
+        for user_id, sample in samples.items():
+            sent[user_id] = sample["bpm"]
+        return samples
+
+    async def close(self) -> None:
+        for meeting_id in list(self._subs):
+            self.drop(meeting_id)
+
+    def _record(self, meeting_id: str, user_id: str, data: Any) -> None:
+        if not isinstance(data, dict) or data.get("bpm") is None:
+            return
+        latest = self._latest.setdefault(meeting_id, {})
+        current = latest.get(user_id)
+        ts = data.get("ts")
+        if current is not None and ts is not None and current["ts"] is not None and ts < current["ts"]:
+            return  # out-of-order sample from a batch or a slow worker
+        latest[user_id] = {"bpm": data["bpm"], "ts": ts}
+        pending = self._pending.setdefault(meeting_id, set())
+        sent = self._sent.get(meeting_id, {})
+        if user_id in sent and sent[user_id] == data["bpm"]:
+            pending.discard(user_id)  # back to what clients already have
+            return
+        if user_id not in pending:
+            pending.add(user_id)
+            self._on_sample(meeting_id)
@@ -0,0 +1,77 @@
+"""
+JSON encode/decode with the fastest available backend.
+
+orjson is preferred, then msgspec, then the stdlib `json` module; set
+MAGHEART_JSON to force one. All backends produce compact UTF-8 output, and
+values the fast backends reject (e.g. ints beyond 64 bits, or binary values
+from MessagePack clients, which become base64 strings) fall back to the
+stdlib encoder.
+"""
+import base64
+import json
+from typing import Any
+
+from ..config import JSON_BACKEND
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, (bytes, bytearray, memoryview)):
+        return base64.b64encode(obj).decode("ascii")
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _std_dumps(obj: Any) -> bytes:
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False, default=_default).encode("utf-8")
+
+
+def _load_backend(name: str):
+    if name == "orjson":
+        import orjson
+
+        return orjson.dumps, orjson.loads
+    if name == "msgspec":
+        import msgspec
+
+        encoder = msgspec.json.Encoder()
+        decoder = msgspec.json.Decoder()
+
+        def _msgspec_loads(data: Any) -> Any:
+            try:
+                return decoder.decode(data)
+            except msgspec.DecodeError as e:
+                raise ValueError(str(e)) from e
+
+        return encoder.encode, _msgspec_loads
+    return _std_dumps, json.loads
+
+
+def _select():
+    if JSON_BACKEND != "auto":
+        return JSON_BACKEND, _load_backend(JSON_BACKEND)
+    for name in ("orjson", "msgspec"):
+        try:
+            return name, _load_backend(name)
+        except ImportError:
+            continue
+    return "json", _load_backend("json")
+
+
+BACKEND, (_fast_dumps, _loads) = _select()
+
+
+def dumps(obj: Any) -> bytes:
+    """Encode to compact UTF-8 JSON bytes."""
+    try:
+        return _fast_dumps(obj)
+    except (TypeError, ValueError, OverflowError):
+        return _std_dumps(obj)
+
+
+def dumps_str(obj: Any) -> str:
+    """Encode to a compact JSON string (for text frames)."""
+    return dumps(obj).decode("utf-8")
+
+
+def loads(data: Any) -> Any:
+    """Decode JSON from str or bytes; malformed input raises ValueError."""
+    return _loads(data)
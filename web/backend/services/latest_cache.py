@@ -0,0 +1,51 @@
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+
+class LatestCache:
+    """
+    In-process LRU of the latest heart-rate sample per user.
+
+    Entries expire after `ttl` seconds, mirroring the Redis `latest_heart_rate`
+    key expiry, so a user who stops sending is not reported as live forever.
+    At most `max_size` users are kept; the least recently touched is evicted.
+    """
+
+    def __init__(self, ttl: float = 120.0, max_size: int = 10000) -> None:
+        self.ttl = ttl
+        self.max_size = max(1, max_size)
+        # user_id -> (expires_at monotonic, value)
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, user_id: str) -> Optional[Any]:
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[user_id]
+            return None
+        self._entries.move_to_end(user_id)
+        return value
+
+    def put(self, user_id: str, value: Any) -> None:
+        """Store `value` unless the cached sample is newer (by `ts`)."""
+        entry = self._entries.get(user_id)
+        if entry is not None and entry[0] > time.monotonic():
+            cur_ts = _ts(entry[1])
+            new_ts = _ts(value)
+            if cur_ts is not None and new_ts is not None and new_ts < cur_ts:
+                return
+        self._entries[user_id] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+
+def _ts(value: Any) -> Optional[int]:
+    if isinstance(value, dict):
+        ts = value.get("ts")
+        if isinstance(ts, int):
+            return ts
+    return None
@@ -0,0 +1,60 @@
+import asyncio
+from collections import deque
+from typing import Any, Deque
+
+# Sentinel handed out by Mailbox.get() when the shared keepalive timer fires
+KEEPALIVE = object()
+
+
+def _is_hr(obj: Any) -> bool:
+    return isinstance(obj, dict) and obj.get("type") == "hr"
+
+
+class Mailbox:
+    """
+    Bounded per-client event queue for SSE streams.
+
+    When full, the oldest event is dropped so a stalled client costs at most
+    `maxsize` events of memory. With `latest_only`, a new "hr" event replaces
+    a pending "hr" event at the tail instead of queueing behind it, so a slow
+    viewer jumps to the newest sample rather than replaying stale ones.
+    """
+
+    __slots__ = ("maxsize", "latest_only", "dropped", "_items", "_event", "_keepalive")
+
+    def __init__(self, maxsize: int = 64, latest_only: bool = False) -> None:
+        self.maxsize = max(1, maxsize)
+        self.latest_only = latest_only
+        self.dropped = 0
+        self._items: Deque[Any] = deque()
+        self._event = asyncio.Event()
+        self._keepalive = False
+
+    def put_nowait(self, obj: Any) -> None:
+        if self.latest_only and self._items and _is_hr(obj) and _is_hr(self._items[-1]):
+            self._items[-1] = obj
+            self.dropped += 1
+        else:
+            if len(self._items) >= self.maxsize:
+                self._items.popleft()
+                self.dropped += 1
+            self._items.append(obj)
+        self._event.set()
+
+    def keepalive(self) -> None:
+        """Request a keepalive; skipped when real events are already pending."""
+        if not self._items:
+            self._keepalive = True
+            self._event.set()
+
+    def qsize(self) -> int:
+        return len(self._items)
+
+    async def get(self) -> Any:
+        while not self._items and not self._keepalive:
+            self._event.clear()
+            await self._event.wait()
+        if self._items:
+            return self._items.popleft()
+        self._keepalive = False
+        return KEEPALIVE
@@ -0,0 +1,152 @@
+"""
+Per-meeting actors for MeetingManager.
+
+Every public call on a meeting, every presence expiry and every relayed
+delta for it runs as one operation in that meeting's inbox, in order, so
+handlers from concurrent sockets never interleave at their awaits. State
+changes only arm the actor's flush timer, so a burst of presence pings
+costs one encode and one fan-out per `broadcast_interval`; phase changes
+flush immediately.
+"""
+import asyncio
+import logging
+import zlib
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+Operation = Callable[..., Awaitable[Any]]
+
+
+def shard_for(meeting_id: str, shards: int) -> int:
+    """
+    Stable shard index of a meeting in [0, shards). Same answer in every
+    process (unlike hash()), so a proxy or worker pool can pin each meeting
+    to one event loop / process.
+    """
+    return zlib.crc32(meeting_id.encode("utf-8")) % max(1, shards)
+
+
+class MeetingActor:
+    """
+    Inbox and task that own one meeting.
+
+    Operations are coroutines run strictly one at a time in submission
+    order, each stamped with the next sequence number, so no two handlers
+    for the same meeting interleave at their awaits. The actor also owns the
+    meeting's coalesced state flush: `schedule_flush` arms one timer and the
+    flush runs as an ordinary operation when it fires. The task ends once
+    the inbox is empty, no flush is pending and `is_idle()` reports the
+    meeting gone; `on_exit` is then called.
+    """
+
+    __slots__ = (
+        "meeting_id", "seq", "_flush", "_is_idle", "_on_exit",
+        "_inbox", "_event", "_flush_at", "_task",
+    )
+
+    def __init__(
+        self,
+        meeting_id: str,
+        flush: Operation,
+        is_idle: Callable[[], bool],
+        on_exit: Callable[["MeetingActor"], None],
+    ) -> None:
+        self.meeting_id = meeting_id
+        # Operations applied so far; the last one applied is number `seq`
+        self.seq = 0
+        self._flush = flush
+        self._is_idle = is_idle
+        self._on_exit = on_exit
+        self._inbox: Deque[Tuple[Operation, Tuple[Any, ...], Optional[asyncio.Future]]] = deque()
+        self._event = asyncio.Event()
+        self._flush_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = asyncio.create_task(self._run())
+
+    async def call(self, op: Operation, *args: Any) -> Any:
+        """Run `op(*args)` after everything submitted before it; returns its result."""
+        future = asyncio.get_running_loop().create_future()
+        self._submit(op, args, future)
+        return await future
+
+    def post(self, op: Operation, *args: Any) -> None:
+        """Queue `op(*args)` without waiting for it; failures are logged."""
+        self._submit(op, args, None)
+
+    def schedule_flush(self, delay: float) -> None:
+        """Run the flush operation `delay` seconds from now, unless already armed."""
+        if self._flush_at is None:
+            self._flush_at = asyncio.get_running_loop().time() + delay
+            self._event.set()
+
+    def cancel_flush(self) -> None:
+        self._flush_at = None
+
+    @property
+    def flush_pending(self) -> bool:
+        return self._flush_at is not None
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        for _, _, future in self._inbox:
+            if future is not None and not future.done():
+                future.cancel()
+        self._inbox.clear()
+
+    # ---- Internals --------------------------------------------------------
+
+    def _submit(self, op: Operation, args: Tuple[Any, ...], future: Optional[asyncio.Future]) -> None:
+        if self._task is None:
+            raise RuntimeError(f"Meeting actor {self.meeting_id} is stopped.")
+        self._inbox.append((op, args, future))
+        self._event.set()
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            if not self._inbox:
+                if self._flush_at is None and self._is_idle():
+                    break
+                self._event.clear()
+                timeout = None if self._flush_at is None else self._flush_at - loop.time()
+                if timeout is None or timeout > 0:
+                    try:
+                        await asyncio.wait_for(self._event.wait(), timeout)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+            if self._flush_at is not None and self._flush_at <= loop.time():
+                self._flush_at = None
+                await self._apply(self._flush, (self.meeting_id,), None)
+                continue
+            # Applied even if the caller stopped waiting: a submitted mutation
+            # (e.g. the leave in a closing socket's cleanup) still happens
+            op, args, future = self._inbox.popleft()
+            await self._apply(op, args, future)
+        self._task = None
+        self._on_exit(self)
+
+    async def _apply(
+        self, op: Operation, args: Tuple[Any, ...], future: Optional[asyncio.Future]
+    ) -> None:
+        self.seq += 1
+        try:
+            result = await op(*args)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if future is not None:
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                logger.warning(f"⚠️  Meeting {self.meeting_id} operation #{self.seq} failed: {e}")
+            return
+        if future is not None and not future.done():
+            future.set_result(result)
@@ -1,38 +1,122 @@
 from __future__ import annotations
 
-import json
-from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional
-
-from fastapi import WebSocket, WebSocketDisconnect
+import asyncio
+import heapq
+import logging
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from fastapi import WebSocket
+
+from ..config import (
+    MEETING_BROADCAST_INTERVAL,
+    MEETING_EXTRA_MAX_BYTES,
+    MEETING_STATE,
+    MEETING_STATE_TTL,
+    PARTICIPANT_EXTRA_MAX_BYTES,
+    PARTICIPANT_EXTRA_MAX_KEYS,
+    PRESENCE_OFFLINE_AFTER,
+    PRESENCE_REMOVE_AFTER,
+    WS_SEND_QUEUE_SIZE,
+    WS_SEND_TIMEOUT,
+)
+from . import signal_service
+from .fanout import cancel_task
+from .heart_rate_bridge import Attach, HeartRateBridge
+from .meeting_actor import MeetingActor
+from .meeting_relay import MeetingRelay, MemoryMeetingRelay
+from .participant import Participant
+from .ws_codec import JSON, Frame, encode, negotiate
+from .ws_sender import ConnectionSender
+
+logger = logging.getLogger(__name__)
 
 
 class MeetingManager:
     """
-    In-memory meeting manager.
-
-    Responsibilities:
-    - Maintain a canonical table of meetings and participants.
-    - Track WebSocket connections per meeting/user as transport only.
-    - Provide helpers for join / heartbeat / leave / phase updates.
+    Meeting manager for the co-creation WebSockets of one process.
+
+    Keeps the participants (Participant records) and sockets of each meeting
+    and broadcasts changes as versioned `participants_delta` frames naming
+    their `baseVersion`; a client that sees a gap sends `request_snapshot`
+    for a full `participants_state`. Every operation on a meeting runs on its
+    MeetingActor, state is shared through a MeetingRelay, and presence is
+    swept from a heap of heartbeat deadlines.
     """
 
-    def __init__(self) -> None:
-        # meetingId -> userId -> participant dict
-        self._participants: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    def __init__(
+        self,
+        relay: Optional[MeetingRelay] = None,
+        broadcast_interval: float = MEETING_BROADCAST_INTERVAL,
+        offline_after: float = PRESENCE_OFFLINE_AFTER,
+        remove_after: float = PRESENCE_REMOVE_AFTER,
+        heart_rate_attach: Optional[Attach] = None,
+    ) -> None:
+        self.broadcast_interval = broadcast_interval
+        self.offline_after = offline_after
+        self.remove_after = remove_after
+        self.relay = relay or MemoryMeetingRelay()
+        self.relay.on_message = self._on_relay
+        self._heart_rates: Optional[HeartRateBridge] = (
+            HeartRateBridge(heart_rate_attach, on_sample=self._on_heart_rate)
+            if heart_rate_attach is not None
+            else None
+        )
+        # meetingId -> userId -> participant record
+        self._participants: Dict[str, Dict[str, Participant]] = {}
+        # meetingId -> bytes held in participants' extra bags
+        self._extra_bytes: Dict[str, int] = {}
         # meetingId -> metadata (phase, sharedContext, createdAt, etc.)
         self._meta: Dict[str, Dict[str, Any]] = {}
         # meetingId -> userId -> list[WebSocket]
         self._connections: Dict[str, Dict[str, List[WebSocket]]] = {}
+        # WebSocket -> its outbound queue / sender task
+        self._senders: Dict[WebSocket, ConnectionSender] = {}
+        # Changes not yet broadcast: meetingId -> userId -> changed wire keys
+        # (None = the whole record, for new participants)
+        self._changes: Dict[str, Dict[str, Optional[Set[str]]]] = {}
+        # meetingId -> userIds removed since the last broadcast
+        self._removed: Dict[str, Set[str]] = {}
+        # meetingId -> changed meeting-level fields (phase, sharedContext)
+        self._meta_changes: Dict[str, Dict[str, Any]] = {}
+        # Shared state: meetings this process follows on the relay
+        self._followed: Set[str] = set()
+        # meetingId -> the actor serializing its operations
+        self._actors: Dict[str, MeetingActor] = {}
+        # meetingId -> (version, protocol -> encoded participants_state)
+        self._snapshot_cache: Dict[str, Tuple[int, Dict[str, Frame]]] = {}
+        # Presence: heap of (deadline, meetingId, userId); `_armed` holds each
+        # participant's live deadline, heap entries that differ are stale
+        self._deadlines: List[Tuple[float, str, str]] = []
+        self._armed: Dict[Tuple[str, str], float] = {}
+        self._sweeper: Optional[asyncio.Task] = None
+        self._sweep_wakeup = asyncio.Event()
 
     # ---- Internal helpers -------------------------------------------------
 
+    def _actor(self, meeting_id: str) -> MeetingActor:
+        actor = self._actors.get(meeting_id)
+        if actor is None:
+            actor = MeetingActor(
+                meeting_id,
+                flush=self._broadcast_state,
+                is_idle=lambda: meeting_id not in self._meta,
+                on_exit=self._actor_exited,
+            )
+            self._actors[meeting_id] = actor
+        return actor
+
+    def _actor_exited(self, actor: MeetingActor) -> None:
+        if self._actors.get(actor.meeting_id) is actor:
+            del self._actors[actor.meeting_id]
+
     def _ensure_meeting(self, meeting_id: str) -> None:
         if meeting_id not in self._participants:
             self._participants[meeting_id] = {}
         if meeting_id not in self._meta:
             now_str = datetime.now().isoformat()
-            self._meta[meeting_id] = {"phase": "lobby", "createdAt": now_str, "updatedAt": now_str}
+            self._meta[meeting_id] = {"phase": "lobby", "createdAt": now_str, "updatedAt": now_str, "version": 0}
         if meeting_id not in self._connections:
             self._connections[meeting_id] = {}
 
@@ -40,66 +124,182 @@ class MeetingManager:
         if meeting_id in self._meta:
             self._meta[meeting_id]["updatedAt"] = datetime.now().isoformat()
 
+    def _drop_meeting(self, meeting_id: str) -> None:
+        if self._heart_rates is not None:
+            self._heart_rates.drop(meeting_id)
+        self._participants.pop(meeting_id, None)
+        self._extra_bytes.pop(meeting_id, None)
+        self._meta.pop(meeting_id, None)
+        self._connections.pop(meeting_id, None)
+        self._discard_changes(meeting_id)
+
+    def _discard_changes(self, meeting_id: str) -> None:
+        self._changes.pop(meeting_id, None)
+        self._removed.pop(meeting_id, None)
+        self._meta_changes.pop(meeting_id, None)
+        self._snapshot_cache.pop(meeting_id, None)
+
+    def _has_pending_changes(self, meeting_id: str) -> bool:
+        return (
+            meeting_id in self._changes
+            or meeting_id in self._removed
+            or meeting_id in self._meta_changes
+        )
+
+    def _get_or_add_participant(self, meeting_id: str, user_id: str) -> Participant:
+        participant = self._participants[meeting_id].get(user_id)
+        if participant is None:
+            participant = Participant(meeting_id, user_id)
+            self._participants[meeting_id][user_id] = participant
+            self._removed.get(meeting_id, set()).discard(user_id)
+            # A new entry goes out whole; later updates only add changed fields
+            self._changes.setdefault(meeting_id, {})[user_id] = None
+        return participant
+
+    def _mark_changed(self, meeting_id: str, user_id: str, keys: Set[str]) -> None:
+        pending = self._changes.setdefault(meeting_id, {})
+        if user_id in pending:
+            if pending[user_id] is not None:
+                pending[user_id] |= keys
+        else:
+            pending[user_id] = set(keys)
+
+    def _update_participant(
+        self, meeting_id: str, participant: Participant, updates: Dict[str, Any]
+    ) -> None:
+        """Apply `updates` to a participant, recording only fields that differ."""
+        used = self._extra_bytes.get(meeting_id, 0)
+        changed, grown, dropped = participant.update(
+            updates,
+            max_extra_keys=PARTICIPANT_EXTRA_MAX_KEYS,
+            max_extra_bytes=PARTICIPANT_EXTRA_MAX_BYTES,
+            meeting_bytes_left=max(0, MEETING_EXTRA_MAX_BYTES - used),
+        )
+        if grown:
+            self._extra_bytes[meeting_id] = used + grown
+        if dropped:
+            logger.warning(
+                f"⚠️  Dropped invalid or over-quota fields for {participant.user_id} in {meeting_id}: {dropped}"
+            )
+        if changed:
+            self._mark_changed(meeting_id, participant.user_id, changed)
+
+    def _set_status(self, meeting_id: str, participant: Participant, status: str) -> None:
+        if participant.status != status:
+            participant.status = status
+            self._mark_changed(meeting_id, participant.user_id, {"status"})
+
+    def _pop_participant(self, meeting_id: str, user_id: str) -> None:
+        participant = self._participants[meeting_id].pop(user_id)
+        if participant.extra_bytes and meeting_id in self._extra_bytes:
+            self._extra_bytes[meeting_id] -= participant.extra_bytes
+
+    def _remove_participant(self, meeting_id: str, user_id: str) -> None:
+        self._pop_participant(meeting_id, user_id)
+        self._changes.get(meeting_id, {}).pop(user_id, None)
+        self._removed.setdefault(meeting_id, set()).add(user_id)
+
     # ---- Connection management --------------------------------------------
 
-    async def register_connection(self, meeting_id: str, user_id: str, websocket: WebSocket) -> None:
+    async def register_connection(self, meeting_id: str, user_id: str, websocket: WebSocket) -> str:
         """
         Accept a WebSocket and register it under meeting/user.
         This does NOT implicitly join the meeting – client must send join_meeting.
+        Returns the negotiated wire protocol.
         """
-        await websocket.accept()
+        subprotocol = negotiate(websocket.scope.get("subprotocols") or ())
+        await websocket.accept(subprotocol=subprotocol)
+        protocol = subprotocol or JSON
+        await self._actor(meeting_id).call(self._register, meeting_id, user_id, websocket, protocol)
+        return protocol
+
+    async def _register(
+        self, meeting_id: str, user_id: str, websocket: WebSocket, protocol: str
+    ) -> None:
         self._ensure_meeting(meeting_id)
         self._connections[meeting_id].setdefault(user_id, []).append(websocket)
+        self._senders[websocket] = ConnectionSender(
+            websocket,
+            maxsize=WS_SEND_QUEUE_SIZE,
+            send_timeout=WS_SEND_TIMEOUT,
+            on_evict=lambda sender: self._evict(meeting_id, user_id, sender.websocket),
+            protocol=protocol,
+        )
         self._touch_meeting(meeting_id)
-
-    def unregister_connection(self, meeting_id: str, user_id: str, websocket: WebSocket) -> None:
+        await self._follow(meeting_id)
+        await self._send_snapshot(meeting_id, websocket)
+        await self._sync_heart_rates(meeting_id)
+        # Heart rates already known here, so the new socket needn't wait for them
+        sender = self._senders.get(websocket)
+        latest = self._heart_rates.latest(meeting_id) if self._heart_rates is not None else None
+        if sender is not None and latest:
+            sender.send(encode(self._heart_rates_message(meeting_id, dict(latest)), protocol))
+
+    async def unregister_connection(self, meeting_id: str, user_id: str, websocket: WebSocket) -> None:
         """
         Remove a WebSocket from the connections table.
 
         We deliberately do NOT change participant online/offline state here;
-        online status is derived solely from heartbeats / explicit leave and
-        evaluated inside cleanup_stale().
+        online status is derived solely from heartbeats / explicit leave: the
+        presence sweeper marks a participant offline, then removes them, when
+        their deadline on the heap passes without a heartbeat.
         """
+        # Stop sending right away; the table itself changes on the actor
+        sender = self._senders.pop(websocket, None)
+        if sender is not None:
+            sender.stop()
+        await self._actor(meeting_id).call(self._drop_connection, meeting_id, user_id, websocket)
+
+    def _evict(self, meeting_id: str, user_id: str, websocket: WebSocket) -> None:
+        """Forget a slow consumer; its sender closes the socket."""
+        self._senders.pop(websocket, None)
+        actor = self._actors.get(meeting_id)
+        if actor is not None:
+            actor.post(self._drop_connection, meeting_id, user_id, websocket)
+
+    async def _drop_connection(self, meeting_id: str, user_id: str, websocket: WebSocket) -> None:
         if meeting_id not in self._connections:
             return
 
         user_conns = self._connections[meeting_id].get(user_id)
         if user_conns and websocket in user_conns:
             user_conns.remove(websocket)
-        if user_conns and len(user_conns) == 0:
+        if user_conns is not None and not user_conns:
             del self._connections[meeting_id][user_id]
 
-        # Drop empty meeting connections bucket; participants/meta remain until cleanup_stale
+        # Drop empty meeting connections bucket; the meeting itself is
+        # released after its next state broadcast
         if not self._connections[meeting_id]:
             del self._connections[meeting_id]
 
     # ---- Participant / meeting state --------------------------------------
 
+    def is_participant(self, meeting_id: str, user_id: str) -> bool:
+        return user_id in self._participants.get(meeting_id, {})
+
+    async def is_member(self, meeting_id: str, user_id: str) -> bool:
+        """
+        Like is_participant, but a meeting this worker doesn't mirror is
+        looked up in the shared state.
+        """
+        if meeting_id in self._meta or not self.relay.shared:
+            return self.is_participant(meeting_id, user_id)
+        return await self.relay.has_participant(meeting_id, user_id)
+
     async def join_participant(self, meeting_id: str, user_id: str, payload: Dict[str, Any]) -> None:
         """
         Create or update a participant entry when a client joins the meeting.
         """
-        self._ensure_meeting(meeting_id)
-        now_str = datetime.now().isoformat()
+        await self._actor(meeting_id).call(self._join, meeting_id, user_id, payload)
 
-        participant = self._participants[meeting_id].get(user_id)
-        if not participant:
-            participant = {
-                "meetingId": meeting_id,
-                "userId": user_id,
-                "joinedAt": now_str,
-            }
-            self._participants[meeting_id][user_id] = participant
-
-        participant.update(
-            {
-                "status": "online",
-                "lastHeartbeat": now_str,
-            }
-        )
-        participant.update(payload or {})
+    async def _join(self, meeting_id: str, user_id: str, payload: Dict[str, Any]) -> None:
+        self._ensure_meeting(meeting_id)
+        participant = self._get_or_add_participant(meeting_id, user_id)
+        self._set_status(meeting_id, participant, "online")
+        self._update_participant(meeting_id, participant, payload or {})
+        self._mark_seen(meeting_id, participant)
         self._touch_meeting(meeting_id)
-        await self.broadcast_state(meeting_id)
+        await self._schedule_state(meeting_id)
 
     async def heartbeat(
         self, meeting_id: str, user_id: str, payload: Optional[Dict[str, Any]] = None
@@ -107,49 +307,47 @@ class MeetingManager:
         """
         Lightweight presence ping: ensure entry exists and bump lastHeartbeat/status.
         """
-        self._ensure_meeting(meeting_id)
-        now_str = datetime.now().isoformat()
+        await self._actor(meeting_id).call(self._heartbeat, meeting_id, user_id, payload)
 
-        participant = self._participants[meeting_id].get(user_id)
-        if not participant:
-            participant = {
-                "meetingId": meeting_id,
-                "userId": user_id,
-                "joinedAt": now_str,
-            }
-            self._participants[meeting_id][user_id] = participant
-
-        participant["status"] = "online"
-        participant["lastHeartbeat"] = now_str
+    async def _heartbeat(
+        self, meeting_id: str, user_id: str, payload: Optional[Dict[str, Any]]
+    ) -> None:
+        self._ensure_meeting(meeting_id)
+        participant = self._get_or_add_participant(meeting_id, user_id)
+        self._set_status(meeting_id, participant, "online")
         if payload:
-            participant.update(payload)
+            self._update_participant(meeting_id, participant, payload)
+        self._mark_seen(meeting_id, participant)
 
         self._touch_meeting(meeting_id)
-        await self.broadcast_state(meeting_id)
+        await self._schedule_state(meeting_id)
 
     async def leave_participant(self, meeting_id: str, user_id: str) -> None:
         """
         Explicit leave: remove participant from the meeting table.
         """
+        await self._actor(meeting_id).call(self._leave, meeting_id, user_id)
+
+    async def _leave(self, meeting_id: str, user_id: str) -> None:
         if meeting_id in self._participants and user_id in self._participants[meeting_id]:
-            del self._participants[meeting_id][user_id]
-            if not self._participants[meeting_id]:
-                del self._participants[meeting_id]
-                self._meta.pop(meeting_id, None)
-                self._connections.pop(meeting_id, None)
+            self._remove_participant(meeting_id, user_id)
         self._touch_meeting(meeting_id)
-        await self.broadcast_state(meeting_id)
+        await self._schedule_state(meeting_id)
 
     async def update_phase(self, meeting_id: str, phase: str, updated_by: str) -> None:
         """
         Update global meeting phase and broadcast.
         """
+        await self._actor(meeting_id).call(self._update_phase, meeting_id, phase, updated_by)
+
+    async def _update_phase(self, meeting_id: str, phase: str, updated_by: str) -> None:
         self._ensure_meeting(meeting_id)
         now_str = datetime.now().isoformat()
         meta = self._meta[meeting_id]
         meta["phase"] = phase
         meta["phaseUpdatedBy"] = updated_by
         meta["phaseUpdatedAt"] = now_str
+        self._meta_changes.setdefault(meeting_id, {})["phase"] = phase
         self._touch_meeting(meeting_id)
 
         event = {
@@ -161,8 +359,9 @@ class MeetingManager:
                 "timestamp": now_str,
             },
         }
-        await self.broadcast(json.dumps(event), meeting_id)
-        await self.broadcast_state(meeting_id)
+        await self._publish_event(meeting_id, event)
+        # High priority: flush now instead of waiting for the tick
+        await self._broadcast_state(meeting_id)
 
     async def update_shared_context(
         self, meeting_id: str, updates: Dict[str, Any], updated_by: str
@@ -175,7 +374,13 @@ class MeetingManager:
         """
         if not updates:
             return
+        await self._actor(meeting_id).call(
+            self._update_shared_context, meeting_id, updates, updated_by
+        )
 
+    async def _update_shared_context(
+        self, meeting_id: str, updates: Dict[str, Any], updated_by: str
+    ) -> None:
         self._ensure_meeting(meeting_id)
         now_str = datetime.now().isoformat()
         meta = self._meta[meeting_id]
@@ -183,6 +388,7 @@ class MeetingManager:
         shared_ctx.update(updates)
         meta["sharedContextUpdatedBy"] = updated_by
         meta["sharedContextUpdatedAt"] = now_str
+        self._meta_changes.setdefault(meeting_id, {})["sharedContext"] = shared_ctx
         self._touch_meeting(meeting_id)
 
         event = {
@@ -194,50 +400,131 @@ class MeetingManager:
                 "timestamp": now_str,
             },
         }
-        await self.broadcast(json.dumps(event), meeting_id)
-        await self.broadcast_state(meeting_id)
+        await self._publish_event(meeting_id, event)
+        await self._schedule_state(meeting_id)
 
     async def cleanup_stale(
         self,
         meeting_id: str,
-        offline_after_seconds: int = 30,
-        hard_remove_after_seconds: int = 300,
+        offline_after_seconds: Optional[float] = None,
+        hard_remove_after_seconds: Optional[float] = None,
     ) -> None:
         """
         Mark users as offline if they have not been seen recently, and
         optionally remove long-gone users from the meeting state.
+
+        The presence sweeper does this continuously; this is a one-off full
+        pass over a meeting, optionally with stricter thresholds.
         """
         if meeting_id not in self._participants:
             return
+        await self._actor(meeting_id).call(
+            self._cleanup_stale,
+            meeting_id,
+            self.offline_after if offline_after_seconds is None else offline_after_seconds,
+            self.remove_after if hard_remove_after_seconds is None else hard_remove_after_seconds,
+        )
 
-        now = datetime.now()
-        offline_threshold = now - timedelta(seconds=offline_after_seconds)
-        hard_remove_threshold = now - timedelta(seconds=hard_remove_after_seconds)
-
-        stale_to_remove: List[str] = []
-
-        for user_id, entry in self._participants[meeting_id].items():
-            try:
-                last_seen_str = entry.get("lastHeartbeat") or entry.get("lastSeen")
-                last_seen = datetime.fromisoformat(last_seen_str) if last_seen_str else datetime.fromtimestamp(0)
-            except Exception:
-                last_seen = datetime.fromtimestamp(0)
+    async def _cleanup_stale(
+        self, meeting_id: str, offline_after: float, remove_after: float
+    ) -> None:
+        now = time.monotonic()
+        for user_id in list(self._participants.get(meeting_id, ())):
+            self._expire(meeting_id, user_id, now, offline_after, remove_after)
 
-            if last_seen < hard_remove_threshold:
-                stale_to_remove.append(user_id)
-            elif last_seen < offline_threshold:
-                entry["status"] = "offline"
+        self._touch_meeting(meeting_id)
+        await self._schedule_state(meeting_id)
 
-        for user_id in stale_to_remove:
-            del self._participants[meeting_id][user_id]
+    # ---- Presence sweeper -------------------------------------------------
 
-        if meeting_id in self._participants and not self._participants[meeting_id]:
-            del self._participants[meeting_id]
-            self._meta.pop(meeting_id, None)
-            self._connections.pop(meeting_id, None)
+    def _mark_seen(self, meeting_id: str, participant: Participant) -> None:
+        participant.touch()
+        self._mark_changed(meeting_id, participant.user_id, {"lastHeartbeat"})
+        self._arm(meeting_id, participant)
 
-        self._touch_meeting(meeting_id)
-        await self.broadcast_state(meeting_id)
+    def _arm(self, meeting_id: str, participant: Participant) -> None:
+        """
+        Make sure the participant is checked by their offline deadline. A later
+        armed deadline is left alone (it re-arms itself when due) unless this
+        one is earlier, e.g. someone offline and waiting for removal is back.
+        """
+        deadline = participant.last_seen + self.offline_after
+        armed = self._armed.get((meeting_id, participant.user_id))
+        if armed is None or deadline < armed:
+            self._push_deadline(deadline, meeting_id, participant.user_id)
+
+    def _push_deadline(self, deadline: float, meeting_id: str, user_id: str) -> None:
+        self._armed[(meeting_id, user_id)] = deadline
+        heapq.heappush(self._deadlines, (deadline, meeting_id, user_id))
+        if self._sweeper is None or self._sweeper.done():
+            self._sweeper = asyncio.create_task(self._sweep_loop())
+        elif self._deadlines[0][0] == deadline:
+            # New earliest deadline: wake the sweeper to shorten its sleep
+            self._sweep_wakeup.set()
+
+    def _expire(
+        self, meeting_id: str, user_id: str, now: float, offline_after: float, remove_after: float
+    ) -> Optional[float]:
+        """
+        Apply presence transitions for one participant. Returns when they
+        next need checking, or None once they are gone.
+        """
+        participant = self._participants.get(meeting_id, {}).get(user_id)
+        if participant is None:
+            return None
+        last_seen = participant.last_seen
+        idle = now - last_seen
+        if idle >= remove_after:
+            self._remove_participant(meeting_id, user_id)
+            return None
+        if idle >= offline_after:
+            self._set_status(meeting_id, participant, "offline")
+            return last_seen + remove_after
+        return last_seen + offline_after
+
+    async def _sweep_loop(self) -> None:
+        while True:
+            if not self._deadlines:
+                self._sweep_wakeup.clear()
+                await self._sweep_wakeup.wait()
+                continue
+            delay = self._deadlines[0][0] - time.monotonic()
+            if delay > 0:
+                self._sweep_wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._sweep_wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            # Hand due entries to their meetings' actors, one operation each
+            now = time.monotonic()
+            due: Dict[str, List[str]] = {}
+            while self._deadlines and self._deadlines[0][0] <= now:
+                deadline, meeting_id, user_id = heapq.heappop(self._deadlines)
+                if self._armed.get((meeting_id, user_id)) == deadline:
+                    due.setdefault(meeting_id, []).append(user_id)
+            for meeting_id, user_ids in due.items():
+                actor = self._actors.get(meeting_id)
+                if actor is None:
+                    for user_id in user_ids:
+                        self._armed.pop((meeting_id, user_id), None)
+                else:
+                    actor.post(self._sweep, meeting_id, user_ids)
+
+    async def _sweep(self, meeting_id: str, user_ids: List[str]) -> None:
+        now = time.monotonic()
+        before = self._has_pending_changes(meeting_id)
+        for user_id in user_ids:
+            next_check = self._expire(meeting_id, user_id, now, self.offline_after, self.remove_after)
+            if next_check is None:
+                self._armed.pop((meeting_id, user_id), None)
+            else:
+                self._push_deadline(next_check, meeting_id, user_id)
+        # Broadcast only if a participant actually changed
+        if not before and self._has_pending_changes(meeting_id):
+            self._touch_meeting(meeting_id)
+            await self._schedule_state(meeting_id)
 
     # ---- Broadcast helpers ------------------------------------------------
 
@@ -246,43 +533,311 @@ class MeetingManager:
             return "lobby"
         return self._meta[meeting_id].get("phase") or "lobby"
 
-    async def broadcast_state(self, meeting_id: str) -> None:
+    def _snapshot_message(self, meeting_id: str) -> Dict[str, Any]:
+        meta = self._meta.get(meeting_id, {})
+        return {
+            "type": "participants_state",
+            "payload": {
+                "meetingId": meeting_id,
+                "version": meta.get("version", 0),
+                "participants": {
+                    user_id: participant.to_wire()
+                    for user_id, participant in self._participants.get(meeting_id, {}).items()
+                },
+                "phase": self._current_phase(meeting_id),
+                "sharedContext": meta.get("sharedContext"),
+                "timestamp": datetime.now().isoformat(),
+            },
+        }
+
+    async def send_snapshot(self, meeting_id: str, websocket: WebSocket) -> None:
         """
-        Broadcast the full participants/phase snapshot to everyone in the meeting.
+        Send the full participants/phase snapshot to a single connection
+        (on connect, or when a client detected a gap in delta versions).
         """
-        if meeting_id not in self._participants or meeting_id not in self._connections:
+        await self._actor(meeting_id).call(self._send_snapshot, meeting_id, websocket)
+
+    async def _send_snapshot(self, meeting_id: str, websocket: WebSocket) -> None:
+        sender = self._senders.get(websocket)
+        if sender is not None:
+            # Queued behind earlier frames so versions reach the client in order
+            sender.send(self._encoded_snapshot(meeting_id, sender.protocol))
+
+    def _encoded_snapshot(self, meeting_id: str, protocol: str = JSON) -> Frame:
+        """
+        Encoded snapshot, reused while the meeting sits at the same version
+        with no unbroadcast changes (e.g. a wave of reconnects).
+        """
+        version = self._meta.get(meeting_id, {}).get("version", 0)
+        cached = self._snapshot_cache.get(meeting_id)
+        if cached is None or cached[0] != version or self._has_pending_changes(meeting_id):
+            cached = (version, {})
+            if meeting_id in self._meta:
+                self._snapshot_cache[meeting_id] = cached
+        frame = cached[1].get(protocol)
+        if frame is None:
+            frame = cached[1][protocol] = encode(self._snapshot_message(meeting_id), protocol)
+        return frame
+
+    async def _schedule_state(self, meeting_id: str) -> None:
+        """Arm the meeting actor's flush; its delta goes out on the next tick."""
+        if self.broadcast_interval <= 0:
+            await self._broadcast_state(meeting_id)
             return
+        self._actors[meeting_id].schedule_flush(self.broadcast_interval)
+
+    async def close(self) -> None:
+        """Stop the meeting actors, the presence sweeper and the relay."""
+        await cancel_task(self._sweeper)
+        self._sweeper = None
+        for actor in list(self._actors.values()):
+            await actor.stop()
+        self._actors.clear()
+        if self._heart_rates is not None:
+            await self._heart_rates.close()
+        await self.relay.close()
 
-        state_message = {
-            "type": "participants_state",
+    async def broadcast_state(self, meeting_id: str) -> None:
+        """
+        Publish what changed since the previous state frame as a versioned
+        delta right away. Nothing is sent when nothing changed.
+        """
+        await self._actor(meeting_id).call(self._broadcast_state, meeting_id)
+
+    async def _broadcast_state(self, meeting_id: str) -> None:
+        actor = self._actors.get(meeting_id)
+        if actor is not None:
+            actor.cancel_flush()
+        changed = self._changes.pop(meeting_id, {})
+        removed = self._removed.pop(meeting_id, set())
+        meta_changes = self._meta_changes.pop(meeting_id, {})
+        if changed or removed or meta_changes:
+            self._snapshot_cache.pop(meeting_id, None)
+            # Unshared state nobody is connected to needs no frame
+            if meeting_id in self._participants and (
+                self.relay.shared or meeting_id in self._connections
+            ):
+                await self._publish_state(meeting_id, changed, removed, meta_changes)
+            await self._sync_heart_rates(meeting_id)
+        self._flush_heart_rates(meeting_id)
+        await self._release_if_idle(meeting_id)
+
+    async def _publish_state(
+        self,
+        meeting_id: str,
+        changed: Dict[str, Optional[Set[str]]],
+        removed: Set[str],
+        meta_changes: Dict[str, Any],
+    ) -> None:
+        participants = self._participants[meeting_id]
+        present = [user_id for user_id in changed if user_id in participants]
+        body = {
+            "changed": {user_id: participants[user_id].to_wire(changed[user_id]) for user_id in present},
+            "removed": sorted(removed),
+            **meta_changes,
+            "timestamp": datetime.now().isoformat(),
+        }
+        # Shared state stores whole records, not just the changed fields
+        upserts = (
+            {user_id: participants[user_id].to_wire() for user_id in present}
+            if self.relay.shared
+            else {}
+        )
+        try:
+            # The relay assigns the version and base; the frame goes out when
+            # it is relayed back, in commit order
+            await self.relay.publish_delta(meeting_id, body, upserts, meta_changes)
+        except Exception as e:
+            logger.warning(f"⚠️  Failed to publish state of meeting {meeting_id}: {e}")
+
+    async def publish_event(self, meeting_id: str, event: Dict[str, Any]) -> None:
+        """Send an event frame to every socket in the meeting, on any worker."""
+        await self._actor(meeting_id).call(self._publish_event, meeting_id, event)
+
+    async def _publish_event(self, meeting_id: str, event: Dict[str, Any]) -> None:
+        try:
+            await self.relay.publish_event(meeting_id, event)
+        except Exception as e:
+            logger.warning(f"⚠️  Failed to publish event to meeting {meeting_id}: {e}")
+
+    # ---- Heart-rate fan-in ------------------------------------------------
+
+    def _on_heart_rate(self, meeting_id: str) -> None:
+        # A new sample goes out with the meeting's next flush
+        actor = self._actors.get(meeting_id)
+        if actor is not None:
+            actor.schedule_flush(max(self.broadcast_interval, 0.0))
+
+    async def _sync_heart_rates(self, meeting_id: str) -> None:
+        """Follow the heart rates of the meeting's participants while it has local sockets."""
+        if self._heart_rates is None:
+            return
+        if meeting_id in self._connections:
+            await self._heart_rates.sync(meeting_id, self._participants.get(meeting_id, {}))
+        else:
+            self._heart_rates.drop(meeting_id)
+
+    def _heart_rates_message(self, meeting_id: str, samples: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        return {
+            "type": "heart_rates",
             "payload": {
-                "participants": self._participants[meeting_id],
-                "phase": self._current_phase(meeting_id),
-                "sharedContext": self._meta[meeting_id].get("sharedContext"),
+                "meetingId": meeting_id,
+                "heartRates": samples,
                 "timestamp": datetime.now().isoformat(),
             },
         }
-        await self.broadcast(json.dumps(state_message), meeting_id)
 
-    async def broadcast(self, message: str, meeting_id: str) -> None:
+    def _flush_heart_rates(self, meeting_id: str) -> None:
+        if self._heart_rates is None:
+            return
+        samples = self._heart_rates.take(meeting_id)
+        if samples:
+            self._fan_out(meeting_id, self._heart_rates_message(meeting_id, samples))
+
+    # ---- Relay ------------------------------------------------------------
+
+    async def _follow(self, meeting_id: str) -> None:
+        """Start mirroring a shared meeting: subscribe, then load its state."""
+        if not self.relay.shared or meeting_id in self._followed:
+            return
+        self._followed.add(meeting_id)
+        try:
+            # Subscribe first so no delta between load and subscribe is lost;
+            # deltas relayed meanwhile queue up behind this operation
+            await self.relay.follow(meeting_id)
+            snapshot = await self.relay.load(meeting_id)
+        except Exception as e:
+            logger.warning(f"⚠️  Failed to load shared state of meeting {meeting_id}: {e}")
+            return
+        if snapshot is not None:
+            self._load_snapshot(meeting_id, *snapshot)
+
+    def _load_snapshot(
+        self,
+        meeting_id: str,
+        records: Dict[str, Dict[str, Any]],
+        fields: Dict[str, Any],
+        version: int,
+    ) -> None:
+        participants: Dict[str, Participant] = {}
+        extra_bytes = 0
+        for user_id, record in records.items():
+            participant = Participant(meeting_id, user_id)
+            extra_bytes += participant.apply_wire(record)
+            participants[user_id] = participant
+            self._arm(meeting_id, participant)
+        self._participants[meeting_id] = participants
+        self._extra_bytes[meeting_id] = extra_bytes
+        meta = self._meta[meeting_id]
+        meta.update(fields)
+        meta["version"] = version
+        self._snapshot_cache.pop(meeting_id, None)
+
+    async def _release_if_idle(self, meeting_id: str) -> None:
+        """
+        Forget a meeting with no local sockets. Unshared state is kept while
+        it still has participants; a shared mirror is dropped right away.
+        """
+        if (
+            meeting_id not in self._meta
+            or meeting_id in self._connections
+            or self._has_pending_changes(meeting_id)
+        ):
+            return
+        if not self.relay.shared and self._participants.get(meeting_id):
+            return
+        self._drop_meeting(meeting_id)
+        if meeting_id in self._followed:
+            self._followed.discard(meeting_id)
+            await self.relay.unfollow(meeting_id)
+
+    def _on_relay(self, meeting_id: str, msg: Dict[str, Any]) -> None:
+        """Relayed delta or event: queue it on the meeting's actor, if any."""
+        actor = self._actors.get(meeting_id)
+        if actor is not None:
+            actor.post(self._apply_relayed, meeting_id, msg)
+
+    async def _apply_relayed(self, meeting_id: str, msg: Dict[str, Any]) -> None:
+        """
+        Bring the local mirror up to date with a relayed delta and fan the
+        frame out to local sockets, encoded once.
+        """
+        if meeting_id not in self._meta:
+            return
+        if "event" in msg:
+            self._fan_out(meeting_id, msg["event"])
+            return
+
+        meta = self._meta[meeting_id]
+        version = msg.get("v", 0)
+        if version <= meta.get("version", 0):
+            return  # already part of the loaded snapshot
+        body = msg.get("body") or {}
+        if msg.get("o") != self.relay.origin:
+            self._apply_remote(meeting_id, body)
+            await self._sync_heart_rates(meeting_id)
+        meta["version"] = version
+        self._snapshot_cache.pop(meeting_id, None)
+        delta_message = {
+            "type": "participants_delta",
+            "payload": {
+                "meetingId": meeting_id,
+                "version": version,
+                "baseVersion": msg.get("b", 0),
+                **body,
+            },
+        }
+        self._fan_out(meeting_id, delta_message)
+
+    def _apply_remote(self, meeting_id: str, body: Dict[str, Any]) -> None:
+        """Apply another worker's delta to the mirror without re-broadcasting it."""
+        participants = self._participants.setdefault(meeting_id, {})
+        for user_id, wire in (body.get("changed") or {}).items():
+            participant = participants.get(user_id)
+            if participant is None:
+                participant = participants[user_id] = Participant(meeting_id, user_id)
+            grown = participant.apply_wire(wire)
+            if grown:
+                self._extra_bytes[meeting_id] = self._extra_bytes.get(meeting_id, 0) + grown
+            self._arm(meeting_id, participant)
+        for user_id in body.get("removed") or ():
+            if user_id in participants:
+                self._pop_participant(meeting_id, user_id)
+        meta = self._meta[meeting_id]
+        for field in ("phase", "sharedContext"):
+            if field in body:
+                meta[field] = body[field]
+
+    async def broadcast(self, message: Dict[str, Any], meeting_id: str) -> None:
         """
-        Broadcast a raw JSON string to all active WebSocket connections for this meeting.
+        Queue a frame on every active WebSocket connection for this meeting
+        in this process. Returns without waiting for any client to receive it.
         """
+        self._fan_out(meeting_id, message)
+
+    def _fan_out(self, meeting_id: str, message: Dict[str, Any]) -> None:
         if meeting_id not in self._connections:
             return
 
-        for user_id, conns in list(self._connections[meeting_id].items()):
+        # Encoded lazily, once per protocol actually in use
+        encoded: Dict[str, Frame] = {}
+        for conns in list(self._connections[meeting_id].values()):
             for ws in list(conns):
-                try:
-                    await ws.send_text(message)
-                except (RuntimeError, WebSocketDisconnect, Exception):
-                    try:
-                        conns.remove(ws)
-                    except ValueError:
-                        pass
+                sender = self._senders.get(ws)
+                if sender is not None:
+                    frame = encoded.get(sender.protocol)
+                    if frame is None:
+                        frame = encoded[sender.protocol] = encode(message, sender.protocol)
+                    # On overflow the sender evicts itself via _evict
+                    sender.send(frame)
+
 
-            if not conns:
-                del self._connections[meeting_id][user_id]
+relay: MeetingRelay
+if MEETING_STATE == "redis":
+    from .redis_meeting_relay import RedisMeetingRelay
 
+    relay = RedisMeetingRelay(ttl=MEETING_STATE_TTL)
+else:
+    relay = MemoryMeetingRelay()
 
-meeting_manager = MeetingManager()
+meeting_manager = MeetingManager(relay, heart_rate_attach=signal_service.attach)
@@ -0,0 +1,111 @@
+"""
+Transport for co-creation meeting state between the processes serving a
+meeting. Delegates to the relay selected by MAGHEART_MEETING_STATE ("memory"
+or "redis").
+
+With a shared relay several workers serve the same meeting: the canonical
+state lives in Redis, a worker mirrors a meeting only while it has local
+sockets in it (loaded on the first one, then updated from relayed deltas),
+and each worker sweeps presence for every participant it mirrors, so someone
+whose worker died still goes offline and is removed.
+"""
+import itertools
+import uuid
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# (participants by userId as wire dicts, meeting meta fields, version)
+MeetingSnapshot = Tuple[Dict[str, Dict[str, Any]], Dict[str, Any], int]
+
+
+class MeetingRelay(ABC):
+    """
+    Moves versioned state deltas and plain events to every process that
+    follows a meeting, including the publisher itself.
+
+    Relayed messages are dicts handed to `on_message(meeting_id, msg)`:
+    `{"o": origin, "v": version, "b": baseVersion, "body": delta}` for state
+    deltas, `{"o": origin, "event": frame}` for events. `origin` identifies
+    the publishing process so it can skip re-applying its own changes.
+    `shared` relays keep the canonical state outside the process; a process
+    then loads a meeting when it starts following it and forgets it when its
+    last local socket leaves.
+    """
+
+    shared = False
+
+    def __init__(self) -> None:
+        self.origin = uuid.uuid4().hex
+        self.on_message: Optional[Callable[[str, Dict[str, Any]], None]] = None
+
+    @abstractmethod
+    async def publish_delta(
+        self,
+        meeting_id: str,
+        body: Dict[str, Any],
+        upserts: Dict[str, Dict[str, Any]],
+        meta: Dict[str, Any],
+    ) -> int:
+        """
+        Publish a delta `body` (with `changed`/`removed`) under the next
+        version and return that version. The relayed message's base version
+        is the meeting's version just before this commit. `upserts` are the
+        full wire records of changed participants and `meta` the changed
+        meeting fields, for shared state.
+        """
+
+    @abstractmethod
+    async def publish_event(self, meeting_id: str, event: Any) -> None:
+        ...
+
+    async def load(self, meeting_id: str) -> Optional[MeetingSnapshot]:
+        """Current shared state of a meeting (None when state is process-local)."""
+        return None
+
+    async def has_participant(self, meeting_id: str, user_id: str) -> bool:
+        """Whether the shared state lists the participant (False when process-local)."""
+        return False
+
+    async def follow(self, meeting_id: str) -> None:
+        pass
+
+    async def unfollow(self, meeting_id: str) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    def _deliver(self, meeting_id: str, msg: Dict[str, Any]) -> None:
+        if self.on_message is not None:
+            self.on_message(meeting_id, msg)
+
+
+class MemoryMeetingRelay(MeetingRelay):
+    """
+    Single-process relay: messages are delivered straight back to this
+    process. Versions come from one process-wide counter so they keep
+    increasing even when a meeting is dropped and recreated under the same id;
+    the last one issued per meeting is the next delta's base version.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._versions = itertools.count(1)
+        # meetingId -> last version committed
+        self._heads: Dict[str, int] = {}
+
+    async def publish_delta(
+        self,
+        meeting_id: str,
+        body: Dict[str, Any],
+        upserts: Dict[str, Dict[str, Any]],
+        meta: Dict[str, Any],
+    ) -> int:
+        version = next(self._versions)
+        base = self._heads.get(meeting_id, 0)
+        self._heads[meeting_id] = version
+        self._deliver(meeting_id, {"o": self.origin, "v": version, "b": base, "body": body})
+        return version
+
+    async def publish_event(self, meeting_id: str, event: Any) -> None:
+        self._deliver(meeting_id, {"o": self.origin, "event": event})
@@ -0,0 +1,200 @@
+"""
+Compact participant record used by MeetingManager.
+
+Core fields live in slots; timestamps are floats (wall clock for display,
+time.monotonic() for presence deadlines) and only become ISO strings when a
+frame is built. Core fields a client sends must have the expected type
+(strings at most CORE_MAX_CHARS long); `status` is owned by the server. Any
+other keys go into a small `extra` bag that is capped by key count and
+encoded size.
+"""
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from .jsoncodec import dumps
+
+# Core wire keys -> slot names
+CORE_FIELDS = {
+    "status": "status",
+    "role": "role",
+    "avatarSeed": "avatar_seed",
+    "phase": "phase",
+    "heartRate": "heart_rate",
+    "timestamp": "client_ts",
+}
+# Wire keys owned by the server; clients cannot overwrite them
+SERVER_FIELDS = ("meetingId", "userId", "joinedAt", "lastHeartbeat", "status")
+# Types a client may send for each settable core field (None clears it)
+CORE_TYPES: Dict[str, Tuple[type, ...]] = {
+    "role": (str,),
+    "avatarSeed": (str, int),
+    "phase": (str,),
+    "heartRate": (int, float),
+    "timestamp": (str, int, float),
+}
+CORE_MAX_CHARS = 256
+
+
+def _valid_core(key: str, value: Any) -> bool:
+    if value is None:
+        return True
+    if isinstance(value, bool) or not isinstance(value, CORE_TYPES[key]):
+        return False
+    return not isinstance(value, str) or len(value) <= CORE_MAX_CHARS
+
+
+def _iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts).isoformat()
+
+
+def _parse_iso(value: Any, default: float) -> float:
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except (TypeError, ValueError):
+        return default
+
+
+class Participant:
+    __slots__ = (
+        "meeting_id",
+        "user_id",
+        "status",
+        "role",
+        "avatar_seed",
+        "phase",
+        "heart_rate",
+        "client_ts",
+        "joined_at",
+        "last_heartbeat",
+        "last_seen",
+        "extra",
+        "extra_bytes",
+    )
+
+    def __init__(self, meeting_id: str, user_id: str) -> None:
+        now = time.time()
+        self.meeting_id = meeting_id
+        self.user_id = user_id
+        self.status: Optional[str] = None
+        self.role: Any = None
+        self.avatar_seed: Any = None
+        self.phase: Any = None
+        self.heart_rate: Any = None
+        self.client_ts: Any = None
+        self.joined_at = now
+        self.last_heartbeat = now
+        self.last_seen = time.monotonic()
+        # Allocated on first use; most participants never need it
+        self.extra: Optional[Dict[str, Any]] = None
+        self.extra_bytes = 0
+
+    def touch(self) -> None:
+        """Record a heartbeat."""
+        self.last_heartbeat = time.time()
+        self.last_seen = time.monotonic()
+
+    def update(
+        self,
+        updates: Dict[str, Any],
+        max_extra_keys: int,
+        max_extra_bytes: int,
+        meeting_bytes_left: int,
+    ) -> Tuple[Set[str], int, List[str]]:
+        """
+        Apply client-supplied fields. Returns (changed wire keys, change in
+        extra bytes, keys dropped as invalid or over a quota).
+        """
+        changed: Set[str] = set()
+        grown = 0
+        dropped: List[str] = []
+        for key, value in updates.items():
+            if key in SERVER_FIELDS:
+                continue
+            slot = CORE_FIELDS.get(key)
+            if slot is not None:
+                if not _valid_core(key, value):
+                    dropped.append(key)
+                elif getattr(self, slot) != value:
+                    setattr(self, slot, value)
+                    changed.add(key)
+                continue
+
+            extra = self.extra or {}
+            if key in extra and extra[key] == value:
+                continue
+            size = len(key) + len(dumps(value))
+            old_size = len(key) + len(dumps(extra[key])) if key in extra else 0
+            delta = size - old_size
+            if (
+                (key not in extra and len(extra) >= max_extra_keys)
+                or self.extra_bytes + delta > max_extra_bytes
+                or grown + delta > meeting_bytes_left
+            ):
+                dropped.append(key)
+                continue
+            if self.extra is None:
+                self.extra = extra
+            extra[key] = value
+            self.extra_bytes += delta
+            grown += delta
+            changed.add(key)
+        return changed, grown, dropped
+
+    def apply_wire(self, wire: Dict[str, Any]) -> int:
+        """
+        Apply a wire dict produced by another worker (already validated and
+        quota-checked there). Returns the change in extra bytes.
+        """
+        grown = 0
+        for key, value in wire.items():
+            slot = CORE_FIELDS.get(key)
+            if slot is not None:
+                setattr(self, slot, value)
+            elif key == "lastHeartbeat":
+                self.last_heartbeat = _parse_iso(value, self.last_heartbeat)
+                # Presence deadlines count from the heartbeat, not from its arrival
+                self.last_seen = time.monotonic() - max(0.0, time.time() - self.last_heartbeat)
+            elif key == "joinedAt":
+                self.joined_at = _parse_iso(value, self.joined_at)
+            elif key not in SERVER_FIELDS:
+                if self.extra is None:
+                    self.extra = {}
+                old_size = len(key) + len(dumps(self.extra[key])) if key in self.extra else 0
+                self.extra[key] = value
+                delta = len(key) + len(dumps(value)) - old_size
+                self.extra_bytes += delta
+                grown += delta
+        return grown
+
+    def wire_value(self, key: str) -> Any:
+        slot = CORE_FIELDS.get(key)
+        if slot is not None:
+            return getattr(self, slot)
+        if key == "lastHeartbeat":
+            return _iso(self.last_heartbeat)
+        if key == "joinedAt":
+            return _iso(self.joined_at)
+        if key == "meetingId":
+            return self.meeting_id
+        if key == "userId":
+            return self.user_id
+        return (self.extra or {}).get(key)
+
+    def to_wire(self, keys: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """Wire dict with all fields, or only `keys` (for deltas)."""
+        if keys is not None:
+            return {key: self.wire_value(key) for key in keys}
+        wire: Dict[str, Any] = {
+            "meetingId": self.meeting_id,
+            "userId": self.user_id,
+            "joinedAt": _iso(self.joined_at),
+            "lastHeartbeat": _iso(self.last_heartbeat),
+        }
+        for key, slot in CORE_FIELDS.items():
+            value = getattr(self, slot)
+            if value is not None:
+                wire[key] = value
+        if self.extra:
+            wire.update(self.extra)
+        return wire
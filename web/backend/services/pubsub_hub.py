@@ -0,0 +1,85 @@
+import asyncio
+import logging
+from typing import Any, Optional, Set
+
+from redis.exceptions import TimeoutError as RedisTimeoutError
+
+from .fanout import FanoutHub, cancel_task
+from .jsoncodec import loads
+
+logger = logging.getLogger(__name__)
+
+
+class PubSubHub(FanoutHub):
+    """
+    Process-wide Redis pub/sub multiplexer.
+
+    Holds a single `redis.pubsub()` connection and one reader task for the
+    whole process. Channels are ref-counted: the first local subscriber
+    issues SUBSCRIBE, the last one to leave issues UNSUBSCRIBE. Each message
+    is decoded once and the same object is fanned out to every local mailbox.
+    """
+
+    def __init__(self, redis: Any, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.redis = redis
+        self._pubsub: Any = None
+        self._reader: Optional[asyncio.Task] = None
+        # channels currently subscribed on the server
+        self._subscribed: Set[str] = set()
+        # Serializes SUBSCRIBE/UNSUBSCRIBE so a quick leave/rejoin can't reorder them
+        self._cmd_lock = asyncio.Lock()
+
+    async def close(self) -> None:
+        await super().close()
+        await cancel_task(self._reader)
+        self._reader = None
+        if self._pubsub is not None:
+            try:
+                await self._pubsub.aclose()
+            except Exception:
+                pass
+            self._pubsub = None
+        self._subscribed.clear()
+
+    # ---- Internals --------------------------------------------------------
+
+    async def _sync_channel(self, channel: str) -> None:
+        """Make the server-side subscription match the local ref count."""
+        async with self._cmd_lock:
+            wanted = channel in self._queues
+            if wanted and channel not in self._subscribed:
+                if self._pubsub is None:
+                    self._pubsub = self.redis.pubsub()
+                await self._pubsub.subscribe(channel)
+                self._subscribed.add(channel)
+                if self._reader is None or self._reader.done():
+                    self._reader = asyncio.create_task(self._read_loop())
+            elif not wanted and channel in self._subscribed:
+                self._subscribed.discard(channel)
+                try:
+                    await self._pubsub.unsubscribe(channel)
+                except Exception as e:
+                    logger.warning(f"Failed to unsubscribe {channel}: {e}")
+
+    async def _read_loop(self) -> None:
+        while True:
+            try:
+                msg = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=None)
+            except asyncio.CancelledError:
+                raise
+            except RedisTimeoutError:
+                continue  # idle past REDIS_SOCKET_TIMEOUT; keep waiting
+            except Exception as e:
+                logger.warning(f"Pub/sub reader error, retrying: {e}")
+                await asyncio.sleep(1.0)
+                continue
+            if not msg or msg.get("type") != "message":
+                continue
+            channel = msg["channel"]
+            payload = msg["data"]
+            try:
+                obj = loads(payload)
+            except Exception:
+                obj = {"data": payload}
+            self.fan_out(channel, obj)
@@ -0,0 +1,108 @@
+from typing import Any, Callable, Iterable, List, Optional, Tuple
+
+from ..config import (
+    REDIS_URL,
+    LATEST_TTL_SECONDS,
+    LATEST_CACHE_SIZE,
+    STREAM_MAXLEN,
+    STREAM_BLOCK_MS,
+)
+from ..storage.redis_client import redis
+from .broker import Broker
+from .jsoncodec import dumps, loads
+from .latest_cache import LatestCache
+from .mailbox import Mailbox
+from .pubsub_hub import PubSubHub
+from .stream_hub import StreamHub, stream_id_key
+
+
+def _xadd(target: Any, channel: str, event: Any) -> Any:
+    return target.xadd(
+        channel, {"event": dumps(event)}, maxlen=STREAM_MAXLEN, approximate=True
+    )
+
+
+class RedisBroker(Broker):
+    """
+    Redis-backed broker for multi-process / multi-host deployments.
+
+    Latest values are Redis keys with a TTL, fronted by an in-process cache
+    fed by ingest and by received events. Events go over pub/sub, or over
+    capped Redis Streams when `use_streams` (enables Last-Event-ID replay),
+    multiplexed through one shared hub per process.
+    """
+
+    def __init__(self, use_streams: bool = False, **hub_options: Any) -> None:
+        self.use_streams = use_streams
+        self._prefix = "stream:magheart:" if use_streams else "pubsub:magheart:"
+        # Process-local copy of the latest sample per user
+        self.latest_cache = LatestCache(ttl=LATEST_TTL_SECONDS, max_size=LATEST_CACHE_SIZE)
+        hub_options["on_message"] = self._on_message
+        self._hub: PubSubHub = (
+            StreamHub(redis, block_ms=STREAM_BLOCK_MS, **hub_options)
+            if use_streams
+            else PubSubHub(redis, **hub_options)
+        )
+
+    def _chan(self, user_id: str) -> str:
+        return f"{self._prefix}{user_id}"
+
+    def _on_message(self, channel: str, obj: Any) -> None:
+        if isinstance(obj, dict) and obj.get("type") == "hr":
+            self.latest_cache.put(channel[len(self._prefix):], obj.get("data"))
+
+    async def set_latest(self, user_id: str, data: Any) -> None:
+        self.latest_cache.put(user_id, data)
+        await redis.set(f"latest_heart_rate:{user_id}", dumps(data), ex=LATEST_TTL_SECONDS)
+
+    async def get_latest(self, user_id: str) -> Optional[Any]:
+        cached = self.latest_cache.get(user_id)
+        if cached is not None:
+            return cached
+        val = await redis.get(f"latest_heart_rate:{user_id}")
+        if not val:
+            return None
+        try:
+            obj = loads(val)
+        except Exception:
+            return None
+        self.latest_cache.put(user_id, obj)
+        return obj
+
+    async def set_latest_and_publish(self, user_id: str, latest: Any, events: Iterable[Any]) -> None:
+        """Update the latest value and publish events in one pipelined round trip."""
+        channel = self._chan(user_id)
+        async with redis.pipeline(transaction=False) as pipe:
+            if latest is not None:
+                self.latest_cache.put(user_id, latest)
+                pipe.set(f"latest_heart_rate:{user_id}", dumps(latest), ex=LATEST_TTL_SECONDS)
+            for event in events:
+                if self.use_streams:
+                    _xadd(pipe, channel, event)
+                else:
+                    pipe.publish(channel, dumps(event))
+            await pipe.execute()
+
+    async def subscribe(self, user_id: str) -> Tuple[Mailbox, Callable[[], None]]:
+        return await self._hub.subscribe(self._chan(user_id))
+
+    async def attach(self, user_id: str, sink: Any) -> Callable[[], None]:
+        return await self._hub.attach(self._chan(user_id), sink)
+
+    def supports_replay(self) -> bool:
+        return self.use_streams
+
+    async def replay(self, user_id: str, last_event_id: str) -> List[Any]:
+        if not self.use_streams or stream_id_key(last_event_id) is None:
+            return []
+        return await self._hub.replay(self._chan(user_id), last_event_id, count=STREAM_MAXLEN)
+
+    async def close(self) -> None:
+        await self._hub.close()
+
+
+# Ensure REDIS_URL provided when the Redis broker is selected
+if not (REDIS_URL and (REDIS_URL.startswith("redis://") or REDIS_URL.startswith("rediss://"))):
+    raise RuntimeError(
+        "REDIS_URL not set or invalid. Put a rediss:// or redis:// URL in backend .env/.env.local."
+    )
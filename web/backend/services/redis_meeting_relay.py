@@ -0,0 +1,146 @@
+from typing import Any, Callable, Dict, List, Optional
+
+from ..storage.redis_client import redis
+from .jsoncodec import dumps, dumps_str, loads
+from .meeting_relay import MeetingRelay, MeetingSnapshot
+from .pubsub_hub import PubSubHub
+
+# Applies one delta to the shared hashes, bumps the meeting version and
+# publishes the delta under that version, atomically, so every worker sees
+# deltas in version order.
+# KEYS: participants hash, meta hash, version counter
+# ARGV: ttl, channel, origin, body, then counted groups:
+#       n, (userId, record)*n   n, userId*n   n, (field, value)*n
+_COMMIT_DELTA = """
+local i = 5
+local n = tonumber(ARGV[i]); i = i + 1
+for _ = 1, n do
+  redis.call('HSET', KEYS[1], ARGV[i], ARGV[i + 1]); i = i + 2
+end
+n = tonumber(ARGV[i]); i = i + 1
+for _ = 1, n do
+  redis.call('HDEL', KEYS[1], ARGV[i]); i = i + 1
+end
+n = tonumber(ARGV[i]); i = i + 1
+for _ = 1, n do
+  redis.call('HSET', KEYS[2], ARGV[i], ARGV[i + 1]); i = i + 2
+end
+local v = redis.call('INCR', KEYS[3])
+-- Meta and version outlive an empty participant set; the TTL cleans up
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+redis.call('EXPIRE', KEYS[2], ARGV[1])
+redis.call('EXPIRE', KEYS[3], ARGV[1])
+redis.call('PUBLISH', ARGV[2],
+  '{"o":"' .. ARGV[3] .. '","v":' .. v .. ',"b":' .. (v - 1) .. ',"body":' .. ARGV[4] .. '}')
+return v
+"""
+
+
+class _RelaySink:
+    """Hub sink handing every message on a meeting channel to the relay callback."""
+
+    __slots__ = ("relay", "meeting_id")
+
+    def __init__(self, relay: "RedisMeetingRelay", meeting_id: str) -> None:
+        self.relay = relay
+        self.meeting_id = meeting_id
+
+    def put_nowait(self, obj: Any) -> None:
+        if isinstance(obj, dict):
+            self.relay._deliver(self.meeting_id, obj)
+
+    def keepalive(self) -> None:
+        pass
+
+
+class RedisMeetingRelay(MeetingRelay):
+    """
+    Meeting state shared by every worker through Redis.
+
+    Participants are one hash per meeting (userId -> JSON record), meeting
+    fields another (field -> JSON value), plus a version counter; all expire
+    after `ttl` seconds without changes. Deltas and events go over one
+    pub/sub channel per meeting, read through a process-wide PubSubHub that
+    only subscribes to meetings with local sockets.
+    """
+
+    shared = True
+
+    def __init__(self, ttl: int) -> None:
+        super().__init__()
+        self.ttl = ttl
+        self._hub = PubSubHub(redis)
+        self._commit = redis.register_script(_COMMIT_DELTA)
+        # meetingId -> unsubscribe callback
+        self._unfollow: Dict[str, Callable[[], None]] = {}
+
+    def _chan(self, meeting_id: str) -> str:
+        return f"pubsub:magheart-meeting:{meeting_id}"
+
+    def _keys(self, meeting_id: str) -> List[str]:
+        return [
+            f"meeting:{meeting_id}:participants",
+            f"meeting:{meeting_id}:meta",
+            f"meeting:{meeting_id}:version",
+        ]
+
+    async def publish_delta(
+        self,
+        meeting_id: str,
+        body: Dict[str, Any],
+        upserts: Dict[str, Dict[str, Any]],
+        meta: Dict[str, Any],
+    ) -> int:
+        args: List[Any] = [self.ttl, self._chan(meeting_id), self.origin, dumps_str(body)]
+        args.append(len(upserts))
+        for user_id, record in upserts.items():
+            args += (user_id, dumps(record))
+        removed = body.get("removed") or ()
+        args.append(len(removed))
+        args += removed
+        args.append(len(meta))
+        for field, value in meta.items():
+            args += (field, dumps(value))
+        return int(await self._commit(keys=self._keys(meeting_id), args=args))
+
+    async def publish_event(self, meeting_id: str, event: Any) -> None:
+        await redis.publish(self._chan(meeting_id), dumps({"o": self.origin, "event": event}))
+
+    async def load(self, meeting_id: str) -> Optional[MeetingSnapshot]:
+        participants_key, meta_key, version_key = self._keys(meeting_id)
+        async with redis.pipeline(transaction=True) as pipe:
+            pipe.hgetall(participants_key)
+            pipe.hgetall(meta_key)
+            pipe.get(version_key)
+            records, fields, version = await pipe.execute()
+        participants: Dict[str, Dict[str, Any]] = {}
+        for user_id, raw in records.items():
+            try:
+                participants[user_id] = loads(raw)
+            except ValueError:
+                continue
+        meta: Dict[str, Any] = {}
+        for field, raw in fields.items():
+            try:
+                meta[field] = loads(raw)
+            except ValueError:
+                continue
+        return participants, meta, int(version or 0)
+
+    async def has_participant(self, meeting_id: str, user_id: str) -> bool:
+        return bool(await redis.hexists(self._keys(meeting_id)[0], user_id))
+
+    async def follow(self, meeting_id: str) -> None:
+        if meeting_id not in self._unfollow:
+            self._unfollow[meeting_id] = await self._hub.attach(
+                self._chan(meeting_id), _RelaySink(self, meeting_id)
+            )
+
+    async def unfollow(self, meeting_id: str) -> None:
+        unsubscribe = self._unfollow.pop(meeting_id, None)
+        if unsubscribe is not None:
+            unsubscribe()
+
+    async def close(self) -> None:
+        self._unfollow.clear()
+        await self._hub.close()
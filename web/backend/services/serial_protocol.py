@@ -0,0 +1,120 @@
+"""
+Framed host <-> MagHeart serial protocol (ARDUINO_PROTOCOL=framed).
+
+Host -> board, 5 bytes:   0xA5 | seq | cmd | value | chk
+Board -> host, 4 bytes:   0x5A | seq | status | chk
+
+chk is the XOR of the bytes between the start byte and the checksum.
+cmd 0x01 sets the heart rate to `value` BPM (0 stops). The board acks every
+frame with the same seq; status 0x00 = applied, 0x01 = rejected (bad value
+or checksum). Acks may be interleaved with the firmware's text log output,
+so the parser resynchronises on the start byte and validates the checksum.
+"""
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+FRAME_START = 0xA5
+ACK_START = 0x5A
+CMD_SET_BPM = 0x01
+ACK_OK = 0x00
+
+
+def _xor(*values: int) -> int:
+    chk = 0
+    for v in values:
+        chk ^= v
+    return chk
+
+
+def encode_set_bpm(seq: int, bpm: int) -> bytes:
+    seq &= 0xFF
+    bpm = max(0, min(255, bpm))
+    return bytes((FRAME_START, seq, CMD_SET_BPM, bpm, _xor(seq, CMD_SET_BPM, bpm)))
+
+
+class AckParser:
+    """Incremental parser that pulls (seq, status) acks out of a byte stream."""
+
+    def __init__(self) -> None:
+        self._buf = bytearray()
+
+    def feed(self, data: bytes) -> List[Tuple[int, int]]:
+        self._buf.extend(data)
+        acks: List[Tuple[int, int]] = []
+        while True:
+            start = self._buf.find(ACK_START)
+            if start < 0:
+                self._buf.clear()
+                break
+            if start:
+                del self._buf[:start]
+            if len(self._buf) < 4:
+                break
+            _, seq, status, chk = self._buf[:4]
+            if _xor(seq, status) == chk:
+                acks.append((seq, status))
+                del self._buf[:4]
+            else:
+                # Not an ack (e.g. an ASCII 'Z' in a log line): skip this byte
+                del self._buf[:1]
+        return acks
+
+
+class LatencyTracker:
+    """Matches acks to sends and keeps a window of round-trip latencies."""
+
+    def __init__(self, window: int = 512, ack_timeout: float = 2.0) -> None:
+        self.ack_timeout = ack_timeout
+        self._inflight: Dict[int, float] = {}
+        self._samples: Deque[float] = deque(maxlen=max(1, window))
+        self.acked = 0
+        self.rejected = 0
+        self.unacked = 0
+
+    def sent(self, seq: int) -> None:
+        now = time.perf_counter()
+        self._expire(now)
+        if seq in self._inflight:
+            # seq wrapped around before the old frame was acked
+            self.unacked += 1
+        self._inflight[seq] = now
+
+    def ack(self, seq: int, status: int) -> Optional[float]:
+        sent_at = self._inflight.pop(seq, None)
+        if sent_at is None:
+            return None
+        rtt = time.perf_counter() - sent_at
+        if status == ACK_OK:
+            self.acked += 1
+            self._samples.append(rtt)
+        else:
+            self.rejected += 1
+        return rtt
+
+    def _expire(self, now: float) -> None:
+        stale = [s for s, t in self._inflight.items() if now - t > self.ack_timeout]
+        for s in stale:
+            del self._inflight[s]
+        self.unacked += len(stale)
+
+    def stats(self) -> Dict[str, object]:
+        ordered = sorted(self._samples)
+
+        def pct(p: float) -> Optional[float]:
+            if not ordered:
+                return None
+            idx = min(len(ordered) - 1, int(round(p * (len(ordered) - 1))))
+            return round(ordered[idx] * 1000, 2)
+
+        return {
+            "count": len(ordered),
+            "p50Ms": pct(0.50),
+            "p90Ms": pct(0.90),
+            "p99Ms": pct(0.99),
+            "maxMs": round(ordered[-1] * 1000, 2) if ordered else None,
+            "acked": self.acked,
+            "rejected": self.rejected,
+            "unacked": self.unacked,
+            "inflight": len(self._inflight),
+        }
@@ -1,73 +1,85 @@
-import asyncio
-import json
-from typing import Any, Tuple, Callable, Optional
-
-from ..config import REDIS_URL
-from ..storage.redis_client import redis
-
+"""
+Real-time signal API used by the routers: latest value per user plus event
+fan-out. Delegates to the broker selected by MAGHEART_BROKER ("redis" or
+"memory").
+"""
+from typing import Any, Tuple, Callable, Optional, Iterable, List
+
+from ..config import (
+    BROKER_BACKEND,
+    LATEST_TTL_SECONDS,
+    LATEST_CACHE_SIZE,
+    SSE_QUEUE_SIZE,
+    SSE_HR_POLICY,
+    SSE_KEEPALIVE_SECONDS,
+    SIGNAL_TRANSPORT,
+    STREAM_MAXLEN,
+)
+from .broker import Broker, MemoryBroker
+from .mailbox import Mailbox
+
+
+_hub_options = dict(
+    queue_size=SSE_QUEUE_SIZE,
+    latest_only=SSE_HR_POLICY == "latest",
+    keepalive_interval=SSE_KEEPALIVE_SECONDS,
+)
+
+broker: Broker
+if BROKER_BACKEND == "memory":
+    broker = MemoryBroker(
+        LATEST_TTL_SECONDS,
+        LATEST_CACHE_SIZE,
+        replay_size=STREAM_MAXLEN if SIGNAL_TRANSPORT == "streams" else 0,
+        **_hub_options,
+    )
+else:
+    from .redis_broker import RedisBroker
 
-def _chan(user_id: str) -> str:
-    return f"pubsub:magheart:{user_id}"
+    broker = RedisBroker(use_streams=SIGNAL_TRANSPORT == "streams", **_hub_options)
 
 
 async def set_latest(user_id: str, data: Any) -> None:
-    await redis.set(f"latest_heart_rate:{user_id}", json.dumps(data), ex=120)
+    await broker.set_latest(user_id, data)
 
 
 async def get_latest(user_id: str) -> Optional[Any]:
-    val = await redis.get(f"latest_heart_rate:{user_id}")
-    if not val:
-        return None
-    try:
-        return json.loads(val)
-    except Exception:
-        return None
+    return await broker.get_latest(user_id)
 
 
 async def publish(user_id: str, event: Any) -> None:
-    await redis.publish(_chan(user_id), json.dumps(event))
-
-
-async def subscribe(user_id: str) -> Tuple[asyncio.Queue, Callable[[], None]]:
-    channel = _chan(user_id)
-    pubsub = redis.pubsub()
-    await pubsub.subscribe(channel)
-
-    q: asyncio.Queue = asyncio.Queue()
-    stop = asyncio.Event()
-
-    async def reader():
-        try:
-            while not stop.is_set():
-                msg = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
-                if msg and msg.get("type") == "message":
-                    payload = msg["data"]
-                    try:
-                        obj = json.loads(payload)
-                    except Exception:
-                        obj = {"data": payload}
-                    try:
-                        q.put_nowait(obj)
-                    except asyncio.QueueFull:
-                        pass
-        finally:
-            try:
-                await pubsub.unsubscribe(channel)
-            finally:
-                await pubsub.close()
-
-    task = asyncio.create_task(reader())
-
-    def unsubscribe() -> None:
-        stop.set()
-        task.cancel()
-
-    return q, unsubscribe
-
-
-# Ensure REDIS_URL provided (cloud only, no local/memory fallback)
-if not (REDIS_URL and (REDIS_URL.startswith("redis://") or REDIS_URL.startswith("rediss://"))):
-    raise RuntimeError(
-        "REDIS_URL not set or invalid. Put a rediss:// or redis:// URL in backend .env/.env.local."
-    )
+    await broker.publish(user_id, event)
+
+
+async def set_latest_and_publish(user_id: str, latest: Any, events: Iterable[Any]) -> None:
+    """Update the latest value and publish events in one broker round trip."""
+    await broker.set_latest_and_publish(user_id, latest, events)
+
+
+async def subscribe(user_id: str) -> Tuple[Mailbox, Callable[[], None]]:
+    """Bounded mailbox of decoded events for one user."""
+    return await broker.subscribe(user_id)
+
+
+async def attach(user_id: str, sink: Any) -> Callable[[], None]:
+    """
+    Deliver one user's events to `sink` (anything with put_nowait() and
+    keepalive()) instead of a mailbox; returns its unsubscribe callback.
+    """
+    return await broker.attach(user_id, sink)
+
+
+def supports_replay() -> bool:
+    return broker.supports_replay()
+
+
+async def replay(user_id: str, last_event_id: str) -> List[Any]:
+    """
+    Events published after `last_event_id` (a stream id from a previous SSE
+    session). Empty when the transport can't replay or the id is unusable.
+    """
+    return await broker.replay(user_id, last_event_id)
+
 
+async def close() -> None:
+    await broker.close()
@@ -0,0 +1,87 @@
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from redis.exceptions import TimeoutError as RedisTimeoutError
+
+from .jsoncodec import loads
+from .pubsub_hub import PubSubHub
+
+logger = logging.getLogger(__name__)
+
+
+def stream_id_key(entry_id: str) -> Optional[Tuple[int, int]]:
+    """Sortable key for a Redis stream id ("<ms>-<seq>"); None if malformed."""
+    try:
+        ms, _, seq = entry_id.partition("-")
+        return int(ms), int(seq or 0)
+    except (AttributeError, ValueError):
+        return None
+
+
+def decode_entry(entry_id: str, fields: Dict[str, Any]) -> Any:
+    """Event object for a stream entry, with the entry id as its SSE id."""
+    raw = fields.get("event")
+    try:
+        obj = loads(raw)
+    except Exception:
+        obj = {"data": raw}
+    if isinstance(obj, dict):
+        obj["id"] = entry_id
+    return obj
+
+
+class StreamHub(PubSubHub):
+    """
+    Redis Streams flavour of the subscription hub.
+
+    Events are XADDed to one capped stream per user. A single reader task
+    XREADs every stream with local subscribers, tracking the last id seen
+    per stream, and fans entries out exactly like the pub/sub hub. Streams
+    additionally allow `replay()` from a client's Last-Event-ID.
+    """
+
+    def __init__(self, redis: Any, block_ms: int = 1000, **kwargs: Any) -> None:
+        super().__init__(redis, **kwargs)
+        self.block_ms = block_ms
+        # stream -> last entry id delivered
+        self._cursors: Dict[str, str] = {}
+
+    async def replay(self, stream: str, after_id: str, count: int) -> List[Any]:
+        """Entries strictly after `after_id`, oldest first (at most `count`)."""
+        entries = await self.redis.xrange(stream, min=f"({after_id}", max="+", count=count)
+        return [decode_entry(entry_id, fields) for entry_id, fields in entries]
+
+    async def _sync_channel(self, channel: str) -> None:
+        async with self._cmd_lock:
+            wanted = channel in self._queues
+            if wanted and channel not in self._cursors:
+                last = await self.redis.xrevrange(channel, count=1)
+                self._cursors[channel] = last[0][0] if last else "0-0"
+                self._subscribed.add(channel)
+                if self._reader is None or self._reader.done():
+                    self._reader = asyncio.create_task(self._read_loop())
+            elif not wanted and channel in self._cursors:
+                del self._cursors[channel]
+                self._subscribed.discard(channel)
+
+    async def _read_loop(self) -> None:
+        while self._cursors:
+            try:
+                batches = await self.redis.xread(
+                    streams=dict(self._cursors), block=self.block_ms, count=100
+                )
+            except asyncio.CancelledError:
+                raise
+            except RedisTimeoutError:
+                continue  # idle past REDIS_SOCKET_TIMEOUT; keep waiting
+            except Exception as e:
+                logger.warning(f"Stream reader error, retrying: {e}")
+                await asyncio.sleep(1.0)
+                continue
+            for stream, entries in batches or []:
+                if stream not in self._cursors:
+                    continue
+                for entry_id, fields in entries:
+                    self._cursors[stream] = entry_id
+                    self.fan_out(stream, decode_entry(entry_id, fields))
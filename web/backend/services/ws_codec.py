@@ -0,0 +1,53 @@
+"""
+Wire formats of the co-creation WebSocket.
+
+JSON text frames are the default. A client offering the `magheart.msgpack`
+subprotocol gets binary MessagePack frames both ways, if `msgpack` is
+installed (`pip install msgpack`); otherwise the offer is declined and the
+connection stays on JSON.
+
+MeetingManager encodes each frame once per protocol in use among its
+recipients and caches the encoded snapshot per meeting version.
+"""
+from typing import Any, Iterable, Optional, Union
+
+from .jsoncodec import dumps_str, loads
+
+try:
+    import msgpack  # type: ignore
+except ImportError:  # optional dependency
+    msgpack = None
+
+JSON = "json"
+MSGPACK = "magheart.msgpack"
+
+Frame = Union[str, bytes]
+
+
+def negotiate(offered: Iterable[str]) -> Optional[str]:
+    """Subprotocol to accept from the client's offer (None = plain JSON)."""
+    if msgpack is not None and MSGPACK in offered:
+        return MSGPACK
+    return None
+
+
+def encode(obj: Any, protocol: str = JSON) -> Frame:
+    """Text frame for JSON connections, binary frame for MessagePack ones."""
+    if protocol == MSGPACK:
+        return msgpack.packb(obj)
+    return dumps_str(obj)
+
+
+def decode(data: Frame) -> Any:
+    """
+    Decode an inbound frame: bytes as MessagePack, text as JSON. Malformed
+    input raises ValueError.
+    """
+    if isinstance(data, str):
+        return loads(data)
+    if msgpack is None:
+        raise ValueError("binary frames need the msgpack subprotocol")
+    try:
+        return msgpack.unpackb(data)
+    except Exception as e:
+        raise ValueError(str(e)) from e
@@ -0,0 +1,104 @@
+import asyncio
+import logging
+from collections import deque
+from typing import Callable, Deque, Optional
+
+from fastapi import WebSocket
+
+from .ws_codec import JSON, Frame
+
+logger = logging.getLogger(__name__)
+
+# WebSocket close code 1013 "Try Again Later": the client may reconnect
+EVICT_CLOSE_CODE = 1013
+
+
+class ConnectionSender:
+    """
+    Bounded outbound queue and sender task for one WebSocket.
+
+    send() only appends to the queue, so a broadcast costs O(1) per
+    connection no matter how slow that client is. The connection is evicted
+    (on_evict is called and the socket closed) when its queue overflows or
+    a single send stalls past `send_timeout`; the client's receive loop then
+    ends and it can reconnect for a fresh snapshot. `protocol` is the wire
+    format negotiated for the socket; bytes frames go out as binary.
+    """
+
+    __slots__ = (
+        "websocket", "protocol", "maxsize", "send_timeout", "closed",
+        "_on_evict", "_items", "_event", "_task", "_closer",
+    )
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        maxsize: int = 64,
+        send_timeout: float = 5.0,
+        on_evict: Optional[Callable[["ConnectionSender"], None]] = None,
+        protocol: str = JSON,
+    ) -> None:
+        self.websocket = websocket
+        self.protocol = protocol
+        self.maxsize = max(1, maxsize)
+        self.send_timeout = send_timeout
+        self.closed = False
+        self._on_evict = on_evict
+        self._items: Deque[Frame] = deque()
+        self._event = asyncio.Event()
+        self._task: Optional[asyncio.Task] = asyncio.create_task(self._run())
+        self._closer: Optional[asyncio.Task] = None
+
+    def send(self, message: Frame) -> bool:
+        """Queue a frame; returns False if the connection is (now) evicted."""
+        if self.closed:
+            return False
+        if len(self._items) >= self.maxsize:
+            self.evict("send queue overflow")
+            return False
+        self._items.append(message)
+        self._event.set()
+        return True
+
+    def qsize(self) -> int:
+        return len(self._items)
+
+    async def _run(self) -> None:
+        while True:
+            while not self._items:
+                self._event.clear()
+                await self._event.wait()
+            message = self._items.popleft()
+            send = self.websocket.send_bytes if isinstance(message, bytes) else self.websocket.send_text
+            try:
+                await asyncio.wait_for(send(message), self.send_timeout)
+            except asyncio.TimeoutError:
+                self.evict(f"send stalled for more than {self.send_timeout}s")
+                return
+            except Exception as e:
+                self.evict(f"send failed: {e}")
+                return
+
+    def evict(self, reason: str) -> None:
+        """Drop this connection as a slow or broken consumer."""
+        if self.closed:
+            return
+        logger.warning(f"⚠️  Evicting WebSocket connection: {reason}")
+        self.stop()
+        if self._on_evict is not None:
+            self._on_evict(self)
+        self._closer = asyncio.create_task(self._close_socket())
+
+    def stop(self) -> None:
+        """Stop sending without closing the socket (it is already going away)."""
+        self.closed = True
+        self._items.clear()
+        task, self._task = self._task, None
+        if task is not None and task is not asyncio.current_task():
+            task.cancel()
+
+    async def _close_socket(self) -> None:
+        try:
+            await asyncio.wait_for(self.websocket.close(code=EVICT_CLOSE_CODE), self.send_timeout)
+        except Exception:
+            pass
@@ -0,0 +1,21 @@
+"""
+Selects the heart-rate history backend configured by MAGHEART_STORAGE_BACKEND.
+
+Both backends expose the same coroutine interface:
+start / close / append_heart_rate / append_heart_rates / read_latest /
+read_range.
+"""
+from ..config import STORAGE_BACKEND
+
+if STORAGE_BACKEND == "binary":
+    from . import binary_store as _impl
+else:
+    from . import database as _impl
+
+
+start = _impl.start
+close = _impl.close
+append_heart_rate = _impl.append_heart_rate
+append_heart_rates = _impl.append_heart_rates
+read_latest = _impl.read_latest
+read_range = _impl.read_range
@@ -0,0 +1,355 @@
+"""
+Memory-mapped binary time-series backend.
+
+Each user gets a directory `DATA_DIR/{user}.hr/` holding append-only segment
+files of fixed-width records plus a small device-name dictionary:
+
+    seg-000000.bin, seg-000001.bin, ...   packed (ts int64, bpm uint8, device uint16)
+    devices.json                          {"watch_a": 1, ...}; id 0 means "no device"
+
+Segments roll over after BINARY_SEGMENT_RECORDS records. Reads map the
+segment files with numpy.memmap and hand out zero-copy views.
+
+The record count of the active segment is kept in memory and only advanced
+after a chunk is fully written, so readers never map a half-written record.
+A torn tail left by a crash is cut off when the series is opened.
+
+Samples normally arrive in timestamp order, but a late sample or an old
+batch can land after newer ones. Each segment tracks whether its records are
+still sorted; range reads bisect sorted segments and filter the others.
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from ..config import DATA_DIR, BINARY_SEGMENT_RECORDS
+from .paths import safe_user
+
+
+RECORD_DTYPE = np.dtype([("ts", "<i8"), ("bpm", "u1"), ("device", "<u2")])
+_SEGMENT_FMT = "seg-{:06d}.bin"
+_MAX_DEVICE_ID = np.iinfo(np.uint16).max
+
+logger = logging.getLogger(__name__)
+
+
+def _whole_records(path: str) -> int:
+    """Record count of a segment file, truncating a partial trailing record."""
+    if not os.path.exists(path):
+        return 0
+    size = os.path.getsize(path)
+    torn = size % RECORD_DTYPE.itemsize
+    if torn:
+        logger.warning(f"⚠️  Truncating {torn} torn trailing bytes of {path}")
+        os.truncate(path, size - torn)
+    return size // RECORD_DTYPE.itemsize
+
+
+def _is_sorted(ts: np.ndarray) -> bool:
+    return bool(np.all(ts[1:] >= ts[:-1]))
+
+
+class _UserSeries:
+    """On-disk layout and cached state for one user's series."""
+
+    def __init__(self, root: str) -> None:
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self.segments: List[str] = sorted(
+            f for f in os.listdir(root) if f.startswith("seg-") and f.endswith(".bin")
+        )
+        if not self.segments:
+            self.segments.append(_SEGMENT_FMT.format(0))
+        for name in self.segments[:-1]:
+            _whole_records(self.segment_path(name))
+        # Committed records in the active segment; bytes past it are not yet valid
+        self.active_records = _whole_records(self.segment_path(self.segments[-1]))
+        self.active_sorted = True
+        self.active_last: Optional[int] = None
+        if self.active_records:
+            ts = np.memmap(
+                self.segment_path(self.segments[-1]), dtype=RECORD_DTYPE, mode="r",
+                shape=(self.active_records,),
+            )["ts"]
+            self.active_sorted = _is_sorted(ts)
+            self.active_last = int(ts[-1])
+        self.devices_path = os.path.join(root, "devices.json")
+        self.device_ids: Dict[str, int] = {}
+        if os.path.exists(self.devices_path):
+            with open(self.devices_path, "r") as f:
+                self.device_ids = json.load(f)
+        self.device_names: Dict[int, str] = {v: k for k, v in self.device_ids.items()}
+        # Sealed segments never change, so their maps (and whether they are in
+        # ts order) can be cached forever
+        self.sealed_maps: Dict[str, Tuple[np.memmap, bool]] = {}
+
+    def segment_path(self, name: str) -> str:
+        return os.path.join(self.root, name)
+
+    def active_count(self) -> int:
+        return self.active_records
+
+    def roll(self) -> None:
+        self.segments.append(_SEGMENT_FMT.format(len(self.segments)))
+        self.active_records = 0
+        self.active_sorted = True
+        self.active_last = None
+
+    def write_active(self, chunk: np.ndarray) -> None:
+        """
+        Write `chunk` right after the committed records of the active segment.
+        On failure the file is cut back so the count and length stay in step.
+        """
+        path = self.segment_path(self.segments[-1])
+        base = self.active_records * RECORD_DTYPE.itemsize
+        with open(path, "r+b" if os.path.exists(path) else "wb") as f:
+            try:
+                f.seek(base)
+                f.write(chunk.tobytes())
+                f.flush()
+            except OSError:
+                try:
+                    f.truncate(base)
+                except OSError:
+                    pass
+                raise
+        self.active_records += len(chunk)
+        ts = chunk["ts"]
+        if self.active_sorted:
+            self.active_sorted = _is_sorted(ts) and (
+                self.active_last is None or int(ts[0]) >= self.active_last
+            )
+        self.active_last = int(ts[-1])
+
+    def device_id(self, name: Optional[str]) -> int:
+        if not name:
+            return 0
+        dev_id = self.device_ids.get(name)
+        if dev_id is None:
+            dev_id = len(self.device_ids) + 1
+            if dev_id > _MAX_DEVICE_ID:
+                return 0
+            self.device_ids[name] = dev_id
+            self.device_names[dev_id] = name
+            tmp = self.devices_path + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump(self.device_ids, f)
+            os.replace(tmp, self.devices_path)
+        return dev_id
+
+
+class BinaryTimeSeriesStore:
+    def __init__(self, data_dir: str, segment_records: int) -> None:
+        self.data_dir = data_dir
+        self.segment_records = max(1, segment_records)
+        self._series: Dict[str, _UserSeries] = {}
+        self._lock = threading.Lock()
+
+    def _root(self, user_id: str) -> str:
+        return os.path.join(self.data_dir, f"{safe_user(user_id)}.hr")
+
+    def _get(self, user_id: str, create: bool) -> Optional[_UserSeries]:
+        root = self._root(user_id)
+        series = self._series.get(root)
+        if series is None:
+            if not create and not os.path.isdir(root):
+                return None
+            series = _UserSeries(root)
+            self._series[root] = series
+        return series
+
+    def append(self, user_id: str, records: Iterable[Dict[str, Any]]) -> None:
+        records = list(records)
+        if not records:
+            return
+        with self._lock:
+            series = self._get(user_id, create=True)
+            arr = np.empty(len(records), dtype=RECORD_DTYPE)
+            arr["ts"] = [int(r.get("ts") or 0) for r in records]
+            arr["bpm"] = [max(0, min(255, int(r.get("bpm") or 0))) for r in records]
+            arr["device"] = [series.device_id(r.get("device")) for r in records]
+
+            offset = 0
+            while offset < len(arr):
+                room = self.segment_records - series.active_count()
+                if room <= 0:
+                    series.roll()
+                    continue
+                chunk = arr[offset : offset + room]
+                series.write_active(chunk)
+                offset += len(chunk)
+
+    def segments(self, user_id: str) -> List[np.ndarray]:
+        """Zero-copy views over every segment, oldest first."""
+        return [view for view, _ in self._segments(user_id)]
+
+    def _segments(self, user_id: str) -> List[Tuple[np.ndarray, bool]]:
+        """(view, records are in ts order) for every segment, oldest first."""
+        with self._lock:
+            series = self._get(user_id, create=False)
+            if series is None:
+                return []
+            views: List[Tuple[np.ndarray, bool]] = []
+            last = len(series.segments) - 1
+            for i, name in enumerate(series.segments):
+                entry = series.sealed_maps.get(name)
+                if entry is None:
+                    path = series.segment_path(name)
+                    if i == last:
+                        count = series.active_count()
+                    elif os.path.exists(path):
+                        count = os.path.getsize(path) // RECORD_DTYPE.itemsize
+                    else:
+                        count = 0
+                    if not count:
+                        continue
+                    view = np.memmap(path, dtype=RECORD_DTYPE, mode="r", shape=(count,))
+                    if i < last:
+                        entry = (view, _is_sorted(view["ts"]))
+                        series.sealed_maps[name] = entry
+                    else:
+                        entry = (view, series.active_sorted)
+                views.append(entry)
+            return views
+
+    def device_name(self, user_id: str, device_id: int) -> Optional[str]:
+        series = self._get(user_id, create=False)
+        if series is None or not device_id:
+            return None
+        return series.device_names.get(int(device_id))
+
+    def to_record(self, user_id: str, row: np.void) -> Dict[str, Any]:
+        return {
+            "ts": int(row["ts"]),
+            "bpm": int(row["bpm"]),
+            "device": self.device_name(user_id, row["device"]),
+        }
+
+    def range_views(self, user_id: str, start_ts: int, end_ts: int) -> List[np.ndarray]:
+        """
+        Records with start_ts <= ts <= end_ts, one array per segment in write
+        order: zero-copy slices of sorted segments, filtered copies of others.
+        """
+        return [view for view, _ in self._range_views(user_id, start_ts, end_ts)]
+
+    def _range_views(self, user_id: str, start_ts: int, end_ts: int) -> List[Tuple[np.ndarray, bool]]:
+        out: List[Tuple[np.ndarray, bool]] = []
+        for view, ordered in self._segments(user_id):
+            ts = view["ts"]
+            if ordered:
+                if ts[-1] < start_ts or ts[0] > end_ts:
+                    continue
+                lo = int(np.searchsorted(ts, start_ts, side="left"))
+                hi = int(np.searchsorted(ts, end_ts, side="right"))
+                part = view[lo:hi]
+            else:
+                part = view[(ts >= start_ts) & (ts <= end_ts)]
+            if len(part):
+                out.append((part, ordered))
+        return out
+
+    def range(self, user_id: str, start_ts: int, end_ts: int, limit: int) -> List[Dict[str, Any]]:
+        parts = self._range_views(user_id, start_ts, end_ts)
+        in_order = all(ordered for _, ordered in parts) and all(
+            a["ts"][-1] <= b["ts"][0] for (a, _), (b, _) in zip(parts, parts[1:])
+        )
+        if not in_order:
+            rows = np.concatenate([view for view, _ in parts])
+            rows = rows[np.argsort(rows["ts"], kind="stable")[:limit]]
+            return [self.to_record(user_id, row) for row in rows]
+        out: List[Dict[str, Any]] = []
+        for view, _ in parts:
+            for row in view[: limit - len(out)]:
+                out.append(self.to_record(user_id, row))
+            if len(out) >= limit:
+                break
+        return out
+
+    def buckets(
+        self, user_id: str, width: int, start_ts: int, end_ts: int, limit: int
+    ) -> List[Dict[str, Any]]:
+        """
+        {ts, min, max, mean, count} per `width`-ms bucket whose start lies in
+        [start_ts, end_ts], oldest first, at most `limit`.
+        """
+        lo = start_ts - start_ts % width
+        hi = end_ts - end_ts % width + width - 1
+        parts = self.range_views(user_id, lo, hi)
+        if not parts:
+            return []
+        rows = np.concatenate(parts)
+        starts = rows["ts"] - rows["ts"] % width
+        order = np.argsort(starts, kind="stable")
+        starts, bpm = starts[order], rows["bpm"][order].astype(np.int64)
+        keys, first, counts = np.unique(starts, return_index=True, return_counts=True)
+        keys, first, counts = keys[:limit], first[:limit], counts[:limit]
+        bpm = bpm[: first[-1] + counts[-1]]
+        mins = np.minimum.reduceat(bpm, first)
+        maxs = np.maximum.reduceat(bpm, first)
+        sums = np.add.reduceat(bpm, first)
+        return [
+            {
+                "ts": int(ts),
+                "min": int(mn),
+                "max": int(mx),
+                "mean": round(float(total) / int(count), 2),
+                "count": int(count),
+            }
+            for ts, mn, mx, total, count in zip(keys, mins, maxs, sums, counts)
+        ]
+
+    def latest(self, user_id: str) -> Optional[Dict[str, Any]]:
+        views = self.segments(user_id)
+        if not views:
+            return None
+        return self.to_record(user_id, views[-1][-1])
+
+
+_store = BinaryTimeSeriesStore(DATA_DIR, BINARY_SEGMENT_RECORDS)
+
+
+async def start() -> None:
+    """Nothing to start: appends are written through on each call."""
+
+
+async def close() -> None:
+    """Nothing to flush: segment files are closed after every append."""
+
+
+async def append_heart_rate(user_id: str, record: Dict[str, Any]) -> None:
+    await asyncio.to_thread(_store.append, user_id, [record])
+
+
+async def append_heart_rates(user_id: str, records: Iterable[Dict[str, Any]]) -> None:
+    records = list(records)
+    if not records:
+        return
+    await asyncio.to_thread(_store.append, user_id, records)
+
+
+async def read_latest(user_id: str) -> Optional[Dict[str, Any]]:
+    return await asyncio.to_thread(_store.latest, user_id)
+
+
+async def read_segments(user_id: str) -> List[np.ndarray]:
+    """Zero-copy NumPy views over the user's history, one per segment."""
+    return await asyncio.to_thread(_store.segments, user_id)
+
+
+async def read_range(
+    user_id: str, start_ts: int, end_ts: int, limit: int
+) -> List[Dict[str, Any]]:
+    """Samples with start_ts <= ts <= end_ts, oldest first, at most `limit`."""
+    return await asyncio.to_thread(_store.range, user_id, start_ts, end_ts, limit)
+
+
+async def read_buckets(
+    user_id: str, width: int, start_ts: int, end_ts: int, limit: int
+) -> List[Dict[str, Any]]:
+    """Rollup buckets aggregated on the fly from the segments."""
+    return await asyncio.to_thread(_store.buckets, user_id, width, start_ts, end_ts, limit)
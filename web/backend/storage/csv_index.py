@@ -0,0 +1,193 @@
+"""
+Sparse block index for the per-user CSV files.
+
+Rows appended to `{user}.csv` are grouped into blocks of `stride` rows. Each
+sealed block gets an entry in a sidecar file `{user}.idx` (after an 8-byte
+format tag) of packed (start offset, end offset, min ts, max ts) int64s. A
+range query reads only the blocks whose [min ts, max ts] overlaps the range,
+plus the unsealed tail of at most `stride` rows, and filters rows inside
+each block.
+
+Rows need not be in timestamp order: a late sample or an old batch only
+widens its block's range. Matches are returned sorted by timestamp (file
+order among equal timestamps).
+"""
+import csv
+import os
+import struct
+import threading
+from typing import Dict, List, Optional, Tuple
+
+_MAGIC = b"MHIDX\x00\x00\x02"
+_ENTRY = struct.Struct("<qqqq")
+
+# (start offset, end offset, min ts, max ts)
+Block = Tuple[int, int, int, int]
+
+
+class _PathIndex:
+    __slots__ = ("blocks", "tail_start", "tail_rows", "tail_min", "tail_max", "covered")
+
+    def __init__(self) -> None:
+        self.blocks: List[Block] = []
+        # Rows after the last sealed block, not yet persisted
+        self.tail_start = 0
+        self.tail_rows = 0
+        self.tail_min: Optional[int] = None
+        self.tail_max: Optional[int] = None
+        # Rows starting before this byte offset are already accounted for
+        self.covered = 0
+
+    def add(self, ts: int, offset: int, stride: int) -> Optional[Block]:
+        """Account for a row at `offset`; returns the block it sealed, if any."""
+        if offset < self.covered:
+            return None  # already picked up by a rebuild
+        self.covered = offset + 1
+        sealed: Optional[Block] = None
+        if self.tail_rows >= stride:
+            sealed = (self.tail_start, offset, self.tail_min, self.tail_max)
+            self.blocks.append(sealed)
+            self.tail_start = offset
+            self.tail_rows = 0
+            self.tail_min = self.tail_max = None
+        self.tail_rows += 1
+        self.tail_min = ts if self.tail_min is None else min(self.tail_min, ts)
+        self.tail_max = ts if self.tail_max is None else max(self.tail_max, ts)
+        return sealed
+
+
+def _rows_in(f, start: int, end: Optional[int]):
+    """(ts, parsed row) for each data row in bytes [start, end) of an open file."""
+    f.seek(start)
+    data = f.read() if end is None else f.read(end - start)
+    for line in data.splitlines():
+        text = line.decode("utf-8", errors="replace").strip()
+        if not text:
+            continue
+        parts = next(csv.reader([text]))
+        try:
+            ts = int(parts[0])
+        except (ValueError, IndexError):
+            continue  # header or malformed row
+        yield ts, parts
+
+
+class SparseTimestampIndex:
+    def __init__(self, stride: int = 256) -> None:
+        self.stride = max(1, stride)
+        self._indexes: Dict[str, _PathIndex] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def idx_path(csv_path: str) -> str:
+        return os.path.splitext(csv_path)[0] + ".idx"
+
+    # ---- Maintenance (called from writer threads) -------------------------
+
+    def observe(self, csv_path: str, rows: List[Tuple[int, int]]) -> None:
+        """
+        Record freshly written rows as (ts, byte offset) pairs and persist any
+        blocks they seal to the sidecar file.
+        """
+        with self._lock:
+            idx = self._load(csv_path)
+            sealed: List[Block] = []
+            for ts, offset in rows:
+                if ts is None:
+                    continue
+                block = idx.add(int(ts), offset, self.stride)
+                if block is not None:
+                    sealed.append(block)
+            if sealed:
+                self._persist(csv_path, sealed, append=True)
+
+    # ---- Lookup -----------------------------------------------------------
+
+    def scan(self, csv_path: str, start_ts: int, end_ts: int, limit: int) -> List[List[str]]:
+        """
+        Parsed CSV rows with start_ts <= ts (first column) <= end_ts, sorted by
+        ts, at most `limit`. Blocking; run in a thread.
+        """
+        if not os.path.exists(csv_path) or limit <= 0:
+            return []
+        with self._lock:
+            idx = self._load(csv_path)
+            spans: List[Tuple[int, Optional[int], int]] = [
+                (start, end, lo) for start, end, lo, hi in idx.blocks
+                if lo <= end_ts and hi >= start_ts
+            ]
+            # The tail may hold rows written since the last observe; always read it
+            spans.append((idx.tail_start, None, start_ts))
+        out: List[Tuple[int, List[str]]] = []
+        with open(csv_path, "rb") as f:
+            for start, end, lo in spans:
+                if len(out) >= limit and lo > out[-1][0]:
+                    continue  # every row here sorts after the `limit` kept so far
+                for ts, parts in _rows_in(f, start, end):
+                    if start_ts <= ts <= end_ts:
+                        out.append((ts, parts))
+                if len(out) >= limit:
+                    out.sort(key=lambda item: item[0])
+                    del out[limit:]
+        out.sort(key=lambda item: item[0])
+        return [parts for _, parts in out[:limit]]
+
+    # ---- Internals --------------------------------------------------------
+
+    def _load(self, csv_path: str) -> _PathIndex:
+        idx = self._indexes.get(csv_path)
+        if idx is not None:
+            return idx
+        idx = _PathIndex()
+        size = os.path.getsize(csv_path) if os.path.exists(csv_path) else 0
+        idx_path = self.idx_path(csv_path)
+        blocks: Optional[List[Block]] = None
+        if size and os.path.exists(idx_path):
+            with open(idx_path, "rb") as f:
+                raw = f.read()
+            if raw.startswith(_MAGIC):
+                body = raw[len(_MAGIC):]
+                body = body[: len(body) - len(body) % _ENTRY.size]
+                blocks = list(_ENTRY.iter_unpack(body))
+                if blocks and blocks[-1][1] > size:
+                    blocks = None  # sidecar is ahead of the data file (e.g. CSV replaced)
+        if blocks is None:
+            if size:
+                self._rebuild(csv_path, idx)
+        else:
+            idx.blocks = blocks
+            idx.tail_start = blocks[-1][1] if blocks else 0
+            sealed = self._scan_tail(csv_path, idx)
+            if sealed:
+                self._persist(csv_path, sealed, append=True)
+        self._indexes[csv_path] = idx
+        return idx
+
+    def _scan_tail(self, csv_path: str, idx: _PathIndex) -> List[Block]:
+        """Account for rows past the last sealed block; returns blocks sealed."""
+        offset = idx.tail_start
+        sealed: List[Block] = []
+        with open(csv_path, "rb") as f:
+            f.seek(offset)
+            for line in f:
+                head = line.split(b",", 1)[0]
+                if head.strip().isdigit():
+                    block = idx.add(int(head), offset, self.stride)
+                    if block is not None:
+                        sealed.append(block)
+                offset += len(line)
+        idx.covered = max(idx.covered, offset)
+        return sealed
+
+    def _rebuild(self, csv_path: str, idx: _PathIndex) -> None:
+        """One-off scan for CSV files without a (current) sidecar."""
+        self._scan_tail(csv_path, idx)
+        self._persist(csv_path, idx.blocks, append=False)
+
+    def _persist(self, csv_path: str, blocks: List[Block], append: bool) -> None:
+        path = self.idx_path(csv_path)
+        fresh = not append or not os.path.exists(path) or os.path.getsize(path) == 0
+        with open(path, "wb" if fresh else "ab") as f:
+            if fresh:
+                f.write(_MAGIC)
+            f.write(b"".join(_ENTRY.pack(*block) for block in blocks))
@@ -0,0 +1,249 @@
+import asyncio
+import csv
+import io
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, BinaryIO, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def encode_rows_with_offsets(
+    rows: List[List[Any]], start: int
+) -> Tuple[bytes, List[Tuple[List[Any], int]]]:
+    """CSV-encode rows and return the bytes plus each row's absolute byte offset."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    chunks: List[bytes] = []
+    placed: List[Tuple[List[Any], int]] = []
+    offset = start
+    for row in rows:
+        writer.writerow(row)
+        chunk = buf.getvalue().encode("utf-8")
+        buf.seek(0)
+        buf.truncate()
+        placed.append((row, offset))
+        offset += len(chunk)
+        chunks.append(chunk)
+    return b"".join(chunks), placed
+
+
+class WriteBehindCsvWriter:
+    """
+    Write-behind CSV engine.
+
+    Rows are queued in memory on the event loop (no syscalls, no thread hop)
+    and written in groups from a background task, either when `flush_rows`
+    rows are pending or every `flush_interval` seconds. Per-file append
+    handles stay open between flushes, bounded by an LRU of `max_open_files`.
+
+    Durability:
+    - "flush": rows reach the OS page cache on every group commit.
+    - "fsync": additionally fsync each touched file per group commit.
+
+    `on_write(path, [(row, byte_offset), ...])` is called from the writer
+    thread after each file's group is written (used to maintain the index).
+
+    A group that fails to write is truncated off the file and requeued ahead
+    of newer rows, so it is retried on the next flush. At most
+    `max_pending_rows` rows are held; rows arriving while the queue is full
+    (e.g. the disk is stuck) are dropped and counted in `dropped_rows`.
+    """
+
+    def __init__(
+        self,
+        header: List[str],
+        flush_rows: int = 256,
+        flush_interval: float = 0.5,
+        max_open_files: int = 128,
+        durability: str = "flush",
+        on_write: Optional[Callable[[str, List[Tuple[List[Any], int]]], None]] = None,
+        max_pending_rows: int = 100000,
+    ) -> None:
+        self.header = header
+        self.flush_rows = max(1, flush_rows)
+        self.flush_interval = flush_interval
+        self.max_open_files = max(1, max_open_files)
+        self.durability = durability
+        self.on_write = on_write
+        self.max_pending_rows = max(1, max_pending_rows)
+        # Rows rejected because the queue was full
+        self.dropped_rows = 0
+        self._dropping = False
+        self._failing = False
+
+        # path -> queued rows, in arrival order
+        self._pending: Dict[str, List[List[Any]]] = {}
+        self._pending_count = 0
+        # path -> open binary append handle (LRU order, most recent last)
+        self._handles: "OrderedDict[str, BinaryIO]" = OrderedDict()
+        # Serializes group commits so rows of one file are never reordered
+        self._flush_lock = asyncio.Lock()
+        # Guards handle table against close() racing a flush thread
+        self._io_lock = threading.Lock()
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    # ---- Lifecycle --------------------------------------------------------
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        """Stop the background task, flush everything and close all handles."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+        await asyncio.to_thread(self._close_handles)
+
+    # ---- Public API -------------------------------------------------------
+
+    def enqueue(self, path: str, rows: List[List[Any]]) -> None:
+        """
+        Queue rows for `path`. Never blocks; the flusher picks them up. Rows
+        that don't fit under `max_pending_rows` are dropped.
+        """
+        if not rows:
+            return
+        room = self.max_pending_rows - self._pending_count
+        if room < len(rows):
+            if not self._dropping:
+                logger.warning(f"⚠️  CSV write queue full ({self._pending_count} rows), dropping new rows")
+                self._dropping = True
+            self.dropped_rows += len(rows) - max(0, room)
+            rows = rows[: max(0, room)]
+            if not rows:
+                return
+        else:
+            self._dropping = False
+        self._pending.setdefault(path, []).extend(rows)
+        self._pending_count += len(rows)
+        self.start()
+        if self._pending_count >= self.flush_rows:
+            self._wake.set()
+
+    def last_pending(self, path: str) -> Optional[List[Any]]:
+        """Most recent queued-but-unwritten row for `path`, if any."""
+        rows = self._pending.get(path)
+        return rows[-1] if rows else None
+
+    async def flush(self, path: Optional[str] = None) -> None:
+        """Group-commit all queued rows, or only those of `path`."""
+        async with self._flush_lock:
+            if path is None:
+                if not self._pending:
+                    return
+                batch, self._pending = self._pending, {}
+                self._pending_count = 0
+            else:
+                rows = self._pending.pop(path, None)
+                if not rows:
+                    return
+                batch = {path: rows}
+                self._pending_count -= len(rows)
+            try:
+                failed = await asyncio.to_thread(self._write_batch, batch)
+            except Exception as e:
+                logger.error(f"CSV group commit failed: {e}")
+                failed = batch
+            self._requeue(failed)
+
+    # ---- Internals --------------------------------------------------------
+
+    def _requeue(self, failed: Dict[str, List[List[Any]]]) -> None:
+        """Put rows of failed writes back in front of anything queued since."""
+        if not failed:
+            if self._failing:
+                logger.info("✅ CSV writes recovered")
+                self._failing = False
+            return
+        for path, rows in failed.items():
+            self._pending[path] = rows + self._pending.get(path, [])
+            self._pending_count += len(rows)
+        if not self._failing:
+            logger.error(
+                f"CSV group commit failed for {len(failed)} file(s); "
+                f"{sum(map(len, failed.values()))} rows kept for retry"
+            )
+            self._failing = True
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+    def _handle(self, path: str) -> BinaryIO:
+        f = self._handles.get(path)
+        if f is not None:
+            self._handles.move_to_end(path)
+            return f
+        while len(self._handles) >= self.max_open_files:
+            _, old = self._handles.popitem(last=False)
+            old.close()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        f = open(path, "ab")
+        if f.tell() == 0:
+            f.write(self._encode([self.header]))
+        self._handles[path] = f
+        return f
+
+    @staticmethod
+    def _encode(rows: List[List[Any]]) -> bytes:
+        buf = io.StringIO()
+        csv.writer(buf).writerows(rows)
+        return buf.getvalue().encode("utf-8")
+
+    def _write_batch(self, batch: Dict[str, List[List[Any]]]) -> Dict[str, List[List[Any]]]:
+        """Write each file's rows; returns the rows of files that failed."""
+        failed: Dict[str, List[List[Any]]] = {}
+        with self._io_lock:
+            for path, rows in batch.items():
+                start: Optional[int] = None
+                try:
+                    f = self._handle(path)
+                    start = f.tell()
+                    data, placed = encode_rows_with_offsets(rows, start)
+                    f.write(data)
+                    f.flush()
+                    if self.durability == "fsync":
+                        os.fsync(f.fileno())
+                except OSError as e:
+                    logger.error(f"Failed to write {len(rows)} rows to {path}: {e}")
+                    failed[path] = rows
+                    stale = self._handles.pop(path, None)
+                    if stale is not None:
+                        try:
+                            stale.close()
+                        except OSError:
+                            pass
+                    # Cut off a partial group so the retry doesn't duplicate rows
+                    if start is not None:
+                        try:
+                            os.truncate(path, start)
+                        except OSError:
+                            pass
+                    continue
+                if self.on_write is not None:
+                    self.on_write(path, placed)
+        return failed
+
+    def _close_handles(self) -> None:
+        with self._io_lock:
+            while self._handles:
+                _, f = self._handles.popitem(last=False)
+                try:
+                    f.close()
+                except OSError:
+                    pass
@@ -2,17 +2,61 @@ import asyncio
 import csv
 import os
 from collections import deque
-from typing import Optional, Dict, Any
-
-from ..config import DATA_DIR
+from typing import Optional, Dict, Any, Iterable, List, Tuple
+
+from ..config import (
+    DATA_DIR,
+    CSV_WRITE_BEHIND,
+    CSV_FLUSH_ROWS,
+    CSV_FLUSH_INTERVAL,
+    CSV_MAX_OPEN_FILES,
+    CSV_MAX_PENDING_ROWS,
+    CSV_DURABILITY,
+    CSV_INDEX_STRIDE,
+)
+from .csv_index import SparseTimestampIndex
+from .csv_writer import WriteBehindCsvWriter, encode_rows_with_offsets
+from .paths import safe_user
 
 
 HEADER = ["ts", "bpm", "device"]
 
+_index = SparseTimestampIndex(stride=CSV_INDEX_STRIDE)
+
+
+def _index_rows(path: str, placed: List[Tuple[List[Any], int]]) -> None:
+    _index.observe(path, [(row[0], offset) for row, offset in placed])
+
+
+_writer: Optional[WriteBehindCsvWriter] = (
+    WriteBehindCsvWriter(
+        HEADER,
+        flush_rows=CSV_FLUSH_ROWS,
+        flush_interval=CSV_FLUSH_INTERVAL,
+        max_open_files=CSV_MAX_OPEN_FILES,
+        max_pending_rows=CSV_MAX_PENDING_ROWS,
+        durability=CSV_DURABILITY,
+        on_write=_index_rows,
+    )
+    if CSV_WRITE_BEHIND
+    else None
+)
+
+
+async def start() -> None:
+    """Start background storage tasks (write-behind flusher)."""
+    if _writer is not None:
+        _writer.start()
+
+
+async def close() -> None:
+    """Flush queued rows and release file handles."""
+    if _writer is not None:
+        await _writer.close()
+
 
 def _csv_path(user_id: str) -> str:
-    safe_user = "".join(c for c in user_id if c.isalnum() or c in ("-", "_")) or "default"
-    return os.path.join(DATA_DIR, f"{safe_user}.csv")
+    return os.path.join(DATA_DIR, f"{safe_user(user_id)}.csv")
 
 
 def _ensure_file(path: str) -> None:
@@ -31,20 +75,54 @@ def _row_from_record(record: Dict[str, Any]):
     ]
 
 
+def _record_from_row(parts) -> Optional[Dict[str, Any]]:
+    try:
+        return {
+            "ts": int(parts[0]) if parts[0] else None,
+            "bpm": int(parts[1]) if parts[1] else None,
+            "device": parts[2] or None if len(parts) > 2 else None,
+        }
+    except Exception:
+        return None
+
+
+def _write_rows(path: str, rows: List[List[Any]]) -> None:
+    _ensure_file(path)
+    with open(path, "ab") as f:
+        data, placed = encode_rows_with_offsets(rows, f.tell())
+        f.write(data)
+    _index_rows(path, placed)
+
+
 async def append_heart_rate(user_id: str, record: Dict[str, Any]) -> None:
     path = _csv_path(user_id)
+    rows = [_row_from_record(record)]
+    if _writer is not None:
+        _writer.enqueue(path, rows)
+        return
 
-    def _write():
-        _ensure_file(path)
-        with open(path, "a", newline="") as f:
-            writer = csv.writer(f)
-            writer.writerow(_row_from_record(record))
+    await asyncio.to_thread(_write_rows, path, rows)
 
-    await asyncio.to_thread(_write)
+
+async def append_heart_rates(user_id: str, records: Iterable[Dict[str, Any]]) -> None:
+    """Append many samples for one user with a single open/write."""
+    path = _csv_path(user_id)
+    rows = [_row_from_record(r) for r in records]
+    if not rows:
+        return
+    if _writer is not None:
+        _writer.enqueue(path, rows)
+        return
+
+    await asyncio.to_thread(_write_rows, path, rows)
 
 
 async def read_latest(user_id: str) -> Optional[Dict[str, Any]]:
     path = _csv_path(user_id)
+    if _writer is not None:
+        pending = _writer.last_pending(path)
+        if pending is not None:
+            return _record_from_row(pending)
     if not os.path.exists(path):
         return None
 
@@ -62,13 +140,26 @@ async def read_latest(user_id: str) -> Optional[Dict[str, Any]]:
         if not last_line:
             return None
         parts = next(csv.reader([last_line]))
-        try:
-            return {
-                "ts": int(parts[0]) if parts[0] else None,
-                "bpm": int(parts[1]) if parts[1] else None,
-                "device": parts[2] or None if len(parts) > 2 else None,
-            }
-        except Exception:
-            return None
+        return _record_from_row(parts)
 
     return await asyncio.to_thread(_read_last)
+
+
+async def read_range(
+    user_id: str, start_ts: int, end_ts: int, limit: int
+) -> List[Dict[str, Any]]:
+    """
+    Samples with start_ts <= ts <= end_ts, oldest first, at most `limit`.
+    Seeks via the sparse index instead of scanning from the start of the file.
+    """
+    path = _csv_path(user_id)
+    if _writer is not None:
+        await _writer.flush(path)
+    if not os.path.exists(path):
+        return []
+
+    def _scan() -> List[Dict[str, Any]]:
+        rows = _index.scan(path, start_ts, end_ts, limit)
+        return [rec for rec in map(_record_from_row, rows) if rec is not None]
+
+    return await asyncio.to_thread(_scan)
@@ -0,0 +1,3 @@
+def safe_user(user_id: str) -> str:
+    """Filesystem-safe form of a user id (alnum, '-', '_')."""
+    return "".join(c for c in user_id if c.isalnum() or c in ("-", "_")) or "default"
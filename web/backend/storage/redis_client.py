@@ -1,6 +1,21 @@
 from redis import asyncio as aioredis
-from ..config import REDIS_URL
+from ..config import (
+    REDIS_URL,
+    REDIS_MAX_CONNECTIONS,
+    REDIS_SOCKET_KEEPALIVE,
+    REDIS_HEALTH_CHECK_INTERVAL,
+    REDIS_SOCKET_TIMEOUT,
+    REDIS_SOCKET_CONNECT_TIMEOUT,
+)
 
 
 # Single shared async Redis client
-redis = aioredis.from_url(REDIS_URL, decode_responses=True)
+redis = aioredis.from_url(
+    REDIS_URL,
+    decode_responses=True,
+    max_connections=REDIS_MAX_CONNECTIONS,
+    socket_keepalive=REDIS_SOCKET_KEEPALIVE,
+    health_check_interval=REDIS_HEALTH_CHECK_INTERVAL,
+    socket_timeout=REDIS_SOCKET_TIMEOUT,
+    socket_connect_timeout=REDIS_SOCKET_CONNECT_TIMEOUT,
+)
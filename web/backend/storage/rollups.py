@@ -0,0 +1,397 @@
+"""
+Incremental multi-resolution rollups of heart-rate samples.
+
+Each sample updates one open bucket per tier (1s / 1m / 1h) in O(1). When a
+sample lands in a later bucket the open one is closed and queued for the
+write-behind writer as a row of `{user}.rollup-{tier}.csv` next to the raw
+data:
+
+    ts,min,max,mean,count      (ts = bucket start, epoch ms)
+
+Rollup files carry their own sparse timestamp index, so range queries seek
+like the raw history does. Late samples that belong to an already-closed
+bucket are written as their own single-sample row and merged at query time,
+as are duplicate buckets left behind by a restart. Like the raw CSV history,
+rows go through the write-behind writer unless CSV_WRITE_BEHIND is off.
+
+Open buckets are checkpointed every CSV_FLUSH_INTERVAL seconds to
+`rollups-open.csv` and restored on start, so a crash loses at most one
+interval. A user whose newest bucket is older than the coarsest tier width
+has their buckets closed and forgotten.
+
+With MAGHEART_STORAGE_BACKEND=binary no rollup files are kept: buckets are
+aggregated from the memory-mapped segments at query time.
+"""
+import asyncio
+import csv
+import logging
+import os
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from ..config import (
+    DATA_DIR,
+    STORAGE_BACKEND,
+    CSV_WRITE_BEHIND,
+    CSV_FLUSH_ROWS,
+    CSV_FLUSH_INTERVAL,
+    CSV_MAX_OPEN_FILES,
+    CSV_MAX_PENDING_ROWS,
+    CSV_DURABILITY,
+    CSV_INDEX_STRIDE,
+)
+from .csv_index import SparseTimestampIndex
+from .csv_writer import WriteBehindCsvWriter, encode_rows_with_offsets
+from .paths import safe_user
+
+logger = logging.getLogger(__name__)
+
+HEADER = ["ts", "min", "max", "mean", "count"]
+
+# Finest first
+TIERS: Dict[str, int] = {
+    "1s": 1_000,
+    "1m": 60_000,
+    "1h": 3_600_000,
+}
+
+
+class _Bucket:
+    __slots__ = ("start", "min", "max", "sum", "count")
+
+    def __init__(self, start: int, bpm: float) -> None:
+        self.start = start
+        self.min = bpm
+        self.max = bpm
+        self.sum = bpm
+        self.count = 1
+
+    def add(self, bpm: float) -> None:
+        if bpm < self.min:
+            self.min = bpm
+        if bpm > self.max:
+            self.max = bpm
+        self.sum += bpm
+        self.count += 1
+
+    def row(self) -> List[Any]:
+        return [self.start, self.min, self.max, round(self.sum / self.count, 2), self.count]
+
+    @classmethod
+    def restore(cls, start: int, mn: float, mx: float, total: float, count: int) -> "_Bucket":
+        bucket = cls(start, mn)
+        bucket.max = mx
+        bucket.sum = total
+        bucket.count = count
+        return bucket
+
+
+class RollupStore:
+    def __init__(
+        self, data_dir: str, write_behind: bool = True, flush_interval: float = CSV_FLUSH_INTERVAL
+    ) -> None:
+        self.data_dir = data_dir
+        self.flush_interval = flush_interval
+        self._index = SparseTimestampIndex(stride=CSV_INDEX_STRIDE)
+        self._writer: Optional[WriteBehindCsvWriter] = (
+            WriteBehindCsvWriter(
+                HEADER,
+                flush_rows=CSV_FLUSH_ROWS,
+                flush_interval=CSV_FLUSH_INTERVAL,
+                max_open_files=CSV_MAX_OPEN_FILES,
+                max_pending_rows=CSV_MAX_PENDING_ROWS,
+                durability=CSV_DURABILITY,
+                on_write=self._index_rows,
+            )
+            if write_behind
+            else None
+        )
+        # (user_id, tier) -> open bucket
+        self._open: Dict[Tuple[str, str], _Bucket] = {}
+        # Open buckets changed since the last checkpoint
+        self._dirty = False
+        self._task: Optional[asyncio.Task] = None
+
+    def path(self, user_id: str, tier: str) -> str:
+        return os.path.join(self.data_dir, f"{safe_user(user_id)}.rollup-{tier}.csv")
+
+    def open_path(self) -> str:
+        return os.path.join(self.data_dir, "rollups-open.csv")
+
+    # ---- Ingest -----------------------------------------------------------
+
+    async def observe(self, user_id: str, records: Iterable[Dict[str, Any]]) -> None:
+        """Fold samples into every tier. O(1) per sample per tier."""
+        closed: Dict[str, List[List[Any]]] = {}
+        for record in records:
+            ts, bpm = record.get("ts"), record.get("bpm")
+            if ts is None or bpm is None:
+                continue
+            for tier, width in TIERS.items():
+                start = ts - ts % width
+                key = (user_id, tier)
+                bucket = self._open.get(key)
+                if bucket is None:
+                    self._open[key] = _Bucket(start, bpm)
+                elif start == bucket.start:
+                    bucket.add(bpm)
+                elif start > bucket.start:
+                    closed.setdefault(self.path(user_id, tier), []).append(bucket.row())
+                    self._open[key] = _Bucket(start, bpm)
+                else:
+                    closed.setdefault(self.path(user_id, tier), []).append(_Bucket(start, bpm).row())
+            self._dirty = True
+        await self._write(closed)
+
+    # ---- Query ------------------------------------------------------------
+
+    async def read_range(
+        self, user_id: str, tier: str, start_ts: int, end_ts: int, limit: int
+    ) -> List[Dict[str, Any]]:
+        """Buckets whose start lies in [start_ts, end_ts], oldest first."""
+        width = TIERS[tier]
+        # Include the bucket that contains start_ts
+        lo = start_ts - start_ts % width
+        path = self.path(user_id, tier)
+        if self._writer is not None:
+            await self._writer.flush(path)
+        merged = await asyncio.to_thread(self._scan_merged, path, lo, end_ts, limit)
+        open_bucket = self._open.get((user_id, tier))
+        if open_bucket is not None and lo <= open_bucket.start <= end_ts:
+            b = open_bucket
+            _merge(merged, b.start, b.min, b.max, b.sum, b.count)
+
+        return _bucket_dicts(merged, limit)
+
+    def _scan_merged(self, path: str, lo: int, end_ts: int, limit: int) -> Dict[int, List[float]]:
+        """
+        Stored rows in [lo, end_ts] merged per bucket start, covering at least
+        the first `limit` distinct buckets. Duplicate rows of one bucket (late
+        samples, restarts) don't count against the limit.
+        """
+        merged: Dict[int, List[float]] = {}
+        cursor, batch = lo, limit
+        while True:
+            rows = self._index.scan(path, cursor, end_ts, batch)
+            parsed = []
+            for parts in rows:
+                try:
+                    parsed.append(
+                        (int(parts[0]), float(parts[1]), float(parts[2]), float(parts[3]), int(parts[4]))
+                    )
+                except (ValueError, IndexError):
+                    continue
+            if len(rows) < batch:
+                for ts, mn, mx, mean, count in parsed:
+                    _merge(merged, ts, mn, mx, mean * count, count)
+                return merged
+            # Rows come back sorted: every bucket before the last one is complete
+            last = parsed[-1][0] if parsed else cursor
+            for ts, mn, mx, mean, count in parsed:
+                if ts < last:
+                    _merge(merged, ts, mn, mx, mean * count, count)
+            if len(merged) >= limit:
+                return merged
+            if last == cursor:
+                batch *= 2  # the batch was all one bucket's rows
+            cursor = last
+
+    # ---- Lifecycle --------------------------------------------------------
+
+    def start(self) -> None:
+        """Restore checkpointed open buckets and start the checkpoint task."""
+        self._restore_open()
+        if self._writer is not None:
+            self._writer.start()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def checkpoint(self, now_ms: Optional[int] = None) -> None:
+        """
+        Close the buckets of users with nothing newer than the coarsest tier
+        width, flush written rows and save the remaining open buckets.
+        """
+        if now_ms is None:
+            now_ms = int(time.time() * 1000)
+        horizon = now_ms - max(TIERS.values())
+        newest: Dict[str, int] = {}
+        for (user_id, _), bucket in self._open.items():
+            newest[user_id] = max(newest.get(user_id, bucket.start), bucket.start)
+        closed: Dict[str, List[List[Any]]] = {}
+        for key in [key for key in self._open if newest[key[0]] < horizon]:
+            closed.setdefault(self.path(*key), []).append(self._open.pop(key).row())
+            self._dirty = True
+        await self._write(closed)
+        if not self._dirty:
+            return
+        self._dirty = False
+        # Taken before the flush: every row that closed a bucket missing here
+        # is on disk by the time the snapshot is
+        snapshot = [
+            [user_id, tier, b.start, b.min, b.max, b.sum, b.count]
+            for (user_id, tier), b in self._open.items()
+        ]
+        if self._writer is not None:
+            await self._writer.flush()
+        await asyncio.to_thread(self._save_open, snapshot)
+
+    async def close(self) -> None:
+        """Persist open buckets and flush everything to disk."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        closed: Dict[str, List[List[Any]]] = {}
+        for (user_id, tier), bucket in self._open.items():
+            closed.setdefault(self.path(user_id, tier), []).append(bucket.row())
+        self._open.clear()
+        self._dirty = False
+        await self._write(closed)
+        if self._writer is not None:
+            await self._writer.close()
+        await asyncio.to_thread(self._save_open, [])
+
+    # ---- Internals --------------------------------------------------------
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.checkpoint()
+            except Exception as e:
+                logger.warning(f"⚠️  Failed to checkpoint open rollup buckets: {e}")
+
+    def _save_open(self, snapshot: List[List[Any]]) -> None:
+        path = self.open_path()
+        if not snapshot:
+            if os.path.exists(path):
+                os.remove(path)
+            return
+        os.makedirs(self.data_dir, exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(encode_rows_with_offsets(snapshot, 0)[0])
+        os.replace(tmp, path)
+
+    def _restore_open(self) -> None:
+        path = self.open_path()
+        if not os.path.exists(path):
+            return
+        with open(path, newline="", encoding="utf-8") as f:
+            rows = list(csv.reader(f))
+        for row in rows:
+            try:
+                user_id, tier = row[0], row[1]
+                start, count = int(row[2]), int(row[6])
+                mn, mx, total = float(row[3]), float(row[4]), float(row[5])
+            except (ValueError, IndexError):
+                continue
+            key = (user_id, tier)
+            if tier not in TIERS or key in self._open:
+                continue
+            # A stored row at or after the bucket means it was closed after
+            # the checkpoint was taken
+            tier_path = self.path(user_id, tier)
+            if self._index.scan(tier_path, start, 2**62, 1):
+                continue
+            self._open[key] = _Bucket.restore(start, mn, mx, total, count)
+
+    async def _write(self, closed: Dict[str, List[List[Any]]]) -> None:
+        if not closed:
+            return
+        if self._writer is not None:
+            for path, rows in closed.items():
+                self._writer.enqueue(path, rows)
+            return
+        await asyncio.to_thread(self._write_rows, closed)
+
+    def _write_rows(self, closed: Dict[str, List[List[Any]]]) -> None:
+        for path, rows in closed.items():
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with open(path, "ab") as f:
+                if f.tell() == 0:
+                    f.write(encode_rows_with_offsets([HEADER], 0)[0])
+                data, placed = encode_rows_with_offsets(rows, f.tell())
+                f.write(data)
+            self._index_rows(path, placed)
+
+    def _index_rows(self, path: str, placed: List[Tuple[List[Any], int]]) -> None:
+        self._index.observe(path, [(row[0], off) for row, off in placed])
+
+
+class DerivedRollups:
+    """
+    Rollups for the binary backend: buckets are aggregated from the
+    memory-mapped segments on read, so ingest keeps no extra state.
+    """
+
+    async def observe(self, user_id: str, records: Iterable[Dict[str, Any]]) -> None:
+        """Nothing to maintain: samples are already in the segments."""
+
+    async def read_range(
+        self, user_id: str, tier: str, start_ts: int, end_ts: int, limit: int
+    ) -> List[Dict[str, Any]]:
+        """Buckets whose start lies in [start_ts, end_ts], oldest first."""
+        from . import binary_store
+
+        return await binary_store.read_buckets(user_id, TIERS[tier], start_ts, end_ts, limit)
+
+    def start(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+
+def _bucket_dicts(merged: Dict[int, List[float]], limit: int) -> List[Dict[str, Any]]:
+    out: List[Dict[str, Any]] = []
+    for ts in sorted(merged)[:limit]:
+        mn, mx, total, count = merged[ts]
+        out.append(
+            {
+                "ts": ts,
+                "min": int(mn),
+                "max": int(mx),
+                "mean": round(total / count, 2),
+                "count": int(count),
+            }
+        )
+    return out
+
+
+def _merge(merged: Dict[int, List[float]], ts: int, mn: float, mx: float, total: float, count: int) -> None:
+    cur = merged.get(ts)
+    if cur is None:
+        merged[ts] = [mn, mx, total, count]
+    else:
+        cur[0] = min(cur[0], mn)
+        cur[1] = max(cur[1], mx)
+        cur[2] += total
+        cur[3] += count
+
+
+def pick_tier(start_ts: int, end_ts: int, points: int) -> str:
+    """
+    Finest tier with at most `points` buckets over [start_ts, end_ts], or
+    the coarsest one when none is that sparse.
+    """
+    for tier, width in TIERS.items():
+        if end_ts // width - start_ts // width + 1 <= points:
+            return tier
+    return next(reversed(TIERS))
+
+
+def newest_window(tier: str, start_ts: int, end_ts: int, limit: int) -> int:
+    """Start of the part of [start_ts, end_ts] holding its newest `limit` buckets."""
+    width = TIERS[tier]
+    return max(start_ts, end_ts - end_ts % width - (limit - 1) * width)
+
+
+rollups = (
+    DerivedRollups()
+    if STORAGE_BACKEND == "binary"
+    else RollupStore(DATA_DIR, write_behind=CSV_WRITE_BEHIND)
+)
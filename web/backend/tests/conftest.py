@@ -0,0 +1,10 @@
+import os
+import tempfile
+
+# Settings are read once at import, so pin them before anything imports backend
+os.environ.setdefault("MAGHEART_BROKER", "memory")
+os.environ.setdefault("MAGHEART_MEETING_STATE", "memory")
+os.environ.setdefault("MAGHEART_DATA_DIR", tempfile.mkdtemp(prefix="magheart-test-"))
+os.environ.setdefault("ARDUINO_ENABLED", "false")
+# Never dialled by the tests; Redis-backed tests patch in fakeredis
+os.environ.setdefault("REDIS_URL", "redis://localhost:6379/0")
@@ -0,0 +1,66 @@
+import asyncio
+
+from backend.services import arduino_service
+from backend.services.arduino_service import ArduinoService
+
+
+class FakePort:
+    is_open = True
+
+    def close(self):
+        self.is_open = False
+
+
+class FrozenTime:
+    """time.time() stand-in, so next_retry_at is exactly the backoff delay."""
+
+    @staticmethod
+    def time():
+        return 0.0
+
+
+class NoJitter:
+    @staticmethod
+    def uniform(a, b):
+        return 1.0
+
+
+def test_reconnects_with_capped_exponential_backoff(monkeypatch):
+    monkeypatch.setattr(arduino_service, "ARDUINO_ENABLED", True)
+    monkeypatch.setattr(arduino_service, "ARDUINO_RECONNECT_MIN", 0.001)
+    monkeypatch.setattr(arduino_service, "ARDUINO_RECONNECT_MAX", 0.004)
+    monkeypatch.setattr(arduino_service, "time", FrozenTime)
+    monkeypatch.setattr(arduino_service, "random", NoJitter)
+
+    async def run():
+        service = ArduinoService(port="/dev/fake")
+        service.protocol = "line"
+        delays = []
+        connected = asyncio.Event()
+
+        async def connect():
+            delays.append(service.next_retry_at)
+            if len(delays) < 5:
+                return False
+            service.serial_port = FakePort()
+            connected.set()
+            return True
+
+        service.connect = connect
+        service.start()
+        await asyncio.wait_for(connected.wait(), 1.0)
+        await asyncio.sleep(0)
+        up = (service.state, service.reconnect_attempts, service.next_retry_at)
+
+        # A write error hands the link back to the supervisor
+        connected.clear()
+        service._mark_lost(OSError("unplugged"))
+        await asyncio.wait_for(connected.wait(), 1.0)
+        await service.disconnect()
+        return delays, up
+
+    delays, up = asyncio.run(run())
+    assert delays[:5] == [None, 0.001, 0.002, 0.004, 0.004]
+    assert up == ("connected", 0, None)
+    # After a drop the backoff starts over from the minimum
+    assert delays[5:] == [0.001]
@@ -0,0 +1,47 @@
+import asyncio
+
+from backend.services import arduino_service
+from backend.services.arduino_service import ArduinoService
+
+
+class FakePort:
+    is_open = True
+    in_waiting = 0
+
+    def __init__(self):
+        self.written = []
+
+    def write(self, data):
+        self.written.append(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.is_open = False
+
+
+def _service(monkeypatch):
+    monkeypatch.setattr(arduino_service, "ARDUINO_ENABLED", True)
+    service = ArduinoService(port="/dev/fake")
+    service.protocol = "line"
+    return service
+
+
+def test_only_the_newest_pending_value_is_written(monkeypatch):
+    async def run():
+        service = _service(monkeypatch)
+        assert not service.submit_heart_rate(70)  # link down: nothing queued
+        port = service.serial_port = FakePort()
+        results = [service.submit_heart_rate(bpm) for bpm in (60, 61, 250)]
+        await asyncio.sleep(0.05)
+        service.submit_heart_rate(72)
+        await asyncio.sleep(0.05)
+        service.serial_port = None
+        await service.disconnect()
+        return results, port.written
+
+    results, written = asyncio.run(run())
+    assert results == [True, True, True]
+    # 60 and 61 were overwritten before the writer ran; 250 is clamped
+    assert written == [b"200\n", b"72\n"]
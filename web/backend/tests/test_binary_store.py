@@ -0,0 +1,37 @@
+import os
+
+from backend.storage.binary_store import RECORD_DTYPE, BinaryTimeSeriesStore
+
+
+def test_torn_tail_is_truncated_on_open(tmp_path):
+    store = BinaryTimeSeriesStore(str(tmp_path), segment_records=100)
+    store.append("u", [{"ts": t, "bpm": 60} for t in (1000, 2000, 3000)])
+    segment = tmp_path / "u.hr" / "seg-000000.bin"
+    with open(segment, "ab") as f:
+        f.write(b"\x01\x02\x03\x04\x05")  # half a record from a crashed write
+
+    store = BinaryTimeSeriesStore(str(tmp_path), segment_records=100)
+    store.append("u", [{"ts": 4000, "bpm": 70}])
+
+    assert os.path.getsize(segment) == 4 * RECORD_DTYPE.itemsize
+    assert [r["ts"] for r in store.range("u", 0, 10000, 10)] == [1000, 2000, 3000, 4000]
+    assert store.latest("u")["bpm"] == 70
+
+
+def test_segments_roll_over(tmp_path):
+    store = BinaryTimeSeriesStore(str(tmp_path), segment_records=2)
+    store.append("u", [{"ts": t, "bpm": 60} for t in range(5)])
+    assert [len(v) for v in store.segments("u")] == [2, 2, 1]
+
+
+def test_late_samples_are_found_in_ts_order(tmp_path):
+    store = BinaryTimeSeriesStore(str(tmp_path), segment_records=3)
+    store.append("u", [{"ts": t, "bpm": 60} for t in (1000, 2000, 5000, 70000, 130000)])
+    store.append("u", [{"ts": 4000, "bpm": 61}])
+
+    assert [r["ts"] for r in store.range("u", 3500, 4500, 10)] == [4000]
+    assert [r["ts"] for r in store.range("u", 0, 200000, 4)] == [1000, 2000, 4000, 5000]
+
+    reopened = BinaryTimeSeriesStore(str(tmp_path), segment_records=3)
+    reopened.append("u", [{"ts": 3000, "bpm": 62}])
+    assert [r["ts"] for r in reopened.range("u", 2500, 4500, 10)] == [3000, 4000]
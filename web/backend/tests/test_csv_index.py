@@ -0,0 +1,47 @@
+import csv
+
+from backend.storage.csv_index import SparseTimestampIndex
+from backend.storage.csv_writer import encode_rows_with_offsets
+
+
+def _append(index, path, rows):
+    with open(path, "ab") as f:
+        if f.tell() == 0:
+            f.write(b"ts,bpm,device\n")
+        data, placed = encode_rows_with_offsets(rows, f.tell())
+        f.write(data)
+    index.observe(path, [(row[0], offset) for row, offset in placed])
+
+
+def _ts(rows):
+    return [int(r[0]) for r in rows]
+
+
+def test_late_rows_are_found(tmp_path):
+    path = str(tmp_path / "u.csv")
+    index = SparseTimestampIndex(stride=2)
+    _append(index, path, [[ts, 60, ""] for ts in (1000, 2000, 5000, 70000, 130000)])
+    _append(index, path, [[4000, 61, ""]])  # late sample after newer rows
+
+    assert _ts(index.scan(path, 3500, 4500, 10)) == [4000]
+    assert _ts(index.scan(path, 0, 200000, 10)) == [1000, 2000, 4000, 5000, 70000, 130000]
+    assert _ts(index.scan(path, 0, 200000, 3)) == [1000, 2000, 4000]
+
+
+def test_reload_and_rebuild_agree(tmp_path):
+    path = str(tmp_path / "u.csv")
+    index = SparseTimestampIndex(stride=3)
+    rows = [[ts, 60, ""] for ts in (10, 50, 20, 90, 30, 70, 40, 80)]
+    _append(index, path, rows[:5])
+    _append(index, path, rows[5:])
+    expected = _ts(index.scan(path, 25, 75, 10))
+    assert expected == [30, 40, 50, 70]
+
+    reopened = SparseTimestampIndex(stride=3)
+    assert _ts(reopened.scan(path, 25, 75, 10)) == expected
+
+    (tmp_path / "u.idx").unlink()
+    rebuilt = SparseTimestampIndex(stride=3)
+    assert _ts(rebuilt.scan(path, 25, 75, 10)) == expected
+    with open(path, newline="") as f:
+        assert len(list(csv.reader(f))) == 9
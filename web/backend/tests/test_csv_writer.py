@@ -0,0 +1,47 @@
+import asyncio
+import csv
+import os
+
+from backend.storage.csv_writer import WriteBehindCsvWriter
+
+HEADER = ["ts", "bpm"]
+
+
+def _read(path):
+    with open(path, newline="") as f:
+        return list(csv.reader(f))[1:]
+
+
+def test_failed_group_is_kept_and_retried(tmp_path):
+    blocker = tmp_path / "dir"
+    blocker.write_text("not a directory")
+    path = str(blocker / "u.csv")
+
+    async def run():
+        writer = WriteBehindCsvWriter(HEADER, flush_interval=60)
+        writer.enqueue(path, [[1, 60], [2, 61]])
+        await writer.flush()
+        assert writer.last_pending(path) == [2, 61]
+
+        writer.enqueue(path, [[3, 62]])
+        os.remove(blocker)
+        await writer.flush()
+        await writer.close()
+
+    asyncio.run(run())
+    assert _read(path) == [["1", "60"], ["2", "61"], ["3", "62"]]
+
+
+def test_full_queue_drops_new_rows_and_counts_them(tmp_path):
+    path = str(tmp_path / "u.csv")
+
+    async def run():
+        writer = WriteBehindCsvWriter(HEADER, flush_rows=100, flush_interval=60, max_pending_rows=3)
+        writer.enqueue(path, [[1, 60], [2, 61]])
+        writer.enqueue(path, [[3, 62], [4, 63]])
+        writer.enqueue(path, [[5, 64]])
+        assert writer.dropped_rows == 2
+        await writer.close()
+
+    asyncio.run(run())
+    assert _read(path) == [["1", "60"], ["2", "61"], ["3", "62"]]
@@ -0,0 +1,108 @@
+import asyncio
+
+import pytest
+
+from backend.services import device_registry as registry_module
+from backend.services import meeting_manager as meeting_manager_module
+from backend.services.device_registry import DeviceRegistry
+from backend.services.meeting_manager import MeetingManager
+from backend.services.meeting_relay import MeetingRelay
+
+
+class FakeArduino:
+    def __init__(self, port):
+        self.port = port
+        self.stopped = False
+
+    def start(self):
+        pass
+
+    async def disconnect(self):
+        self.stopped = True
+
+    def is_connected(self):
+        return True
+
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    for name in ("ttyUSB0", "ttyUSB1"):
+        (tmp_path / name).touch()
+    monkeypatch.setattr(registry_module, "ArduinoService", FakeArduino)
+    monkeypatch.setattr(registry_module, "ARDUINO_ENABLED", True)
+    monkeypatch.setattr(registry_module, "ARDUINO_DISCOVERY", False)
+    monkeypatch.setattr(registry_module, "ARDUINO_DISCOVERY_GLOBS", [str(tmp_path / "ttyUSB*")])
+    monkeypatch.setattr(registry_module, "ARDUINO_ROUTES", {})
+    return DeviceRegistry(), str(tmp_path)
+
+
+def test_routes_only_accept_known_ports(registry):
+    reg, root = registry
+    with pytest.raises(ValueError):
+        reg.set_user_route("alice", "/etc/passwd")
+    with pytest.raises(ValueError):
+        reg.set_pair_route("m", "alice", root + "/ttyS9")
+    assert not reg.devices and not reg.user_routes and not reg.pair_routes
+
+
+def test_unreferenced_devices_are_stopped(registry):
+    reg, root = registry
+    usb0, usb1 = root + "/ttyUSB0", root + "/ttyUSB1"
+
+    async def run():
+        reg.set_user_route("alice", usb0)
+        reg.set_pair_route("m", "bob", usb0)
+        device = reg.devices[usb0]
+        assert reg.remove_user_route("alice")
+        assert usb0 in reg.devices  # bob's pair route still uses it
+        reg.set_pair_route("m", "bob", usb1)  # moving the last route releases it
+        await asyncio.sleep(0)
+        assert device.stopped and usb0 not in reg.devices
+        assert reg.remove_pair_route("m", "bob")
+        await asyncio.sleep(0)
+        assert not reg.devices
+
+    asyncio.run(run())
+
+
+class SharedRelay(MeetingRelay):
+    """Shared relay whose state lists participants of meetings not mirrored here."""
+
+    shared = True
+
+    def __init__(self, members):
+        super().__init__()
+        self.members = members
+
+    async def publish_delta(self, meeting_id, body, upserts, meta):
+        return 0
+
+    async def publish_event(self, meeting_id, event):
+        pass
+
+    async def has_participant(self, meeting_id, user_id):
+        if meeting_id == "broken":
+            raise ConnectionError("redis down")
+        return (meeting_id, user_id) in self.members
+
+
+def test_pair_route_follows_meetings_on_other_workers(registry, monkeypatch):
+    reg, root = registry
+    usb0, usb1 = root + "/ttyUSB0", root + "/ttyUSB1"
+    manager = MeetingManager(SharedRelay({("remote", "alice")}))
+    monkeypatch.setattr(meeting_manager_module, "meeting_manager", manager)
+    monkeypatch.setattr(reg, "default_port", usb1)
+
+    async def run():
+        reg.set_pair_route("remote", "alice", usb0)
+        reg.set_pair_route("broken", "bob", usb0)
+        return (
+            await reg.resolve_port("alice"),
+            await reg.resolve_port("bob"),
+            await reg.resolve_port("carol"),
+        )
+
+    alice, bob, carol = asyncio.run(run())
+    assert alice == usb0
+    # Membership can't be checked: the pair route is skipped, not guessed
+    assert bob == usb1 and carol == usb1
@@ -0,0 +1,64 @@
+import asyncio
+
+from backend.services import fanout
+from backend.services.fanout import FanoutHub, SharedEvent
+from backend.services.mailbox import KEEPALIVE
+
+
+class RecordingHub(FanoutHub):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.synced = []
+
+    async def _sync_channel(self, channel):
+        await asyncio.sleep(0)
+        self.synced.append((channel, self.subscriber_count(channel)))
+
+
+def test_one_event_object_reaches_every_subscriber():
+    async def run():
+        seen = []
+        hub = RecordingHub(on_message=lambda channel, obj: seen.append(channel))
+        try:
+            q1, _ = await hub.subscribe("u")
+            q2, _ = await hub.subscribe("u")
+            other, _ = await hub.subscribe("v")
+            hub.fan_out("u", {"type": "hr"})
+            e1, e2 = await q1.get(), await q2.get()
+            return seen, e1, e2, other.qsize()
+        finally:
+            await hub.close()
+
+    seen, e1, e2, other = asyncio.run(run())
+    assert seen == ["u"]
+    assert isinstance(e1, SharedEvent) and e1 is e2
+    assert other == 0
+
+
+def test_shared_timer_sends_keepalives():
+    async def run():
+        hub = FanoutHub(keepalive_interval=0.01)
+        try:
+            q, _ = await hub.subscribe("u")
+            return await asyncio.wait_for(q.get(), 1.0)
+        finally:
+            await hub.close()
+
+    assert asyncio.run(run()) is KEEPALIVE
+
+
+def test_unsubscribe_sync_is_kept_alive_until_done():
+    async def run():
+        hub = RecordingHub()
+        try:
+            _, unsubscribe = await hub.subscribe("u")
+            unsubscribe()
+            pending = len(fanout._background)
+            await asyncio.sleep(0.01)
+            return pending, len(fanout._background), hub.synced
+        finally:
+            await hub.close()
+
+    pending, after, synced = asyncio.run(run())
+    assert pending == 1 and after == 0
+    assert synced == [("u", 1), ("u", 0)]
@@ -0,0 +1,51 @@
+import asyncio
+
+from backend.services.heart_rate_bridge import HeartRateBridge
+
+
+def _bridge(users):
+    sinks = {}
+    ticks = []
+
+    async def attach(user_id, sink):
+        sinks[user_id] = sink
+        return lambda: sinks.pop(user_id, None)
+
+    bridge = HeartRateBridge(attach, on_sample=ticks.append)
+    asyncio.run(bridge.sync("m", users))
+    return bridge, sinks, ticks
+
+
+def _sample(sink, bpm, ts):
+    sink.put_nowait({"type": "hr", "data": {"bpm": bpm, "ts": ts}})
+
+
+def test_only_changed_bpm_is_taken():
+    bridge, sinks, ticks = _bridge(["alice", "bob"])
+    _sample(sinks["alice"], 70, 1)
+    _sample(sinks["bob"], 80, 1)
+    assert bridge.take("m") == {"alice": {"bpm": 70, "ts": 1}, "bob": {"bpm": 80, "ts": 1}}
+
+    # Same BPM again: nothing to send, no flush requested
+    ticks.clear()
+    _sample(sinks["alice"], 70, 2)
+    _sample(sinks["bob"], 81, 2)
+    assert ticks == ["m"]
+    assert bridge.take("m") == {"bob": {"bpm": 81, "ts": 2}}
+    assert bridge.latest("m")["alice"] == {"bpm": 70, "ts": 2}
+
+
+def test_bpm_back_to_sent_value_is_not_taken():
+    bridge, sinks, _ = _bridge(["alice"])
+    _sample(sinks["alice"], 70, 1)
+    bridge.take("m")
+    _sample(sinks["alice"], 72, 2)
+    _sample(sinks["alice"], 70, 3)
+    assert bridge.take("m") is None
+
+
+def test_late_sample_is_ignored():
+    bridge, sinks, _ = _bridge(["alice"])
+    _sample(sinks["alice"], 70, 5)
+    _sample(sinks["alice"], 90, 4)
+    assert bridge.take("m") == {"alice": {"bpm": 70, "ts": 5}}
@@ -0,0 +1,39 @@
+import sys
+
+from backend.routers.signals import _sse_frame
+from backend.services import jsoncodec
+from backend.services.fanout import SharedEvent
+
+
+def test_output_is_compact_utf8_with_any_backend():
+    for name in ("json", jsoncodec.BACKEND):
+        dumps, loads = jsoncodec._load_backend(name)
+        raw = dumps({"a": [1, 2], "name": "Zoë"})
+        assert raw == '{"a":[1,2],"name":"Zoë"}'.encode("utf-8")
+        assert loads(raw) == {"a": [1, 2], "name": "Zoë"}
+
+
+def test_values_fast_backends_reject_fall_back_to_stdlib():
+    assert jsoncodec.dumps({"big": 2**70}) == b'{"big":1180591620717411303424}'
+    assert jsoncodec.dumps({"raw": b"\x00\xff"}) == b'{"raw":"AP8="}'
+
+
+def test_auto_falls_back_to_stdlib_when_nothing_faster_imports(monkeypatch):
+    monkeypatch.setattr(jsoncodec, "JSON_BACKEND", "auto")
+    monkeypatch.setitem(sys.modules, "orjson", None)
+    monkeypatch.setitem(sys.modules, "msgspec", None)
+    name, (dumps, loads) = jsoncodec._select()
+    assert name == "json"
+    assert dumps([1]) == b"[1]"
+
+
+def test_forced_backend_is_used(monkeypatch):
+    monkeypatch.setattr(jsoncodec, "JSON_BACKEND", "json")
+    assert jsoncodec._select()[0] == "json"
+
+
+def test_shared_event_is_encoded_once():
+    event = SharedEvent({"id": 5, "type": "hr", "data": {"bpm": 70}})
+    first = _sse_frame(event)
+    assert first == b'id: 5\nevent: hr\ndata: {"bpm":70}\n\n'
+    assert _sse_frame(event) is first
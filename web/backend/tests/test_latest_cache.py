@@ -0,0 +1,44 @@
+from backend.services import latest_cache
+from backend.services.latest_cache import LatestCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(latest_cache.time, "monotonic", clock)
+    cache = LatestCache(ttl=10, max_size=10)
+    cache.put("u", {"bpm": 70, "ts": 1})
+    clock.now += 9
+    assert cache.get("u") == {"bpm": 70, "ts": 1}
+    clock.now += 1
+    assert cache.get("u") is None
+
+
+def test_older_sample_does_not_replace_newer(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(latest_cache.time, "monotonic", clock)
+    cache = LatestCache(ttl=10, max_size=10)
+    cache.put("u", {"bpm": 70, "ts": 2000})
+    cache.put("u", {"bpm": 90, "ts": 1000})
+    assert cache.get("u")["bpm"] == 70
+    # Once the newer one has expired, any sample is accepted again
+    clock.now += 10
+    cache.put("u", {"bpm": 90, "ts": 1000})
+    assert cache.get("u")["bpm"] == 90
+
+
+def test_least_recently_used_user_is_evicted():
+    cache = LatestCache(ttl=60, max_size=2)
+    cache.put("a", {"ts": 1})
+    cache.put("b", {"ts": 1})
+    cache.get("a")
+    cache.put("c", {"ts": 1})
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
@@ -0,0 +1,57 @@
+import asyncio
+
+from backend.services.mailbox import KEEPALIVE, Mailbox
+
+
+def _hr(bpm):
+    return {"type": "hr", "data": {"bpm": bpm}}
+
+
+def _drain(box):
+    async def run():
+        return [await box.get() for _ in range(box.qsize())]
+
+    return asyncio.run(run())
+
+
+def test_full_mailbox_drops_oldest():
+    box = Mailbox(maxsize=3)
+    for bpm in range(5):
+        box.put_nowait(_hr(bpm))
+    assert box.dropped == 2
+    assert [e["data"]["bpm"] for e in _drain(box)] == [2, 3, 4]
+
+
+def test_latest_only_coalesces_pending_heart_rates():
+    box = Mailbox(maxsize=3, latest_only=True)
+    box.put_nowait(_hr(60))
+    box.put_nowait(_hr(61))
+    box.put_nowait({"type": "phase", "data": "sketch"})
+    box.put_nowait(_hr(62))
+    box.put_nowait(_hr(63))
+    # 61 replaced 60 and 63 replaced 62; the phase event is never coalesced
+    assert box.dropped == 2
+    assert _drain(box) == [_hr(61), {"type": "phase", "data": "sketch"}, _hr(63)]
+
+
+def test_latest_only_still_bounded_by_maxsize():
+    box = Mailbox(maxsize=2, latest_only=True)
+    for name in ("a", "b", "c"):
+        box.put_nowait({"type": name})
+    box.put_nowait(_hr(70))
+    assert box.dropped == 2
+    assert _drain(box) == [{"type": "c"}, _hr(70)]
+
+
+def test_keepalive_only_when_idle():
+    box = Mailbox()
+    box.put_nowait(_hr(60))
+    box.keepalive()
+    box.keepalive()
+
+    async def run():
+        first = await box.get()
+        box.keepalive()
+        return first, await box.get(), box.qsize()
+
+    assert asyncio.run(run()) == (_hr(60), KEEPALIVE, 0)
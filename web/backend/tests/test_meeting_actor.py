@@ -0,0 +1,91 @@
+import asyncio
+import json
+
+from backend.services.meeting_actor import MeetingActor
+from backend.services.meeting_manager import MeetingManager
+from backend.services.meeting_relay import MemoryMeetingRelay
+
+
+class FakeSocket:
+    scope = {}
+
+    async def accept(self, subprotocol=None):
+        pass
+
+    async def send_text(self, text):
+        json.loads(text)
+
+    async def close(self, code=1000):
+        pass
+
+
+def test_operation_runs_after_caller_is_cancelled():
+    async def run():
+        applied = []
+        gate = asyncio.Event()
+
+        async def blocker():
+            await gate.wait()
+
+        async def record(value):
+            applied.append(value)
+
+        actor = MeetingActor("m", flush=record, is_idle=lambda: True, on_exit=lambda a: None)
+        actor.post(blocker)
+        caller = asyncio.create_task(actor.call(record, "leave"))
+        await asyncio.sleep(0)
+        caller.cancel()
+        await asyncio.sleep(0)
+        gate.set()
+        await asyncio.sleep(0.01)
+        await actor.stop()
+        return caller.cancelled(), applied
+
+    cancelled, applied = asyncio.run(run())
+    assert cancelled
+    assert applied == ["leave"]
+
+
+def test_cancelled_leave_still_removes_participant():
+    async def run():
+        manager = MeetingManager(MemoryMeetingRelay(), broadcast_interval=0)
+        try:
+            await manager.join_participant("m", "alice", {})
+            leave = asyncio.create_task(manager.leave_participant("m", "alice"))
+            await asyncio.sleep(0)
+            leave.cancel()
+            await asyncio.sleep(0.01)
+            return manager.is_participant("m", "alice")
+        finally:
+            await manager.close()
+
+    assert not asyncio.run(run())
+
+
+def test_unregister_runs_on_the_actor():
+    async def run():
+        manager = MeetingManager(MemoryMeetingRelay(), broadcast_interval=0)
+        socket = FakeSocket()
+        order = []
+        gate = asyncio.Event()
+
+        async def blocker():
+            await gate.wait()
+            order.append(("blocker", "m" in manager._connections))
+
+        try:
+            await manager.register_connection("m", "alice", socket)
+            actor = manager._actors["m"]
+            actor.post(blocker)
+            unregister = asyncio.create_task(manager.unregister_connection("m", "alice", socket))
+            await asyncio.sleep(0.01)
+            # Queued behind the blocker: the table is untouched until it runs
+            assert "m" in manager._connections
+            gate.set()
+            await unregister
+            order.append(("unregistered", "m" in manager._connections))
+            return order
+        finally:
+            await manager.close()
+
+    assert asyncio.run(run()) == [("blocker", True), ("unregistered", False)]
@@ -0,0 +1,65 @@
+import asyncio
+import json
+
+from backend.services.meeting_manager import MeetingManager
+from backend.services.meeting_relay import MemoryMeetingRelay
+
+
+class FakeSocket:
+    scope = {}
+
+    def __init__(self):
+        self.frames = []
+
+    async def accept(self, subprotocol=None):
+        pass
+
+    async def send_text(self, text):
+        self.frames.append(json.loads(text))
+
+    async def close(self, code=1000):
+        pass
+
+
+def _deltas(socket):
+    return [f["payload"] for f in socket.frames if f["type"] == "participants_delta"]
+
+
+def test_burst_of_changes_is_one_delta_per_tick():
+    async def run():
+        manager = MeetingManager(MemoryMeetingRelay(), broadcast_interval=0.05)
+        socket = FakeSocket()
+        try:
+            await manager.register_connection("m", "alice", socket)
+            await manager.join_participant("m", "alice", {})
+            for bpm in range(60, 80):
+                await manager.heartbeat("m", "alice", {"heartRate": bpm})
+            await asyncio.sleep(0.01)
+            before_tick = len(_deltas(socket))
+            await asyncio.sleep(0.1)
+            return before_tick, _deltas(socket)
+        finally:
+            await manager.close()
+
+    before_tick, deltas = asyncio.run(run())
+    assert before_tick == 0
+    assert len(deltas) == 1
+    assert deltas[0]["changed"]["alice"]["heartRate"] == 79
+
+
+def test_phase_change_is_sent_immediately():
+    async def run():
+        manager = MeetingManager(MemoryMeetingRelay(), broadcast_interval=10)
+        socket = FakeSocket()
+        try:
+            await manager.register_connection("m", "alice", socket)
+            await manager.join_participant("m", "alice", {})
+            await manager.update_phase("m", "sketch", "alice")
+            await asyncio.sleep(0.01)
+            return _deltas(socket)
+        finally:
+            await manager.close()
+
+    deltas = asyncio.run(run())
+    assert len(deltas) == 1
+    assert deltas[0]["phase"] == "sketch"
@@ -0,0 +1,43 @@
+import asyncio
+
+from backend.services.meeting_manager import MeetingManager
+from backend.services.meeting_relay import MemoryMeetingRelay
+
+
+def _status(manager, meeting_id, user_id):
+    participant = manager._participants.get(meeting_id, {}).get(user_id)
+    return None if participant is None else participant.status
+
+
+def test_offline_participant_going_online_is_rearmed():
+    async def run():
+        manager = MeetingManager(
+            MemoryMeetingRelay(), broadcast_interval=0, offline_after=0.05, remove_after=1.0
+        )
+        await manager.join_participant("m", "alice", {})
+        await asyncio.sleep(0.15)
+        assert _status(manager, "m", "alice") == "offline"
+
+        await manager.heartbeat("m", "alice")
+        assert _status(manager, "m", "alice") == "online"
+        # Goes offline again after offline_after, not at the old removal deadline
+        await asyncio.sleep(0.15)
+        assert _status(manager, "m", "alice") == "offline"
+
+        await manager.close()
+
+    asyncio.run(run())
+
+
+def test_offline_participant_is_removed():
+    async def run():
+        manager = MeetingManager(
+            MemoryMeetingRelay(), broadcast_interval=0, offline_after=0.03, remove_after=0.1
+        )
+        await manager.join_participant("m", "bob", {})
+        await asyncio.sleep(0.25)
+        assert not manager.is_participant("m", "bob")
+        assert not manager._armed
+        await manager.close()
+
+    asyncio.run(run())
@@ -0,0 +1,127 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from backend.services.meeting_manager import MeetingManager
+from backend.services.meeting_relay import MemoryMeetingRelay
+
+
+class FakeSocket:
+    scope = {}
+
+    def __init__(self):
+        self.frames = []
+
+    async def accept(self, subprotocol=None):
+        pass
+
+    async def send_text(self, text):
+        self.frames.append(json.loads(text))
+
+    async def close(self, code=1000):
+        pass
+
+
+def test_memory_relay_bases_each_delta_on_the_previous_commit():
+    async def run():
+        relay = MemoryMeetingRelay()
+        got = []
+        relay.on_message = lambda meeting_id, msg: got.append((meeting_id, msg["v"], msg["b"]))
+        first = await relay.publish_delta("m", {"changed": {}}, {}, {})
+        await relay.publish_delta("other", {"changed": {}}, {}, {})
+        second = await relay.publish_delta("m", {"changed": {}}, {}, {})
+        return first, second, got
+
+    first, second, got = asyncio.run(run())
+    assert got == [("m", first, 0), ("other", first + 1, 0), ("m", second, first)]
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    from backend.services import redis_meeting_relay
+
+    server = fakeredis.FakeServer()
+    clients = []
+
+    def make_relay():
+        client = fakeredis.FakeAsyncRedis(server=server, decode_responses=True)
+        clients.append(client)
+        monkeypatch.setattr(redis_meeting_relay, "redis", client)
+        return redis_meeting_relay.RedisMeetingRelay(ttl=60)
+
+    return make_relay, lambda: clients[0]
+
+
+def test_loaded_participants_are_swept_by_other_workers(fake_redis):
+    make_relay, client = fake_redis
+
+    async def run():
+        a = MeetingManager(make_relay(), broadcast_interval=0, offline_after=0.1, remove_after=0.3)
+        await a.register_connection("m", "alice", FakeSocket())
+        await a.join_participant("m", "alice", {"role": "host"})
+        await asyncio.sleep(0.05)
+
+        # Alice's worker dies without leaving; bob's worker must expire her
+        await a.close()
+        b = MeetingManager(make_relay(), broadcast_interval=0, offline_after=0.1, remove_after=0.3)
+        try:
+            await b.register_connection("m", "bob", FakeSocket())
+            await asyncio.sleep(0.5)
+            return b.is_participant("m", "alice"), await client().hkeys("meeting:m:participants")
+        finally:
+            await b.close()
+
+    still_there, stored = asyncio.run(run())
+    assert not still_there
+    assert stored == []
+
+
+def test_meta_survives_an_empty_meeting(fake_redis):
+    make_relay, client = fake_redis
+
+    async def run():
+        a = MeetingManager(make_relay(), broadcast_interval=0)
+        socket = FakeSocket()
+        try:
+            await a.register_connection("m", "alice", socket)
+            await a.join_participant("m", "alice", {})
+            await a.update_phase("m", "sketch", "alice")
+            await a.leave_participant("m", "alice")
+            await asyncio.sleep(0.05)
+            meta = await client().hgetall("meeting:m:meta")
+            version = int(await client().get("meeting:m:version"))
+        finally:
+            await a.close()
+        deltas = [f["payload"] for f in socket.frames if f["type"] == "participants_delta"]
+        return meta, version, deltas
+
+    meta, version, deltas = asyncio.run(run())
+    assert json.loads(meta["phase"]) == "sketch"
+    assert [d["version"] for d in deltas] == list(range(1, version + 1))
+    assert [d["baseVersion"] for d in deltas] == list(range(0, version))
+
+
+def test_membership_of_unmirrored_meetings_is_read_from_redis(fake_redis):
+    make_relay, _ = fake_redis
+
+    async def run():
+        a = MeetingManager(make_relay(), broadcast_interval=0)
+        b = MeetingManager(make_relay(), broadcast_interval=0)
+        try:
+            await a.register_connection("m", "alice", FakeSocket())
+            await a.join_participant("m", "alice", {})
+            await asyncio.sleep(0.05)
+            return (
+                b.is_participant("m", "alice"),
+                await b.is_member("m", "alice"),
+                await b.is_member("m", "bob"),
+            )
+        finally:
+            await a.close()
+            await b.close()
+
+    assert asyncio.run(run()) == (False, True, False)
@@ -0,0 +1,31 @@
+from backend.services.participant import CORE_MAX_CHARS, Participant
+
+
+def _update(participant, updates):
+    return participant.update(updates, max_extra_keys=4, max_extra_bytes=256, meeting_bytes_left=1024)
+
+
+def test_status_is_server_owned():
+    participant = Participant("m", "alice")
+    participant.status = "online"
+    changed, _, _ = _update(participant, {"status": "offline", "userId": "mallory"})
+    assert not changed
+    assert participant.status == "online" and participant.user_id == "alice"
+
+
+def test_core_fields_are_type_and_length_checked():
+    participant = Participant("m", "alice")
+    changed, grown, dropped = _update(
+        participant,
+        {
+            "role": "x" * (CORE_MAX_CHARS + 1),
+            "phase": {"nested": ["blob"] * 1000},
+            "heartRate": True,
+            "avatarSeed": 42,
+            "timestamp": "2026-01-01T00:00:00",
+        },
+    )
+    assert sorted(dropped) == ["heartRate", "phase", "role"]
+    assert changed == {"avatarSeed", "timestamp"}
+    assert grown == 0
+    assert participant.role is None and participant.phase is None and participant.heart_rate is None
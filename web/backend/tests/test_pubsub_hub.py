@@ -0,0 +1,48 @@
+import asyncio
+
+import pytest
+
+from backend.services.pubsub_hub import PubSubHub
+
+
+@pytest.fixture
+def client():
+    fakeredis = pytest.importorskip("fakeredis")
+    return fakeredis.FakeAsyncRedis(decode_responses=True)
+
+
+async def _wait_for(predicate):
+    for _ in range(100):
+        if predicate():
+            return
+        await asyncio.sleep(0.01)
+
+
+def test_subscribers_share_one_server_subscription(client):
+    async def run():
+        hub = PubSubHub(client)
+        try:
+            q1, unsub1 = await hub.subscribe("chan")
+            q2, unsub2 = await hub.subscribe("chan")
+            channels = await client.pubsub_numsub("chan")
+            await client.publish("chan", '{"type":"hr","data":{"bpm":70}}')
+            await _wait_for(lambda: q1.qsize() and q2.qsize())
+            e1, e2 = await q1.get(), await q2.get()
+
+            unsub1()
+            await asyncio.sleep(0.01)
+            still = await client.pubsub_numsub("chan")
+            unsub2()
+            await _wait_for(lambda: not hub._subscribed)
+            gone = await client.pubsub_numsub("chan")
+            return channels, e1, e2, still, gone
+        finally:
+            await hub.close()
+
+    channels, e1, e2, still, gone = asyncio.run(run())
+    # Two local subscribers, one server-side subscription
+    assert channels == [("chan", 1)]
+    # Decoded once: both mailboxes get the very same object
+    assert e1 == {"type": "hr", "data": {"bpm": 70}} and e1 is e2
+    assert still == [("chan", 1)]
+    assert gone == [("chan", 0)]
@@ -0,0 +1,66 @@
+import asyncio
+
+from backend.config import LATEST_TTL_SECONDS, REDIS_HEALTH_CHECK_INTERVAL, REDIS_MAX_CONNECTIONS
+from backend.services import redis_broker
+from backend.storage import redis_client
+
+
+class RecordingPipeline:
+    def __init__(self, owner):
+        self.owner = owner
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def set(self, key, value, ex=None):
+        self.commands.append(("set", key, ex))
+
+    def publish(self, channel, message):
+        self.commands.append(("publish", channel))
+
+    async def execute(self):
+        self.owner.round_trips.append(self.commands)
+
+
+class RecordingRedis:
+    def __init__(self):
+        self.round_trips = []
+
+    def pipeline(self, transaction=True):
+        return RecordingPipeline(self)
+
+    def pubsub(self):
+        raise AssertionError("publishing must not subscribe")
+
+
+def test_latest_and_events_go_out_in_one_round_trip(monkeypatch):
+    fake = RecordingRedis()
+    monkeypatch.setattr(redis_broker, "redis", fake)
+
+    async def run():
+        broker = redis_broker.RedisBroker()
+        events = [{"id": ts, "type": "hr", "data": {"bpm": 70, "ts": ts}} for ts in (1, 2)]
+        await broker.set_latest_and_publish("u", {"bpm": 70, "ts": 2}, events)
+        cached = await broker.get_latest("u")
+        await broker.close()
+        return cached
+
+    cached = asyncio.run(run())
+    assert fake.round_trips == [[
+        ("set", "latest_heart_rate:u", LATEST_TTL_SECONDS),
+        ("publish", "pubsub:magheart:u"),
+        ("publish", "pubsub:magheart:u"),
+    ]]
+    # Served from the in-process cache, no extra round trip
+    assert cached == {"bpm": 70, "ts": 2}
+    assert len(fake.round_trips) == 1
+
+
+def test_pool_uses_configured_limits():
+    pool = redis_client.redis.connection_pool
+    assert pool.max_connections == REDIS_MAX_CONNECTIONS
+    assert pool.connection_kwargs["health_check_interval"] == REDIS_HEALTH_CHECK_INTERVAL
@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+
+from backend.services.broker import MemoryBroker
+
+
+def _event(bpm):
+    return {"id": 0, "type": "hr", "data": {"bpm": bpm}}
+
+
+def _publish_and_replay(broker, count, after):
+    """Publish `count` events; `after(ids)` picks the Last-Event-ID to resume from."""
+    async def run():
+        try:
+            for bpm in range(count):
+                await broker.set_latest_and_publish("u", None, [_event(bpm)])
+            ids = [e["id"] for e in await broker.replay("u", "0-0")]
+            return ids, await broker.replay("u", after(ids))
+        finally:
+            await broker.close()
+
+    return asyncio.run(run())
+
+
+def _bpms(events):
+    return [e["data"]["bpm"] for e in events]
+
+
+def test_memory_replay_after_id():
+    ids, events = _publish_and_replay(
+        MemoryBroker(latest_ttl=60, latest_size=10, replay_size=5), 5, lambda ids: ids[1]
+    )
+    assert len(ids) == 5
+    assert _bpms(events) == [2, 3, 4]
+
+
+def test_memory_replay_from_before_the_ring():
+    # Only the newest 3 of 5 events are kept; resuming from one that was
+    # dropped returns everything still held
+    ids, events = _publish_and_replay(
+        MemoryBroker(latest_ttl=60, latest_size=10, replay_size=3), 5, lambda ids: "1-0"
+    )
+    assert _bpms(events) == [2, 3, 4]
+
+
+def test_memory_replay_edge_ids():
+    broker = MemoryBroker(latest_ttl=60, latest_size=10, replay_size=3)
+    assert _publish_and_replay(broker, 2, lambda ids: ids[-1])[1] == []
+    broker = MemoryBroker(latest_ttl=60, latest_size=10, replay_size=3)
+    assert _publish_and_replay(broker, 2, lambda ids: "not-an-id")[1] == []
+
+
+@pytest.fixture
+def stream_broker(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    from backend.services import redis_broker
+
+    monkeypatch.setattr(redis_broker, "redis", fakeredis.FakeAsyncRedis(decode_responses=True))
+
+    def make(maxlen):
+        monkeypatch.setattr(redis_broker, "STREAM_MAXLEN", maxlen)
+        return redis_broker.RedisBroker(use_streams=True)
+
+    return make
+
+
+def test_stream_replay_after_id(stream_broker):
+    ids, events = _publish_and_replay(stream_broker(100), 5, lambda ids: ids[1])
+    assert len(ids) == 5
+    assert _bpms(events) == [2, 3, 4]
+    assert [e["id"] for e in events] == ids[2:]
+
+
+def test_stream_replay_from_before_the_trimmed_stream(stream_broker):
+    from backend.services import redis_broker
+
+    broker = stream_broker(100)
+
+    async def run():
+        try:
+            for bpm in range(5):
+                await broker.set_latest_and_publish("u", None, [_event(bpm)])
+            first = (await redis_broker.redis.xrange("stream:magheart:u", count=1))[0][0]
+            # The stream cap drops the oldest entries
+            await redis_broker.redis.xtrim("stream:magheart:u", maxlen=3, approximate=False)
+            return await broker.replay("u", first)
+        finally:
+            await broker.close()
+
+    assert _bpms(asyncio.run(run())) == [2, 3, 4]
@@ -0,0 +1,160 @@
+import asyncio
+
+from backend.storage.binary_store import BinaryTimeSeriesStore
+from backend.storage.rollups import TIERS, RollupStore, newest_window, pick_tier
+
+SAMPLES = [(1000, 60), (2000, 62), (5000, 64), (70000, 70), (130000, 80)]
+LATE = (4000, 90)
+
+
+def _ingest(store):
+    async def run():
+        await store.observe("u", [{"ts": ts, "bpm": bpm} for ts, bpm in SAMPLES])
+        await store.observe("u", [{"ts": LATE[0], "bpm": LATE[1]}])
+        # Reads after close see only what reached the files
+        await store.close()
+        return (
+            await store.read_range("u", "1s", 3500, 4500, 10),
+            await store.read_range("u", "1m", 0, 59999, 10),
+            await store.read_range("u", "1s", 0, 200000, 3),
+        )
+
+    return asyncio.run(run())
+
+
+def _check(late, minute, first3):
+    assert late == [{"ts": 4000, "min": 90, "max": 90, "mean": 90.0, "count": 1}]
+    assert minute == [{"ts": 0, "min": 60, "max": 90, "mean": 69.0, "count": 4}]
+    assert [b["ts"] for b in first3] == [1000, 2000, 4000]
+
+
+def test_late_sample_is_merged_into_csv_rollups(tmp_path):
+    _check(*_ingest(RollupStore(str(tmp_path))))
+
+
+def test_synchronous_csv_rollups(tmp_path):
+    _check(*_ingest(RollupStore(str(tmp_path), write_behind=False)))
+
+
+def test_duplicate_rows_do_not_count_against_limit(tmp_path):
+    store = RollupStore(str(tmp_path), write_behind=False)
+
+    async def run():
+        # Restarts leave several rows for the same 1h bucket
+        for bpm in (60, 70, 80):
+            await store.observe("u", [{"ts": 1000, "bpm": bpm}])
+            await store.close()
+        await store.observe("u", [{"ts": TIERS["1h"] + 1000, "bpm": 90}])
+        await store.close()
+        return await store.read_range("u", "1h", 0, 2 * TIERS["1h"], 2)
+
+    buckets = asyncio.run(run())
+    assert [(b["ts"], b["count"]) for b in buckets] == [(0, 3), (TIERS["1h"], 1)]
+
+
+def test_binary_buckets_include_late_samples(tmp_path):
+    store = BinaryTimeSeriesStore(str(tmp_path), segment_records=3)
+    store.append("u", [{"ts": ts, "bpm": bpm} for ts, bpm in SAMPLES])
+    store.append("u", [{"ts": LATE[0], "bpm": LATE[1]}])
+    _check(
+        store.buckets("u", TIERS["1s"], 3500, 4500, 10),
+        store.buckets("u", TIERS["1m"], 0, 59999, 10),
+        store.buckets("u", TIERS["1s"], 0, 200000, 3),
+    )
+
+
+async def _auto(store, start, end, points):
+    tier = pick_tier(start, end, points)
+    return tier, await store.read_range("u", tier, newest_window(tier, start, end, points), end, points)
+
+
+def test_auto_resolution_keeps_newest_buckets(tmp_path):
+    store = RollupStore(str(tmp_path), write_behind=False)
+    # One sample a minute for 24h
+    day = [{"ts": i * TIERS["1m"], "bpm": 60 + i % 50} for i in range(1440)]
+    newest = day[-1]
+
+    async def run():
+        await store.observe("u", day)
+        return (
+            await _auto(store, 0, newest["ts"], 1000),
+            await _auto(store, 0, newest["ts"], 1440),
+            await _auto(store, 0, newest["ts"], 10),
+        )
+
+    (tier, hourly), (fine, minutes), (coarse, last10) = asyncio.run(run())
+    # 1440 one-minute buckets don't fit in 1000 points, 24 hourly ones do
+    assert tier == "1h" and len(hourly) == 24
+    assert hourly[-1]["ts"] == newest["ts"] - newest["ts"] % TIERS["1h"]
+    assert sum(b["count"] for b in hourly) == 1440
+
+    assert fine == "1m" and len(minutes) == 1440
+    assert minutes[-1] == {"ts": newest["ts"], "min": newest["bpm"], "max": newest["bpm"],
+                           "mean": float(newest["bpm"]), "count": 1}
+
+    # Even hourly is too many: the oldest hours are the ones left out
+    assert coarse == "1h" and len(last10) == 10
+    assert last10[-1]["ts"] == hourly[-1]["ts"]
+
+
+def _crash_and_restart(tmp_path, before):
+    """Run `before(store)` on a store that never closes, then read from a fresh one."""
+    async def crashed():
+        store = RollupStore(str(tmp_path), flush_interval=60)
+        store.start()
+        await before(store)
+        # asyncio.run cancels the writer and checkpoint tasks without a flush
+
+    async def restarted():
+        store = RollupStore(str(tmp_path), flush_interval=60)
+        store.start()
+        try:
+            return await store.read_range("u", "1m", 0, 10 * TIERS["1m"], 10)
+        finally:
+            await store.close()
+
+    asyncio.run(crashed())
+    return asyncio.run(restarted())
+
+
+def test_open_buckets_survive_a_crash(tmp_path):
+    async def before(store):
+        await store.observe("u", [{"ts": 1000, "bpm": 60}, {"ts": 2000, "bpm": 70}])
+        await store.checkpoint(now_ms=2000)
+
+    assert _crash_and_restart(tmp_path, before) == [
+        {"ts": 0, "min": 60, "max": 70, "mean": 65.0, "count": 2}
+    ]
+
+
+def test_checkpointed_bucket_closed_before_crash_is_not_counted_twice(tmp_path):
+    async def before(store):
+        await store.observe("u", [{"ts": 1000, "bpm": 60}, {"ts": 2000, "bpm": 70}])
+        await store.checkpoint(now_ms=2000)
+        # The next minute closes minute 0; its row reaches disk, the next
+        # checkpoint doesn't
+        await store.observe("u", [{"ts": TIERS["1m"] + 1000, "bpm": 80}])
+        await store._writer.flush()
+
+    # Minute 1 opened after the last checkpoint, so the crash loses it
+    buckets = _crash_and_restart(tmp_path, before)
+    assert [(b["ts"], b["count"]) for b in buckets] == [(0, 2)]
+
+
+def test_quiet_users_are_closed_and_forgotten(tmp_path):
+    store = RollupStore(str(tmp_path), flush_interval=60)
+
+    async def run():
+        store.start()
+        await store.observe("quiet", [{"ts": 1000, "bpm": 60}])
+        await store.observe("busy", [{"ts": 2 * TIERS["1h"], "bpm": 70}])
+        await store.checkpoint(now_ms=2 * TIERS["1h"] + 1000)
+        open_users = {user_id for user_id, _ in store._open}
+        stored = await store.read_range("quiet", "1h", 0, TIERS["1h"], 10)
+        await store.close()
+        return open_users, stored
+
+    open_users, stored = asyncio.run(run())
+    assert open_users == {"busy"}
+    assert stored == [{"ts": 0, "min": 60, "max": 60, "mean": 60.0, "count": 1}]
+    assert not (tmp_path / "rollups-open.csv").exists()
@@ -0,0 +1,89 @@
+from backend.services import serial_protocol
+from backend.services.serial_protocol import (
+    ACK_OK,
+    ACK_START,
+    AckParser,
+    LatencyTracker,
+    encode_set_bpm,
+)
+
+
+def _ack(seq, status=ACK_OK):
+    return bytes((ACK_START, seq, status, seq ^ status))
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_set_bpm_frame_wraps_seq_and_clamps_value():
+    assert encode_set_bpm(0x103, 300) == bytes((0xA5, 0x03, 0x01, 0xFF, 0x03 ^ 0x01 ^ 0xFF))
+    assert encode_set_bpm(7, -5)[3] == 0
+
+
+def test_parser_resyncs_after_log_lines():
+    parser = AckParser()
+    # 'Z' is the ack start byte; the log text must not be taken for an ack
+    stream = b"boot ok\r\nZzz sleeping\r\n" + _ack(1) + b"bpm=72\n" + _ack(2, 0x01)
+    acks = []
+    for i in range(0, len(stream), 3):
+        acks += parser.feed(stream[i:i + 3])
+    assert acks == [(1, ACK_OK), (2, 0x01)]
+
+
+def test_parser_skips_bad_checksum():
+    parser = AckParser()
+    bad = bytes((ACK_START, 7, ACK_OK, 0x99))
+    assert parser.feed(bad + _ack(8)) == [(8, ACK_OK)]
+    # A frame split across reads is completed by the next one
+    assert parser.feed(_ack(9)[:2]) == []
+    assert parser.feed(_ack(9)[2:]) == [(9, ACK_OK)]
+
+
+def test_seq_wraparound_counts_unacked(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(serial_protocol.time, "perf_counter", clock)
+    tracker = LatencyTracker(ack_timeout=10.0)
+    for seq in range(256):
+        tracker.sent(seq)
+        clock.now += 0.001
+    # seq 0 comes round again while the first frame is still unacked
+    tracker.sent(0)
+    clock.now += 0.005
+    assert round(tracker.ack(0, ACK_OK), 6) == 0.005
+    assert tracker.ack(0, ACK_OK) is None
+    stats = tracker.stats()
+    assert (stats["unacked"], stats["acked"], stats["inflight"]) == (1, 1, 255)
+
+
+def test_unacked_frames_expire(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(serial_protocol.time, "perf_counter", clock)
+    tracker = LatencyTracker(ack_timeout=2.0)
+    tracker.sent(1)
+    clock.now = 3.0
+    tracker.sent(2)
+    assert tracker.ack(1, ACK_OK) is None
+    assert tracker.stats()["unacked"] == 1
+
+
+def test_percentiles_of_known_samples(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(serial_protocol.time, "perf_counter", clock)
+    tracker = LatencyTracker(window=100)
+    # Round trips of 1..100 ms, acked out of order; one rejection
+    for ms in [*range(100, 50, -1), *range(1, 51)]:
+        clock.now = 0.0
+        tracker.sent(ms)
+        clock.now = ms / 1000
+        tracker.ack(ms, ACK_OK)
+    tracker.sent(200)
+    tracker.ack(200, 0x01)
+    stats = tracker.stats()
+    assert stats["count"] == 100
+    assert (stats["p50Ms"], stats["p90Ms"], stats["p99Ms"], stats["maxMs"]) == (51.0, 90.0, 99.0, 100.0)
+    assert (stats["acked"], stats["rejected"]) == (100, 1)
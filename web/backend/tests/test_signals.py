@@ -0,0 +1,19 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend.routers import signals
+
+
+def test_oversized_batch_is_rejected(monkeypatch):
+    async def never(*args):
+        raise AssertionError("an oversized batch must not be stored")
+
+    monkeypatch.setattr(signals, "HEART_RATE_BATCH_MAX", 3)
+    monkeypatch.setattr(signals, "append_heart_rates", never)
+    app = FastAPI()
+    app.include_router(signals.router)
+
+    batch = [{"bpm": 70, "ts": 1000 * i} for i in range(4)]
+    response = TestClient(app).post("/api/heart_rate/batch", json=batch, headers={"X-User-Id": "u"})
+    assert response.status_code == 413
+    assert "at most 3 samples" in response.json()["detail"]
@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+
+from backend.services import ws_codec
+from backend.services.meeting_manager import MeetingManager
+from backend.services.meeting_relay import MemoryMeetingRelay
+from backend.services.ws_codec import JSON, MSGPACK, decode, encode, negotiate
+
+msgpack = pytest.importorskip("msgpack")
+
+
+class FakeSocket:
+    def __init__(self, offered):
+        self.scope = {"subprotocols": offered}
+        self.accepted = "unset"
+        self.frames = []
+
+    async def accept(self, subprotocol=None):
+        self.accepted = subprotocol
+
+    async def send_text(self, text):
+        self.frames.append(text)
+
+    async def send_bytes(self, data):
+        self.frames.append(data)
+
+    async def close(self, code=1000):
+        pass
+
+
+def test_negotiation():
+    assert negotiate(["chat", MSGPACK]) == MSGPACK
+    assert negotiate(["chat"]) is None
+
+
+def test_negotiation_declined_without_msgpack(monkeypatch):
+    monkeypatch.setattr(ws_codec, "msgpack", None)
+    assert negotiate([MSGPACK]) is None
+    with pytest.raises(ValueError):
+        decode(b"\x81")
+
+
+def test_frames_round_trip_in_both_formats():
+    message = {"type": "heartbeat", "payload": {"heartRate": 72}}
+    text = encode(message, JSON)
+    packed = encode(message, MSGPACK)
+    assert isinstance(text, str) and isinstance(packed, bytes)
+    assert decode(text) == decode(packed) == message
+    with pytest.raises(ValueError):
+        decode(b"\xc1")  # never valid MessagePack
+
+
+def test_msgpack_socket_gets_binary_frames():
+    async def run():
+        manager = MeetingManager(MemoryMeetingRelay(), broadcast_interval=0)
+        packed, plain = FakeSocket([MSGPACK]), FakeSocket([])
+        try:
+            assert await manager.register_connection("m", "alice", packed) == MSGPACK
+            assert await manager.register_connection("m", "bob", plain) == JSON
+            await manager.join_participant("m", "alice", {})
+            await asyncio.sleep(0.01)
+        finally:
+            await manager.close()
+        return packed, plain
+
+    packed, plain = asyncio.run(run())
+    assert packed.accepted == MSGPACK and plain.accepted is None
+    assert packed.frames and all(isinstance(f, bytes) for f in packed.frames)
+    assert plain.frames and all(isinstance(f, str) for f in plain.frames)
+    # The join delta is one frame in two encodings
+    assert msgpack.unpackb(packed.frames[-1]) == decode(plain.frames[-1])
+    assert decode(plain.frames[-1])["type"] == "participants_delta"
@@ -0,0 +1,64 @@
+import asyncio
+
+from backend.services.ws_sender import EVICT_CLOSE_CODE, ConnectionSender
+
+
+class FakeSocket:
+    def __init__(self, stall=False):
+        self.stall = stall
+        self.sent = []
+        self.closed_with = None
+
+    async def send_text(self, text):
+        if self.stall:
+            await asyncio.sleep(10)
+        self.sent.append(text)
+
+    async def send_bytes(self, data):
+        self.sent.append(data)
+
+    async def close(self, code=1000):
+        self.closed_with = code
+
+
+def test_frames_are_sent_in_order():
+    async def run():
+        socket = FakeSocket()
+        sender = ConnectionSender(socket, maxsize=8)
+        for frame in ("a", b"b", "c"):
+            assert sender.send(frame)
+        await asyncio.sleep(0.01)
+        sender.stop()
+        return socket.sent
+
+    assert asyncio.run(run()) == ["a", b"b", "c"]
+
+
+def test_overflow_evicts_without_waiting():
+    async def run():
+        socket = FakeSocket(stall=True)
+        evicted = []
+        sender = ConnectionSender(socket, maxsize=2, on_evict=evicted.append)
+        sender.send("stuck")
+        await asyncio.sleep(0.01)
+        # The first frame is stuck in send; two more fill the queue
+        accepted = [sender.send(str(i)) for i in range(3)]
+        await asyncio.sleep(0.01)
+        return accepted, evicted == [sender], sender.send("late"), socket.closed_with
+
+    accepted, evicted, late, code = asyncio.run(run())
+    assert accepted == [True, True, False]
+    assert evicted and late is False
+    assert code == EVICT_CLOSE_CODE
+
+
+def test_stalled_send_evicts():
+    async def run():
+        socket = FakeSocket(stall=True)
+        evicted = []
+        sender = ConnectionSender(socket, send_timeout=0.02, on_evict=evicted.append)
+        sender.send("x")
+        await asyncio.sleep(0.1)
+        return len(evicted), sender.closed, socket.closed_with
+
+    assert asyncio.run(run()) == (1, True, EVICT_CLOSE_CODE)
@@ -9,6 +9,9 @@ class CoCreationSocketClient {
     this.reconnectTimeoutId = null;
     this.heartbeatIntervalId = null;
     this.stopped = false;
+    // Version of the last applied participants_state / participants_delta
+    this.stateVersion = null;
+    this.snapshotRequested = false;
 
     this.state = {
       messages: [],
@@ -85,6 +88,9 @@ class CoCreationSocketClient {
 
     this.ws.onopen = () => {
       this.reconnectAttempts = 0;
+      // The server pushes a full snapshot on connect
+      this.stateVersion = null;
+      this.snapshotRequested = true;
       this.state.isConnected = true;
       this._emit();
 
@@ -188,15 +194,18 @@ class CoCreationSocketClient {
       if (payload.sharedContext) {
         this.state.sharedContext = payload.sharedContext;
       }
-
-      const newRates = {};
-      Object.values(payload.participants || {}).forEach((p) => {
-        if (p.heartRate) {
-          newRates[p.userId] = p.heartRate;
-        }
-      });
-      if (Object.keys(newRates).length > 0) {
-        this.state.heartRates = { ...this.state.heartRates, ...newRates };
+      this.stateVersion = typeof payload.version === 'number' ? payload.version : null;
+      this.snapshotRequested = false;
+      this._mergeHeartRates(payload.participants);
+    } else if (message.type === 'participants_delta') {
+      if (!this._applyDelta(message.payload || {})) {
+        return;
+      }
+    } else if (message.type === 'heart_rates') {
+      // Newest sample of every participant whose heart rate changed this tick
+      const rates = message.payload?.heartRates;
+      if (rates) {
+        this.state.heartRates = { ...this.state.heartRates, ...rates };
       }
     } else if (message.type === 'heart_rate_update') {
       const userId = message.payload?.userId;
@@ -223,6 +232,56 @@ class CoCreationSocketClient {
     this._emit();
   }
 
+  _mergeHeartRates(participants) {
+    const newRates = {};
+    Object.entries(participants || {}).forEach(([userId, p]) => {
+      if (p.heartRate) {
+        newRates[p.userId || userId] = p.heartRate;
+      }
+    });
+    if (Object.keys(newRates).length > 0) {
+      this.state.heartRates = { ...this.state.heartRates, ...newRates };
+    }
+  }
+
+  // Apply a versioned delta; returns false if it was skipped.
+  _applyDelta(payload) {
+    const { version, baseVersion } = payload;
+    if (this.stateVersion !== null && version <= this.stateVersion) {
+      // Already covered by a newer snapshot
+      return false;
+    }
+    if (this.stateVersion === null || baseVersion !== this.stateVersion) {
+      // Missed a frame (or no snapshot yet): resync from a full snapshot
+      this._requestSnapshot();
+      return false;
+    }
+
+    const participants = { ...this.state.participants };
+    (payload.removed || []).forEach((userId) => {
+      delete participants[userId];
+    });
+    Object.entries(payload.changed || {}).forEach(([userId, fields]) => {
+      participants[userId] = { ...(participants[userId] || {}), ...fields };
+    });
+    this.state.participants = participants;
+    if (payload.phase) {
+      this.state.meetingPhase = payload.phase;
+    }
+    if (payload.sharedContext) {
+      this.state.sharedContext = payload.sharedContext;
+    }
+    this._mergeHeartRates(payload.changed);
+    this.stateVersion = version;
+    return true;
+  }
+
+  _requestSnapshot() {
+    if (this.snapshotRequested) return;
+    this.snapshotRequested = true;
+    this._sendRaw({ type: 'request_snapshot', payload: {} });
+  }
+
   _sendRaw(obj) {
     if (!this.ws || this.ws.readyState !== WebSocket.OPEN) {
       console.warn('WebSocket is not connected, cannot send message:', obj);